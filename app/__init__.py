@@ -1,18 +1,43 @@
 from flask import Flask
-from app.database import Base, engine
+from app.database import session
+from app.migrations import ensure_schema, migrate_command
+from app.metrics import init_app as init_metrics
+from app.responses import init_app as init_responses
 from app.routes.health import health_bp
+from app.routes.metrics import metrics_bp
 from app.routes.auth import auth_bp
 from app.routes.recommendations import recommendations_bp
+from app.routes.history import history_bp
+from app.catalog import sync_catalog_command
+from app.provisioning import provision_users_command
 
 def create_app():
     app = Flask(__name__)
 
-    # Create tables if they don't exist
-    Base.metadata.create_all(engine)
-
     # Register blueprints
     app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(recommendations_bp)
+    app.register_blueprint(history_bp)
+
+    # Request timings and slow request profiles for /metrics
+    init_metrics(app)
+
+    # Faster JSON encoding when orjson is installed, and compression of large JSON responses
+    init_responses(app)
+
+    # The database is opened and its schema checked on the first request, not at startup
+    app.before_request(ensure_schema)
+
+    # Give each request its own database session and release it afterwards
+    @app.teardown_appcontext
+    def remove_session(exception=None):
+        session.remove()
+
+    # CLI commands (flask --app run <command>)
+    app.cli.add_command(sync_catalog_command)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(provision_users_command)
 
     return app
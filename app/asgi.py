@@ -0,0 +1,126 @@
+"""ASGI application: POST /recommend runs on the event loop, every other route goes to the Flask app.
+
+Streaming (NDJSON) /recommend requests are also served by the Flask app.
+"""
+import asyncio
+import json
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+from app.metrics import request_seconds, timed
+from app.migrations import ensure_schema, schema_checked
+from app.persistence import save_recommendations
+from app.responses import choose_encoding, compress, dumps
+from app.routes.recommendations import degraded_fallback, wants_stream, watch_region
+from app.tmdb import spec_error, tmdb_degraded
+from app.tmdb_async import async_tmdb_client, get_personalized_recommendations, localize_providers, run_in_session
+from app.tokens import resolve_cached_user_id, resolve_user_id
+
+async def _read_json(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+async def _send_json(send, payload, status, accept_encoding=''):
+    headers = [(b'content-type', b'application/json')]
+    with timed('serialization'):
+        body = dumps(payload)
+        encoding = choose_encoding(accept_encoding, len(body))
+        if encoding:
+            body = compress(body, encoding)
+            headers.append((b'content-encoding', encoding.encode('ascii')))
+    headers += [(b'vary', b'Accept-Encoding'), (b'content-length', str(len(body)).encode('ascii'))]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return ''
+
+async def recommend(scope, receive, send):
+    """Async twin of routes.recommendations.recommend with the same request and response format."""
+    data = await _read_json(receive)
+    if data is None:
+        await _send_json(send, {"error": "Request body must be a JSON object."}, 400)
+        return
+
+    authorization = _header(scope, b'authorization')
+    accept_encoding = _header(scope, b'accept-encoding')
+    username = data.get('username')
+    genre = data.get('genre')
+    age_rating = data.get('age_rating')
+    year_range = data.get('year_range')
+
+    if not genre or not age_rating or not year_range or not (username or authorization):
+        await _send_json(send, {"error": "username, genre, age_rating, and year_range are required."}, 400)
+        return
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        await _send_json(send, error, 400)
+        return
+    region = watch_region(data.get('region'))
+    if region is None:
+        await _send_json(send, {"error": "region must be a two-letter country code."}, 400)
+        return
+
+    with timed('user_lookup'):
+        # The cached answer is taken in one lookup, so an eviction in between cannot send a query to the loop
+        resolved = resolve_cached_user_id(authorization)
+        if resolved is None:
+            resolved = await run_in_session(resolve_user_id, authorization, username)
+        user_id, error = resolved
+    if error:
+        await _send_json(send, *error)
+        return
+
+    recommendations, status_code = await get_personalized_recommendations(user_id, genre, age_rating, year_range)
+    if status_code != 200:
+        fallback = await run_in_session(degraded_fallback, user_id, genre, age_rating, year_range, status_code)
+        if fallback is None:
+            await _send_json(send, recommendations, status_code)
+        else:
+            await _send_json(send, {"recommendations": fallback, "degraded": True}, 200, accept_encoding)
+        return
+
+    with timed('commit'):
+        await run_in_session(save_recommendations, user_id, genre, recommendations)
+    payload = {"recommendations": await localize_providers(recommendations, region)}
+    if tmdb_degraded('details'):
+        payload["degraded"] = True
+    await _send_json(send, payload, 200, accept_encoding)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_tmdb_client.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+def create_asgi_app(flask_app=None):
+    wsgi = WsgiToAsgi(flask_app or create_app())
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/recommend' \
+                and not wants_stream(_header(scope, b'accept')):
+            if not schema_checked():
+                await asyncio.to_thread(ensure_schema)
+            with request_seconds.time(method='POST', endpoint='recommendations.recommend'):
+                await recommend(scope, receive, send)
+        else:
+            await wsgi(scope, receive, send)
+
+    return app
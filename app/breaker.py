@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+import requests
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class CircuitOpen(requests.RequestException):
+    """Raised instead of calling TMDB while the endpoint's circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops calling an upstream endpoint that keeps failing or answering slowly.
+
+    The last `window` calls are tracked; a call fails when it errors or takes longer
+    than slow_call_seconds. Once at least min_calls are recorded and the failed share
+    reaches failure_rate, the breaker opens and calls are refused for open_seconds.
+    It then lets half_open_calls probe calls through: if they all succeed it closes,
+    otherwise it opens again for twice as long, up to max_open_seconds.
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=10, slow_call_seconds=5.0,
+                 open_seconds=30.0, max_open_seconds=300.0, half_open_calls=3, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)
+        self._state = CLOSED
+        self._open_seconds = open_seconds
+        self._opened_at = None
+        self._probes = 0
+        self._probe_successes = 0
+        self._counters = {'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self._open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+        return self._state
+
+    def allow(self):
+        """Return True if a call may go ahead now. Every allowed call must be followed by record()."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self._counters['rejected'] += 1
+            return False
+
+    def record(self, success, elapsed=0.0):
+        """Record the outcome of an allowed call; slow successes count as failures."""
+        failed = not success or elapsed > self.slow_call_seconds
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if failed:
+                    self._trip(min(self.max_open_seconds, self._open_seconds * 2))
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._state = CLOSED
+                        self._open_seconds = self.base_open_seconds
+                        self._calls.clear()
+                return
+            if state == OPEN:
+                return
+            self._calls.append(failed)
+            if len(self._calls) >= self.min_calls and sum(self._calls) / len(self._calls) >= self.failure_rate:
+                self._trip(self.base_open_seconds)
+
+    def release(self):
+        """Undo allow() for a call that never reached the upstream, e.g. one shed by the rate limiter."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _trip(self, open_seconds):
+        self._state = OPEN
+        self._open_seconds = open_seconds
+        self._opened_at = self.clock()
+        self._calls.clear()
+        self._counters['opened'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._open_seconds = self.base_open_seconds
+            self._calls.clear()
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            stats = dict(self._counters, state=state)
+            if state == CLOSED:
+                stats['recent_failure_rate'] = round(sum(self._calls) / len(self._calls), 3) if self._calls else 0.0
+            else:
+                stats['retry_in'] = round(max(0.0, self._opened_at + self._open_seconds - self.clock()), 1)
+            return stats
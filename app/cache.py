@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class MemoryCache:
+    """In-process LRU cache bounded by entry count and by the serialized size of its values."""
+
+    blocking = False
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        size = len(json.dumps(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.time() + ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+class SQLiteCache:
+    """On-disk cache shared by every worker process on the host and kept across restarts.
+
+    Uses the same LRU and size bounds as MemoryCache, tracked through an accessed_at column.
+    """
+
+    # Every call waits on the database file, so async callers run it on a worker thread
+    blocking = True
+
+    def __init__(self, path, max_entries, max_bytes):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not cross a fork, so reopen when running in a new worker process
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Created here rather than in __init__ so the file is only touched once the cache is used
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tmdb_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_tmdb_cache_accessed_at ON tmdb_cache (accessed_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM tmdb_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM tmdb_cache WHERE key = ?", (key,))
+            self.expirations += 1
+            return None
+        conn.execute("UPDATE tmdb_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        payload = json.dumps(value)
+        if len(payload) > self.max_bytes:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO tmdb_cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now + ttl, now)
+            )
+            entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tmdb_cache").fetchone()
+            while entries > self.max_entries or total_bytes > self.max_bytes:
+                oldest = conn.execute("SELECT key, size FROM tmdb_cache ORDER BY accessed_at LIMIT 1").fetchone()
+                conn.execute("DELETE FROM tmdb_cache WHERE key = ?", (oldest[0],))
+                entries -= 1
+                total_bytes -= oldest[1]
+                self.evictions += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connection().execute("DELETE FROM tmdb_cache")
+
+    def stats(self):
+        entries, total_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tmdb_cache"
+        ).fetchone()
+        return {
+            'backend': 'sqlite',
+            'entries': entries,
+            'bytes': total_bytes,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+class ResponseCache:
+    """Caches TMDB JSON payloads keyed by endpoint and parameters, with a TTL per endpoint."""
+
+    def __init__(self, backend, ttls):
+        self.backend = backend
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        self._counters = {endpoint: {'hits': 0, 'misses': 0} for endpoint in ttls}
+
+    @staticmethod
+    def make_key(endpoint, path, params=None):
+        return f"{endpoint}:{path}?{json.dumps(params or {}, sort_keys=True)}"
+
+    @property
+    def blocking(self):
+        return self.backend.blocking
+
+    def _count(self, endpoint, name):
+        with self._lock:
+            self._counters[endpoint][name] += 1
+
+    def get(self, endpoint, key):
+        value = self.backend.get(key)
+        self._count(endpoint, 'hits' if value is not None else 'misses')
+        return value
+
+    def set(self, endpoint, key, value):
+        self.backend.set(key, value, self.ttls[endpoint])
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+        return {'endpoints': endpoints, **self.backend.stats()}
+
+def create_cache_backend(kind, path, max_entries, max_bytes):
+    if kind == 'sqlite':
+        return SQLiteCache(path, max_entries, max_bytes)
+    if kind == 'memory':
+        return MemoryCache(max_entries, max_bytes)
+    raise ValueError(f"Unknown cache backend: {kind}")
@@ -0,0 +1,109 @@
+import datetime
+import logging
+import click
+import requests
+from app.config import TMDB_CATALOG_MAX_AGE, TMDB_CATALOG_PAGES
+from app.database import session
+from app.migrations import ensure_schema
+from app.models import Movie, CatalogEntry, CatalogSync
+from app.movies import upsert_movies
+from app.tmdb import (
+    GENRE_MAP, YEAR_MAP, CERTIFICATIONS, discover_params, fetch_json, format_recommendation, enrichment_engine
+)
+from app.tmdb_client import tmdb_client
+
+logger = logging.getLogger(__name__)
+
+def _discover(genre_id, certification, years, pages):
+    movies = []
+    for page in range(1, pages + 1):
+        try:
+            data, status_code = fetch_json('discover', "/discover/movie", params=discover_params(genre_id, certification, years, page), priority='background')
+        except requests.RequestException:
+            logger.warning("TMDB discover request failed during catalog sync", exc_info=True)
+            return None
+        if status_code != 200:
+            return None
+        movies.extend(data.get('results', []))
+        if page >= data.get('total_pages', 1):
+            break
+    return movies
+
+def _refresh_movies(movies, cutoff):
+    """Upsert movie details, enriching only movies that are missing or older than cutoff."""
+    movie_ids = [movie['id'] for movie in movies]
+    fresh_ids = {
+        movie_id for (movie_id,) in session.query(Movie.id).filter(Movie.id.in_(movie_ids), Movie.updated_at >= cutoff)
+    }
+    stale = [movie for movie in movies if movie['id'] not in fresh_ids]
+    enrichments = enrichment_engine.enrich([movie['id'] for movie in stale], 'background')
+
+    upsert_movies(session, [
+        format_recommendation(movie, watch_providers, trailer_url)
+        for movie, (watch_providers, trailer_url) in zip(stale, enrichments)
+    ])
+    return len(stale)
+
+def _release_year(movie):
+    release_date = movie.get('release_date') or ''
+    return int(release_date[:4]) if release_date[:4].isdigit() else None
+
+def sync_catalog(genres=None, certifications=None, year_ranges=None, max_age=TMDB_CATALOG_MAX_AGE, pages=TMDB_CATALOG_PAGES):
+    """Mirror TMDB discover results, providers and trailers into the local catalog tables.
+
+    Only combinations (and movies) whose last sync is older than max_age seconds are
+    fetched again. Returns the number of combinations that were refreshed.
+    """
+    now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(seconds=max_age)
+    refreshed = 0
+
+    for genre in genres or GENRE_MAP:
+        genre_id = GENRE_MAP[genre]
+        for certification in certifications or CERTIFICATIONS:
+            for year_range in year_ranges or YEAR_MAP:
+                sync = session.get(CatalogSync, (genre_id, certification, year_range))
+                if sync is not None and sync.synced_at >= cutoff:
+                    continue
+
+                start_year, end_year = YEAR_MAP[year_range]
+                movies = _discover(genre_id, certification, (start_year, end_year), pages)
+                if movies is None:
+                    session.rollback()
+                    continue
+
+                enriched = _refresh_movies(movies, cutoff)
+                session.query(CatalogEntry).filter(
+                    CatalogEntry.genre_id == genre_id,
+                    CatalogEntry.certification == certification,
+                    CatalogEntry.release_year.between(start_year, end_year)
+                ).delete(synchronize_session=False)
+                for movie in movies:
+                    session.merge(CatalogEntry(
+                        genre_id=genre_id,
+                        certification=certification,
+                        movie_id=movie['id'],
+                        release_year=_release_year(movie),
+                        popularity=movie.get('popularity', 0.0)
+                    ))
+                session.merge(CatalogSync(genre_id=genre_id, certification=certification, year_range=year_range, synced_at=now))
+                session.commit()
+
+                refreshed += 1
+                logger.info("Synced %s/%s/%s: %d movies, %d enriched", genre, certification, year_range, len(movies), enriched)
+
+    return refreshed
+
+@click.command('sync-catalog')
+@click.option('--max-age', type=int, default=TMDB_CATALOG_MAX_AGE, show_default=True,
+              help='Refresh combinations last synced more than this many seconds ago.')
+@click.option('--pages', type=int, default=TMDB_CATALOG_PAGES, show_default=True,
+              help='Discover pages to mirror per combination.')
+def sync_catalog_command(max_age, pages):
+    """Mirror TMDB discover results into the local catalog."""
+    ensure_schema()
+    if tmdb_client.limiter is not None:
+        # A batch sync should pace itself to the budget rather than shed its own requests
+        tmdb_client.limiter.max_waits = dict(tmdb_client.limiter.max_waits, background=None)
+    refreshed = sync_catalog(max_age=max_age, pages=pages)
+    click.echo(f"Refreshed {refreshed} catalog combinations.")
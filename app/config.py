@@ -4,4 +4,138 @@ from dotenv import load_dotenv
 load_dotenv()
 
 TMDB_API_KEY = os.getenv('TMDB_API_KEY', 'your-fallback-api-key-if-needed')
+TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///users.db')
+
+# Maximum number of concurrent watch-provider/trailer lookups per process
+TMDB_ENRICH_WORKERS = int(os.getenv('TMDB_ENRICH_WORKERS', '10'))
+
+# Shared TMDB HTTP client: keep-alive pool size, timeouts (seconds) and retry backoff
+TMDB_POOL_SIZE = int(os.getenv('TMDB_POOL_SIZE', str(TMDB_ENRICH_WORKERS)))
+TMDB_CONNECT_TIMEOUT = float(os.getenv('TMDB_CONNECT_TIMEOUT', '3.05'))
+TMDB_READ_TIMEOUT = float(os.getenv('TMDB_READ_TIMEOUT', '10'))
+TMDB_MAX_RETRIES = int(os.getenv('TMDB_MAX_RETRIES', '3'))
+TMDB_BACKOFF_BASE = float(os.getenv('TMDB_BACKOFF_BASE', '0.5'))
+TMDB_BACKOFF_MAX = float(os.getenv('TMDB_BACKOFF_MAX', '8'))
+
+# Connections the async (ASGI) TMDB client may hold open at once
+TMDB_ASYNC_MAX_CONNECTIONS = int(os.getenv('TMDB_ASYNC_MAX_CONNECTIONS', '100'))
+
+# Client-side TMDB rate limit (requests/sec, 0 disables) shared by every call. 'sqlite' shares the
+# bucket between worker processes. Enrichment and background calls leave a reserve of the burst for
+# discover; discover and enrichment wait up to TMDB_RATE_MAX_WAIT seconds, background work is shed.
+TMDB_RATE_LIMIT = float(os.getenv('TMDB_RATE_LIMIT', '40'))
+TMDB_RATE_BURST = float(os.getenv('TMDB_RATE_BURST', str(TMDB_RATE_LIMIT)))
+TMDB_RATE_BACKEND = os.getenv('TMDB_RATE_BACKEND', 'memory')
+TMDB_RATE_PATH = os.getenv('TMDB_RATE_PATH', 'tmdb_ratelimit.db')
+TMDB_RATE_MAX_WAIT = float(os.getenv('TMDB_RATE_MAX_WAIT', '2'))
+TMDB_RATE_RESERVE_ENRICHMENT = float(os.getenv('TMDB_RATE_RESERVE_ENRICHMENT', '0.2'))
+TMDB_RATE_RESERVE_BACKGROUND = float(os.getenv('TMDB_RATE_RESERVE_BACKGROUND', '0.5'))
+
+# TMDB response cache: 'memory' (per process) or 'sqlite' (shared by all workers, survives restarts)
+TMDB_CACHE_BACKEND = os.getenv('TMDB_CACHE_BACKEND', 'memory')
+TMDB_CACHE_PATH = os.getenv('TMDB_CACHE_PATH', 'tmdb_cache.db')
+TMDB_CACHE_MAX_ENTRIES = int(os.getenv('TMDB_CACHE_MAX_ENTRIES', '10000'))
+TMDB_CACHE_MAX_BYTES = int(os.getenv('TMDB_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+TMDB_CACHE_TTL_DISCOVER = int(os.getenv('TMDB_CACHE_TTL_DISCOVER', '3600'))
+# Movie details carry watch providers, which change daily; TMDB_CACHE_TTL_PROVIDERS is the older name
+TMDB_CACHE_TTL_DETAILS = int(os.getenv('TMDB_CACHE_TTL_DETAILS', os.getenv('TMDB_CACHE_TTL_PROVIDERS', '86400')))
+
+# Country whose watch providers are returned and stored unless a request asks for another one
+TMDB_WATCH_REGION = os.getenv('TMDB_WATCH_REGION', 'US')
+
+# Local TMDB catalog mirror: serve /recommend from synced tables while younger than max age (seconds)
+TMDB_CATALOG_ENABLED = os.getenv('TMDB_CATALOG_ENABLED', 'true').lower() == 'true'
+TMDB_CATALOG_MAX_AGE = int(os.getenv('TMDB_CATALOG_MAX_AGE', '86400'))
+TMDB_CATALOG_PAGES = int(os.getenv('TMDB_CATALOG_PAGES', '1'))
+
+# Database connection pool (ignored for in-memory SQLite) and SQLite lock wait in milliseconds
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '3600'))
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+
+# Recommendation history page sizes: returned with /login (0 disables) and the /history default/maximum
+HISTORY_LOGIN_PAGE_SIZE = int(os.getenv('HISTORY_LOGIN_PAGE_SIZE', '20'))
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '20'))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', '100'))
+
+# Serialized first history pages (/login, /history), kept per user and history version for up to TTL seconds
+HISTORY_BODY_CACHE_SIZE = int(os.getenv('HISTORY_BODY_CACHE_SIZE', '1000'))
+HISTORY_BODY_CACHE_TTL = int(os.getenv('HISTORY_BODY_CACHE_TTL', '300'))
+
+# JSON responses at least this many bytes are gzip or brotli compressed for clients that accept it; 0 disables
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+
+# Signed session tokens issued at /login. Set SECRET_KEY so tokens stay valid across workers and restarts.
+SECRET_KEY = os.getenv('SECRET_KEY') or os.urandom(32).hex()
+SESSION_TOKEN_TTL = int(os.getenv('SESSION_TOKEN_TTL', '86400'))
+SESSION_TOKEN_CACHE_SIZE = int(os.getenv('SESSION_TOKEN_CACHE_SIZE', '10000'))
+
+# Password hashing: PBKDF2 iterations for new hashes, and the process pool that runs them
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '100000'))
+KDF_POOL_WORKERS = int(os.getenv('KDF_POOL_WORKERS', str(os.cpu_count() or 1)))
+KDF_QUEUE_DEPTH = int(os.getenv('KDF_QUEUE_DEPTH', str(4 * (os.cpu_count() or 1))))
+
+# Production server (gunicorn.conf.py). SERVER_WORKERS=0 starts two workers per CPU plus one and
+# SERVER_THREADS=0 gives each four request threads per CPU; workers are replaced after about SERVER_MAX_REQUESTS
+SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '0'))
+SERVER_THREADS = int(os.getenv('SERVER_THREADS', '0'))
+SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', '5000'))
+SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', '60'))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))
+
+# Write-behind persistence for /recommend: rows are flushed by a background thread in batches
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '0.5'))
+
+# Most preference sets accepted by one POST /recommend/batch
+BATCH_MAX_SPECS = int(os.getenv('BATCH_MAX_SPECS', '10'))
+
+# Stale-while-revalidate for recommendation results: entries are fresh for the discover TTL,
+# then served stale for up to REFRESH_STALE_TTL seconds while a background refresh runs.
+# Hot keys are refreshed REFRESH_AHEAD seconds before expiry within REFRESH_TMDB_RATE requests/sec.
+REFRESH_ENABLED = os.getenv('REFRESH_ENABLED', 'true').lower() == 'true'
+REFRESH_STALE_TTL = int(os.getenv('REFRESH_STALE_TTL', '3600'))
+REFRESH_AHEAD = int(os.getenv('REFRESH_AHEAD', '60'))
+REFRESH_INTERVAL = float(os.getenv('REFRESH_INTERVAL', '1'))
+REFRESH_HOT_KEYS = int(os.getenv('REFRESH_HOT_KEYS', '50'))
+REFRESH_MAX_KEYS = int(os.getenv('REFRESH_MAX_KEYS', '1000'))
+REFRESH_CONCURRENCY = int(os.getenv('REFRESH_CONCURRENCY', '2'))
+REFRESH_TMDB_RATE = float(os.getenv('REFRESH_TMDB_RATE', '5'))
+
+# Slow request profiling: a PROFILE_SAMPLE_RATE share of requests runs under cProfile and the
+# profile is written to PROFILE_DIR when the request took longer than PROFILE_SLOW_REQUEST_MS (0 disables)
+PROFILE_SLOW_REQUEST_MS = float(os.getenv('PROFILE_SLOW_REQUEST_MS', '0'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0.1'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+# Per-endpoint TMDB circuit breakers: over the last BREAKER_WINDOW calls (at least BREAKER_MIN_CALLS),
+# a failure share of BREAKER_FAILURE_RATE opens the breaker; calls slower than BREAKER_SLOW_CALL_SECONDS
+# count as failures. An open breaker refuses calls for BREAKER_OPEN_SECONDS (doubling on failed
+# recovery up to BREAKER_MAX_OPEN_SECONDS), then lets BREAKER_HALF_OPEN_CALLS probes through.
+BREAKER_ENABLED = os.getenv('BREAKER_ENABLED', 'true').lower() == 'true'
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', '20'))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '10'))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv('BREAKER_SLOW_CALL_SECONDS', '5'))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '30'))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv('BREAKER_MAX_OPEN_SECONDS', '300'))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv('BREAKER_HALF_OPEN_CALLS', '3'))
+
+# Apply pending schema migrations on the first request of each process. With 'false', run
+# 'flask --app run migrate' before starting the app; workers then refuse to serve an outdated schema.
+AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'true').lower() == 'true'
+
+# History-aware ranking for /recommend: movies the user was already shown are skipped, fetching up to
+# RANKING_MAX_PAGES discover pages for unseen ones, which are scored by popularity, recency (fading
+# over RANKING_RECENCY_YEARS) and the user's genre affinity with the given weights
+RANKING_ENABLED = os.getenv('RANKING_ENABLED', 'true').lower() == 'true'
+RANKING_MAX_PAGES = int(os.getenv('RANKING_MAX_PAGES', '5'))
+RANKING_RECENCY_YEARS = float(os.getenv('RANKING_RECENCY_YEARS', '30'))
+RANKING_WEIGHT_POPULARITY = float(os.getenv('RANKING_WEIGHT_POPULARITY', '0.6'))
+RANKING_WEIGHT_RECENCY = float(os.getenv('RANKING_WEIGHT_RECENCY', '0.2'))
+RANKING_WEIGHT_AFFINITY = float(os.getenv('RANKING_WEIGHT_AFFINITY', '0.2'))
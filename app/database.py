@@ -1,8 +1,72 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from app.config import DATABASE_URL
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session as OrmSession, declarative_base, sessionmaker, scoped_session
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, SQLITE_BUSY_TIMEOUT
+
+def _engine_options(url):
+    options = {'echo': False}
+    if url.get_backend_name() == 'sqlite':
+        # Connections are handed between request threads by the pool
+        options['connect_args'] = {'check_same_thread': False}
+        if url.database in (None, '', ':memory:'):
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT)}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Return the process-wide engine, creating it on first use so importing the app stays cheap."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = make_url(DATABASE_URL)
+                engine = create_engine(url, **_engine_options(url))
+                if url.get_backend_name() == 'sqlite':
+                    event.listen(engine, 'connect', _set_sqlite_pragmas)
+                _engine = engine
+    return _engine
+
+def dispose_engine(close=True):
+    """Drop the engine's pooled connections, if it exists. Around fork() a child passes close=False,
+    leaving the connections it inherited to the parent instead of closing them under it."""
+    if _engine is not None:
+        _engine.dispose(close=close)
+
+class LazySession(OrmSession):
+    """Session that binds to get_engine() when it first needs a connection, unless given a bind."""
+
+    def get_bind(self, mapper=None, **kwargs):
+        if self.bind is None and kwargs.get('bind') is None:
+            kwargs['bind'] = get_engine()
+        return super().get_bind(mapper, **kwargs)
 
-engine = create_engine(DATABASE_URL, echo=False)
 Base = declarative_base()
-Session = sessionmaker(bind=engine)
-session = Session()
+Session = sessionmaker(class_=LazySession)
+# One session per thread; create_app removes it when each request's app context tears down
+session = scoped_session(Session)
+
+def release_connection():
+    """End the thread's read-only transaction, returning its pooled connection before slow work such as TMDB calls.
+
+    A session with pending changes is left alone; the next query simply checks a connection out again.
+    """
+    db_session = session()
+    if db_session.in_transaction() and not (db_session.new or db_session.dirty or db_session.deleted):
+        db_session.commit()
@@ -0,0 +1,118 @@
+import base64
+import datetime
+import json
+from collections import Counter
+from sqlalchemy import and_, or_
+from app.config import HISTORY_BODY_CACHE_SIZE, HISTORY_BODY_CACHE_TTL
+from app.database import session
+from app.models import User, UserRecommendation, Movie
+from app.movies import load_providers
+from app.responses import Body, BodyCache, dumps, json_object
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(recommended_at, rec_id):
+    raw = json.dumps([recommended_at.isoformat(), rec_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        recommended_at, rec_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.datetime.fromisoformat(recommended_at), int(rec_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor(cursor)
+
+class HistoryPage:
+    """A user's first history page, serialized once and shared by /login and /history."""
+
+    def __init__(self, recommendations, next_cursor):
+        self.recommendations = dumps(recommendations)
+        self.next_cursor = dumps(next_cursor)
+        self._body = None
+
+    @property
+    def body(self):
+        """The /history response body."""
+        if self._body is None:
+            self._body = Body(json_object(recommendations=self.recommendations, next_cursor=self.next_cursor))
+        return self._body
+
+# Keyed by (user_id, history_version, limit); the TTL bounds staleness from catalog updates to movie details
+history_pages = BodyCache(HISTORY_BODY_CACHE_SIZE, HISTORY_BODY_CACHE_TTL)
+
+def get_history_version(user_id):
+    """The user's history version, or None if there is no such user."""
+    return session.query(User.history_version).filter(User.id == user_id).scalar()
+
+def get_first_history_page(user_id, version, limit):
+    """Return the HistoryPage of the user's newest `limit` entries, reading the rows only when not cached."""
+    key = (user_id, version, limit)
+    page = history_pages.get(key)
+    if page is None:
+        page = HistoryPage(*get_history_page(user_id, limit))
+        history_pages.set(key, page)
+    return page
+
+def get_viewing_profile(user_id):
+    """Return (ids of every movie shown to the user, Counter of the genres they asked for) from one query."""
+    rows = session.query(UserRecommendation.movie_id, UserRecommendation.genre).filter(
+        UserRecommendation.user_id == user_id
+    ).all()
+    return {row.movie_id for row in rows}, Counter(row.genre for row in rows if row.genre)
+
+def get_history_page(user_id, limit, cursor=None, genre=None, since=None, until=None):
+    """Return (recommendations, next_cursor) for a user's history, newest first.
+
+    Uses keyset pagination over (recommended_at, id) so every page is a bounded
+    index range scan regardless of how much history the user has.
+    """
+    query = session.query(
+        UserRecommendation.id,
+        UserRecommendation.movie_id,
+        Movie.title,
+        Movie.overview,
+        Movie.release_date,
+        Movie.poster_path,
+        Movie.trailer_url,
+        UserRecommendation.genre,
+        UserRecommendation.recommended_at
+    ).join(Movie, Movie.id == UserRecommendation.movie_id).filter(UserRecommendation.user_id == user_id)
+
+    if cursor is not None:
+        cursor_at, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            UserRecommendation.recommended_at < cursor_at,
+            and_(UserRecommendation.recommended_at == cursor_at, UserRecommendation.id < cursor_id)
+        ))
+    if genre is not None:
+        query = query.filter(UserRecommendation.genre == genre)
+    if since is not None:
+        query = query.filter(UserRecommendation.recommended_at >= since)
+    if until is not None:
+        query = query.filter(UserRecommendation.recommended_at < until)
+
+    rows = query.order_by(UserRecommendation.recommended_at.desc(), UserRecommendation.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].recommended_at, rows[-1].id)
+
+    providers = load_providers(session, [row.movie_id for row in rows])
+
+    recommendations = [
+        {
+            'movie_id': row.movie_id,
+            'title': row.title,
+            'overview': row.overview,
+            'release_date': row.release_date,
+            'poster_path': row.poster_path,
+            'watch_providers': providers.get(row.movie_id, []),
+            'trailer_url': row.trailer_url,
+            'genre': row.genre,
+            'recommended_at': row.recommended_at.isoformat()
+        }
+        for row in rows
+    ]
+    return recommendations, next_cursor
@@ -0,0 +1,223 @@
+"""In-process request instrumentation, exported in Prometheus text format at /metrics.
+
+Histograms and counters are plain dicts guarded by a lock, so recording a
+sample costs a bisect and a few additions. Values are per process; with several
+workers each one reports its own.
+"""
+import bisect
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+from app.config import PROFILE_SLOW_REQUEST_MS, PROFILE_SAMPLE_RATE, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cache hits (sub-millisecond) to slow TMDB round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(series[:-1]) if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {values[-1]}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+request_seconds = Histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests.', ['method', 'endpoint']
+)
+requests_total = Counter('http_requests_total', 'HTTP responses sent.', ['method', 'endpoint', 'status'])
+phase_seconds = Histogram(
+    'request_phase_duration_seconds',
+    'Time spent in each phase of a request (user_lookup, discover, enrichment, serialization, commit).',
+    ['phase']
+)
+password_hash_seconds = Histogram(
+    'password_hash_duration_seconds', 'Time spent hashing passwords, including the wait for a KDF worker.',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+tmdb_request_seconds = Histogram(
+    'tmdb_request_duration_seconds', 'Time spent on uncached TMDB calls, including retries.', ['endpoint']
+)
+tmdb_responses_total = Counter(
+    'tmdb_responses_total',
+    'Final TMDB response status per uncached call ("error" when none arrived, "rate_limited" when shed locally).',
+    ['endpoint', 'status']
+)
+profiles_total = Counter('slow_request_profiles_total', 'cProfile captures written for slow requests.')
+
+REGISTRY = [
+    request_seconds, requests_total, phase_seconds, password_hash_seconds,
+    tmdb_request_seconds, tmdb_responses_total, profiles_total
+]
+
+def timed(phase):
+    """Context manager recording the duration of one request phase."""
+    return phase_seconds.time(phase=phase)
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def clear():
+    for metric in REGISTRY:
+        metric.clear()
+
+class SlowRequestProfiler:
+    """Profiles a random sample of requests and keeps the cProfile output of those slower than the threshold.
+
+    Disabled when threshold_ms is 0. A request that was not sampled is never
+    profiled, so the overhead is limited to the sampled share.
+    """
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_REQUEST_MS, sample_rate=PROFILE_SAMPLE_RATE, directory=PROFILE_DIR):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.directory = directory
+
+    def start(self):
+        """Return a running profiler if this request is sampled, else None."""
+        if self.threshold_ms <= 0 or random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return None
+        return profiler
+
+    def finish(self, profiler, endpoint, elapsed):
+        profiler.disable()
+        if elapsed * 1000 < self.threshold_ms:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{int(elapsed * 1000)}ms-{os.getpid()}.prof"
+        )
+        profiler.dump_stats(path)
+        profiles_total.inc()
+        logger.info("Slow request %s took %.0f ms; profile written to %s", endpoint, elapsed * 1000, path)
+        return path
+
+slow_request_profiler = SlowRequestProfiler()
+
+def _record(started, profiler, method, endpoint, status):
+    elapsed = time.perf_counter() - started
+    request_seconds.observe(elapsed, method=method, endpoint=endpoint)
+    requests_total.inc(method=method, endpoint=endpoint, status=status)
+    if profiler is not None:
+        slow_request_profiler.finish(profiler, endpoint, elapsed)
+
+def init_app(app):
+    """Time every request of a Flask app and sample slow ones with cProfile."""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.profiler = slow_request_profiler.start()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        args = (started, g.pop('profiler', None), request.method, request.endpoint or 'unmatched', response.status_code)
+        if response.is_streamed:
+            # Streamed bodies (NDJSON) are produced after this hook; measure until the last chunk is sent
+            response.call_on_close(lambda: _record(*args))
+        else:
+            _record(*args)
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exception=None):
+        # after_request is skipped when an exception propagates; the profiler must still be
+        # disabled, or it stays enabled on this thread and blocks every later sample
+        started = g.pop('request_started', None)
+        if started is not None:
+            _record(started, g.pop('profiler', None), request.method, request.endpoint or 'unmatched', 500)
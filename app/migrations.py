@@ -0,0 +1,163 @@
+import json
+import logging
+import threading
+import click
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select, text
+from app.config import AUTO_MIGRATE
+from app.database import Base, Session, get_engine
+from app.models import UserRecommendation
+from app.movies import upsert_movies
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata: it records which migrations ran, it is not part of the model
+schema_version = Table('schema_version', MetaData(), Column('version', Integer, nullable=False))
+
+def _baseline(engine):
+    """Version 1: create missing tables and bring databases from before versioning up to date."""
+    Base.metadata.create_all(engine)
+    upgrade(engine)
+
+def _history_version(engine):
+    """Version 2: users_cli.history_version."""
+    if 'history_version' in {column['name'] for column in inspect(engine).get_columns('users_cli')}:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users_cli ADD COLUMN history_version INTEGER NOT NULL DEFAULT 0"))
+
+def _token_version(engine):
+    """Version 3: users_cli.token_version."""
+    if 'token_version' in {column['name'] for column in inspect(engine).get_columns('users_cli')}:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users_cli ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+
+# Applied in order; a database at version N has had the first N. Append new steps, never edit old ones.
+MIGRATIONS = [_baseline, _history_version, _token_version]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def current_version(engine):
+    """Return the database's schema version, or 0 if it was never migrated."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table('schema_version'):
+            return 0
+        return conn.execute(select(schema_version.c.version)).scalar() or 0
+
+def migrate(engine):
+    """Apply pending migrations and return how many ran."""
+    schema_version.create(engine, checkfirst=True)
+    version = current_version(engine)
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info("Applying schema migration %d (%s)", number, step.__name__)
+        step(engine)
+        with engine.begin() as conn:
+            conn.execute(schema_version.delete())
+            conn.execute(schema_version.insert().values(version=number))
+    return SCHEMA_VERSION - version
+
+_schema_checked = False
+_schema_lock = threading.Lock()
+
+def schema_checked():
+    return _schema_checked
+
+def ensure_schema():
+    """Check the schema once per process: migrate it, or with AUTO_MIGRATE off, fail if it is behind."""
+    global _schema_checked
+    if _schema_checked:
+        return
+    with _schema_lock:
+        if _schema_checked:
+            return
+        engine = get_engine()
+        if AUTO_MIGRATE:
+            migrate(engine)
+        else:
+            version = current_version(engine)
+            if version != SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database schema is at version {version}, expected {SCHEMA_VERSION}; run 'flask --app run migrate'"
+                )
+        _schema_checked = True
+
+@click.command('migrate')
+def migrate_command():
+    """Bring the database schema up to date."""
+    applied = migrate(get_engine())
+    click.echo(f"Applied {applied} migration(s); schema is at version {SCHEMA_VERSION}.")
+
+def upgrade(engine):
+    """Apply schema changes that create_all cannot make to tables that already exist."""
+    inspector = inspect(engine)
+    user_columns = {column['name'] for column in inspector.get_columns('users_cli')}
+    recommendation_columns = {column['name'] for column in inspector.get_columns('user_recommendations')}
+    movie_columns = {column['name'] for column in inspector.get_columns('movies')}
+    with engine.begin() as conn:
+        if 'password_iterations' not in user_columns:
+            conn.execute(text("ALTER TABLE users_cli ADD COLUMN password_iterations INTEGER"))
+        if 'genre' not in recommendation_columns:
+            conn.execute(text("ALTER TABLE user_recommendations ADD COLUMN genre VARCHAR(50)"))
+
+        # Recommendations are upserted per (user_id, movie_id); keep only the latest duplicate
+        recommendation_indexes = {index['name'] for index in inspector.get_indexes('user_recommendations')}
+        if 'uq_user_recommendations_user_movie' not in recommendation_indexes:
+            conn.execute(text(
+                "DELETE FROM user_recommendations WHERE id NOT IN "
+                "(SELECT MAX(id) FROM user_recommendations GROUP BY user_id, movie_id)"
+            ))
+
+        if 'watch_providers' in movie_columns:
+            _normalize_movie_providers(conn)
+        if 'title' in recommendation_columns:
+            _normalize_recommendations(conn, recommendation_indexes)
+
+    for index in UserRecommendation.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+def _movie_details(row):
+    return {
+        'movie_id': row['movie_id'],
+        'title': row['title'],
+        'overview': row['overview'],
+        'release_date': row['release_date'],
+        'poster_path': row['poster_path'],
+        'trailer_url': row['trailer_url'],
+        'watch_providers': json.loads(row['watch_providers']) if row['watch_providers'] else []
+    }
+
+def _normalize_movie_providers(conn):
+    """Move the movies.watch_providers JSON column into providers/movie_providers."""
+    rows = conn.execute(text(
+        "SELECT id AS movie_id, title, overview, release_date, poster_path, trailer_url, watch_providers, updated_at FROM movies"
+    )).mappings().all()
+    db_session = Session(bind=conn)
+    upsert_movies(db_session, [_movie_details(row) for row in rows])
+    db_session.flush()
+    # Keep the original sync times so the catalog's staleness checks are unaffected
+    for row in rows:
+        conn.execute(text("UPDATE movies SET updated_at = :updated_at WHERE id = :movie_id"), dict(row))
+    conn.execute(text("ALTER TABLE movies DROP COLUMN watch_providers"))
+
+def _normalize_recommendations(conn, recommendation_indexes):
+    """Move per-row movie details out of user_recommendations into the shared movie tables."""
+    rows = conn.execute(text(
+        "SELECT movie_id, title, overview, release_date, poster_path, trailer_url, watch_providers "
+        "FROM user_recommendations ORDER BY id"
+    )).mappings().all()
+    known = {movie_id for (movie_id,) in conn.execute(text("SELECT id FROM movies"))}
+    # Later rows win, so each movie keeps the details it was most recently recommended with
+    latest = {row['movie_id']: row for row in rows if row['movie_id'] not in known}
+
+    db_session = Session(bind=conn)
+    upsert_movies(db_session, [_movie_details(row) for row in latest.values()])
+    db_session.flush()
+
+    for index_name in recommendation_indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    conn.execute(text("ALTER TABLE user_recommendations RENAME TO user_recommendations_old"))
+    UserRecommendation.__table__.create(conn)
+    conn.execute(text(
+        "INSERT INTO user_recommendations (id, user_id, movie_id, genre, recommended_at) "
+        "SELECT id, user_id, movie_id, genre, recommended_at FROM user_recommendations_old"
+    ))
+    conn.execute(text("DROP TABLE user_recommendations_old"))
@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -9,18 +9,64 @@ class User(Base):
     username = Column(String(80), unique=True, nullable=False)
     salt = Column(String(64), nullable=False)
     password_hash = Column(String(128), nullable=False)
+    password_iterations = Column(Integer, nullable=True)  # NULL means LEGACY_HASH_ITERATIONS
+    # Bumped whenever the user's history is written; keys the cached history bodies
+    history_version = Column(Integer, nullable=False, default=0, server_default='0')
+    # Signed into session tokens; bumped on password changes to revoke the tokens issued before
+    token_version = Column(Integer, nullable=False, default=0, server_default='0')
     recommendations = relationship("UserRecommendation", back_populates="user")
 
 class UserRecommendation(Base):
     __tablename__ = 'user_recommendations'
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users_cli.id'), nullable=False)
-    movie_id = Column(Integer, nullable=False)
+    movie_id = Column(Integer, ForeignKey('movies.id'), nullable=False)
+    genre = Column(String(50), nullable=True)
+    recommended_at = Column(DateTime, default=datetime.datetime.utcnow)
+    user = relationship("User", back_populates="recommendations")
+    movie = relationship("Movie")
+    __table_args__ = (
+        Index('ix_user_recommendations_user_recommended_at', 'user_id', 'recommended_at', 'id'),
+        Index('uq_user_recommendations_user_movie', 'user_id', 'movie_id', unique=True),
+    )
+
+# Movie details shared by every user's recommendations and the local catalog mirror
+class Movie(Base):
+    __tablename__ = 'movies'
+    id = Column(Integer, primary_key=True)  # TMDB movie id
     title = Column(String(255), nullable=False)
     overview = Column(Text, nullable=True)
     release_date = Column(String(20), nullable=True)
     poster_path = Column(String(255), nullable=True)
-    watch_providers = Column(Text, nullable=True)  # JSON string
     trailer_url = Column(String(500), nullable=True)
-    recommended_at = Column(DateTime, default=datetime.datetime.utcnow)
-    user = relationship("User", back_populates="recommendations")
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Provider(Base):
+    __tablename__ = 'providers'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+class MovieProvider(Base):
+    __tablename__ = 'movie_providers'
+    movie_id = Column(Integer, ForeignKey('movies.id'), primary_key=True)
+    provider_id = Column(Integer, ForeignKey('providers.id'), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)  # order TMDB listed the provider in
+
+# Local mirror of the TMDB catalog, filled by the sync-catalog command
+class CatalogEntry(Base):
+    __tablename__ = 'catalog_entries'
+    genre_id = Column(Integer, primary_key=True)
+    certification = Column(String(10), primary_key=True)
+    movie_id = Column(Integer, ForeignKey('movies.id'), primary_key=True)
+    release_year = Column(Integer, nullable=True)
+    popularity = Column(Float, nullable=False, default=0.0)
+    __table_args__ = (
+        Index('ix_catalog_entries_lookup', 'genre_id', 'certification', 'release_year', 'popularity'),
+    )
+
+class CatalogSync(Base):
+    __tablename__ = 'catalog_syncs'
+    genre_id = Column(Integer, primary_key=True)
+    certification = Column(String(10), primary_key=True)
+    year_range = Column(String(20), primary_key=True)
+    synced_at = Column(DateTime, nullable=False)
@@ -0,0 +1,82 @@
+import datetime
+from collections import defaultdict
+import importlib
+from app.models import Movie, Provider, MovieProvider
+
+# Dialects whose insert() supports ON CONFLICT; imported on first use, not with the app
+_UPSERT_DIALECTS = ('sqlite', 'postgresql')
+
+def dialect_insert(db_session):
+    """Return the dialect's insert() supporting ON CONFLICT, or None if it has none."""
+    name = db_session.get_bind().dialect.name
+    if name not in _UPSERT_DIALECTS:
+        return None
+    return importlib.import_module(f'sqlalchemy.dialects.{name}').insert
+
+def upsert_movies(db_session, recommendations):
+    """Store movie details and watch providers from recommendation dicts in the shared tables."""
+    movies = {rec['movie_id']: rec for rec in recommendations}
+    if not movies:
+        return
+
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            'id': movie_id,
+            'title': rec['title'],
+            'overview': rec['overview'],
+            'release_date': rec['release_date'],
+            'poster_path': rec['poster_path'],
+            'trailer_url': rec['trailer_url'],
+            'updated_at': now
+        }
+        for movie_id, rec in movies.items()
+    ]
+    insert = dialect_insert(db_session)
+    if insert is None:
+        for row in rows:
+            db_session.merge(Movie(**row))
+    else:
+        stmt = insert(Movie).values(rows)
+        db_session.execute(stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != 'id'}
+        ))
+
+    provider_ids = _provider_ids(db_session, {name for rec in movies.values() for name in rec['watch_providers']})
+    db_session.query(MovieProvider).filter(MovieProvider.movie_id.in_(list(movies))).delete(synchronize_session=False)
+    links = [
+        {'movie_id': movie_id, 'provider_id': provider_ids[name], 'position': position}
+        for movie_id, rec in movies.items()
+        for position, name in enumerate(dict.fromkeys(rec['watch_providers']))
+    ]
+    if links:
+        db_session.execute(MovieProvider.__table__.insert(), links)
+
+def _provider_ids(db_session, names):
+    if not names:
+        return {}
+    insert = dialect_insert(db_session)
+    if insert is None:
+        known = {name for (name,) in db_session.query(Provider.name).filter(Provider.name.in_(names))}
+        db_session.add_all(Provider(name=name) for name in names - known)
+        db_session.flush()
+    else:
+        db_session.execute(insert(Provider).values([{'name': name} for name in names]).on_conflict_do_nothing())
+    return dict(db_session.query(Provider.name, Provider.id).filter(Provider.name.in_(names)).all())
+
+def load_providers(db_session, movie_ids):
+    """Return {movie_id: [provider names]} for many movies with one joined query."""
+    providers = defaultdict(list)
+    if not movie_ids:
+        return providers
+    rows = (
+        db_session.query(MovieProvider.movie_id, Provider.name)
+        .join(Provider, Provider.id == MovieProvider.provider_id)
+        .filter(MovieProvider.movie_id.in_(list(set(movie_ids))))
+        .order_by(MovieProvider.movie_id, MovieProvider.position)
+        .all()
+    )
+    for movie_id, name in rows:
+        providers[movie_id].append(name)
+    return providers
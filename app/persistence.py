@@ -0,0 +1,148 @@
+import atexit
+import datetime
+import logging
+import queue
+import threading
+import time
+from app.config import WRITE_BEHIND_ENABLED, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL
+from app.database import Session, session
+from app.models import User, UserRecommendation
+from app.movies import dialect_insert, upsert_movies
+
+logger = logging.getLogger(__name__)
+
+_REFRESHED_COLUMNS = ('genre', 'recommended_at')
+
+def recommendation_rows(user_id, genre, recommendations, recommended_at=None):
+    """Turn /recommend results into rows carrying both the movie details and the user's history entry."""
+    recommended_at = recommended_at or datetime.datetime.utcnow()
+    return [dict(rec, user_id=user_id, genre=genre, recommended_at=recommended_at) for rec in recommendations]
+
+def upsert_recommendations(db_session, rows):
+    """Store the movies, then write history with one multi-row INSERT.
+
+    A movie the user was already shown gets a fresh recommended_at instead of a new row.
+    The history version of every affected user is bumped in the same transaction.
+    """
+    if not rows:
+        return
+    upsert_movies(db_session, rows)
+    db_session.query(User).filter(User.id.in_({row['user_id'] for row in rows})).update(
+        {User.history_version: User.history_version + 1}, synchronize_session=False
+    )
+
+    # A movie can only be updated once per statement; keep the latest row for each
+    rows = list({
+        (row['user_id'], row['movie_id']): {
+            'user_id': row['user_id'],
+            'movie_id': row['movie_id'],
+            'genre': row['genre'],
+            'recommended_at': row['recommended_at']
+        }
+        for row in rows
+    }.values())
+
+    insert = dialect_insert(db_session)
+    if insert is None:
+        _upsert_rows_individually(db_session, rows)
+        return
+
+    stmt = insert(UserRecommendation).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'movie_id'],
+        set_={column: stmt.excluded[column] for column in _REFRESHED_COLUMNS}
+    )
+    db_session.execute(stmt)
+
+def _upsert_rows_individually(db_session, rows):
+    for row in rows:
+        existing = db_session.query(UserRecommendation).filter_by(user_id=row['user_id'], movie_id=row['movie_id']).first()
+        if existing is None:
+            db_session.add(UserRecommendation(**row))
+        else:
+            for column in _REFRESHED_COLUMNS:
+                setattr(existing, column, row[column])
+
+class WriteBehindQueue:
+    """Persists recommendation rows off the response path.
+
+    Rows are batched by a background thread and flushed in one transaction when
+    batch_size rows are waiting or flush_interval seconds have passed.
+    """
+
+    def __init__(self, batch_size=WRITE_BEHIND_BATCH_SIZE, flush_interval=WRITE_BEHIND_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.flushed_rows = 0
+        self.flushes = 0
+
+    def submit(self, rows):
+        self._ensure_started()
+        for row in rows:
+            self._queue.put(row)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='recommendation-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        db_session = Session()
+        try:
+            upsert_recommendations(db_session, batch)
+            db_session.commit()
+            self.flushes += 1
+            self.flushed_rows += len(batch)
+        except Exception:
+            db_session.rollback()
+            logger.exception("Failed to persist %d recommendation rows", len(batch))
+        finally:
+            db_session.close()
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every submitted row has been written."""
+        self._queue.join()
+
+    def stats(self):
+        return {'pending': self._queue.qsize(), 'flushes': self.flushes, 'flushed_rows': self.flushed_rows}
+
+write_behind = WriteBehindQueue()
+atexit.register(write_behind.flush)
+
+def save_recommendations(user_id, genre, recommendations):
+    _save_rows(recommendation_rows(user_id, genre, recommendations))
+
+def save_recommendation_batch(user_id, results):
+    """Save several (genre, recommendations) results for one user in one transaction."""
+    recommended_at = datetime.datetime.utcnow()
+    _save_rows([
+        row for genre, recommendations in results
+        for row in recommendation_rows(user_id, genre, recommendations, recommended_at)
+    ])
+
+def _save_rows(rows):
+    if WRITE_BEHIND_ENABLED:
+        write_behind.submit(rows)
+        return
+    upsert_recommendations(session, rows)
+    session.commit()
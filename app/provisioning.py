@@ -0,0 +1,168 @@
+"""Bulk account creation from a CSV or NDJSON file, for migrating an existing user base.
+
+Records are streamed in batches. Usernames that already exist are dropped
+with one query per batch before any hashing, the remaining passwords are hashed
+across a process pool and each batch is inserted in a single transaction. The
+number of records handled is checkpointed after every batch, so an interrupted
+run resumes where it stopped; re-reading a batch that was committed just before
+an interruption only finds existing usernames.
+"""
+import csv
+import itertools
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import click
+from app.config import PASSWORD_HASH_ITERATIONS
+from app.database import session
+from app.migrations import ensure_schema
+from app.models import User
+from app.movies import dialect_insert
+from app.utils import hash_password
+
+USERNAME_MAX_LENGTH = User.__table__.c.username.type.length
+# Keeps IN (...) lists below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+def read_users(path, file_format=None):
+    """Yield (username, password) pairs from a CSV file with a header row, or from NDJSON objects.
+
+    The format follows the file extension unless given. A record without both
+    fields yields (None, None) so record positions stay stable for resuming.
+    """
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            records = csv.DictReader(f)
+        else:
+            records = (_parse_json(line) for line in f if line.strip())
+        for record in records:
+            username, password = record.get('username'), record.get('password')
+            if isinstance(username, str) and isinstance(password, str) and username and password:
+                yield username, password
+            else:
+                yield None, None
+
+def _parse_json(line):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return {}
+    return record if isinstance(record, dict) else {}
+
+def existing_usernames(db_session, usernames):
+    found = set()
+    usernames = list(usernames)
+    for start in range(0, len(usernames), LOOKUP_CHUNK_SIZE):
+        chunk = usernames[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(username for (username,) in db_session.query(User.username).filter(User.username.in_(chunk)))
+    return found
+
+def insert_users(db_session, rows):
+    """Insert user rows with one executemany and return how many were inserted.
+
+    Rows whose username appeared meanwhile are skipped where supported.
+    """
+    insert = dialect_insert(db_session)
+    if insert is None:
+        return db_session.execute(User.__table__.insert(), rows).rowcount
+    return db_session.execute(insert(User.__table__).on_conflict_do_nothing(index_elements=['username']), rows).rowcount
+
+def provision_users(records, batch_size=1000, workers=None, iterations=PASSWORD_HASH_ITERATIONS, on_batch=None):
+    """Create accounts for (username, password) records and return counts of created, existing and invalid ones.
+
+    workers=0 hashes on the calling thread. on_batch(stats) is called after each
+    committed batch, with stats['records'] counting every record handled so far.
+    """
+    stats = {'records': 0, 'created': 0, 'existing': 0, 'invalid': 0}
+    workers = os.cpu_count() if workers is None else workers
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    records = iter(records)
+    try:
+        for batch in iter(lambda: list(itertools.islice(records, batch_size)), []):
+            stats['records'] += len(batch)
+            # The first record of a username wins, as it would with /create_account
+            candidates = {}
+            for username, password in batch:
+                if username is None or len(username) > USERNAME_MAX_LENGTH:
+                    stats['invalid'] += 1
+                elif username in candidates:
+                    stats['existing'] += 1
+                else:
+                    candidates[username] = password
+            existing = existing_usernames(session, candidates)
+            stats['existing'] += len(existing)
+            new_users = [(username, password) for username, password in candidates.items() if username not in existing]
+
+            salts = [uuid.uuid4().hex for _ in new_users]
+            passwords = [password for _, password in new_users]
+            if executor is None:
+                hashes = [hash_password(password, salt, iterations) for password, salt in zip(passwords, salts)]
+            else:
+                chunksize = max(1, len(new_users) // (4 * workers))
+                hashes = list(executor.map(hash_password, passwords, salts, itertools.repeat(iterations), chunksize=chunksize))
+
+            created = 0
+            if new_users:
+                created = insert_users(session, [
+                    {'username': username, 'salt': salt, 'password_hash': password_hash, 'password_iterations': iterations}
+                    for (username, _), salt, password_hash in zip(new_users, salts, hashes)
+                ])
+                session.commit()
+            # Usernames created by someone else since the lookup were skipped by the insert
+            stats['existing'] += len(new_users) - created
+            stats['created'] += created
+            if on_batch is not None:
+                on_batch(dict(stats))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return stats
+
+def _write_checkpoint(path, records):
+    # Replaced atomically so an interruption never leaves a truncated count
+    with open(path + '.tmp', 'w') as f:
+        f.write(str(records))
+    os.replace(path + '.tmp', path)
+
+@click.command('provision-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; by default .csv files are CSV and anything else NDJSON.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Users hashed and inserted per transaction.')
+@click.option('--workers', type=int, default=os.cpu_count(), show_default=True,
+              help='Hashing processes; 0 hashes in this process.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='Where the number of handled records is kept for resuming (default PATH.progress).')
+@click.option('--restart', is_flag=True, help='Ignore an existing checkpoint and read the file from the start.')
+def provision_users_command(path, file_format, batch_size, workers, checkpoint, restart):
+    """Create accounts in bulk from a CSV (username,password header) or NDJSON file."""
+    ensure_schema()
+    checkpoint = checkpoint or path + '.progress'
+    skip = 0
+    if not restart and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            skip = int(f.read().strip() or 0)
+        click.echo(f"Resuming after {skip} records (checkpoint {checkpoint}).")
+
+    started = time.perf_counter()
+
+    def report(stats):
+        _write_checkpoint(checkpoint, skip + stats['records'])
+        elapsed = time.perf_counter() - started
+        click.echo(
+            f"{skip + stats['records']} records: {stats['created']} created, {stats['existing']} existing, "
+            f"{stats['invalid']} invalid ({stats['created'] / elapsed:.1f} users/sec)"
+        )
+
+    records = itertools.islice(read_users(path, file_format), skip, None)
+    stats = provision_users(records, batch_size=batch_size, workers=workers, on_batch=report)
+    elapsed = time.perf_counter() - started
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    click.echo(
+        f"Created {stats['created']} users in {elapsed:.1f} s ({stats['created'] / elapsed if elapsed else 0:.1f} users/sec); "
+        f"skipped {stats['existing']} existing and {stats['invalid']} invalid records."
+    )
@@ -0,0 +1,105 @@
+"""Scores recommendation candidates by popularity, recency and the user's genre affinity.
+
+Uses NumPy when it is installed and an equivalent pure Python loop otherwise.
+NumPy is imported on the first ranking, not with the app, to keep startup fast.
+"""
+import datetime
+import importlib
+import math
+from app.config import (
+    RANKING_WEIGHT_POPULARITY, RANKING_WEIGHT_RECENCY, RANKING_WEIGHT_AFFINITY, RANKING_RECENCY_YEARS
+)
+
+WEIGHTS = (RANKING_WEIGHT_POPULARITY, RANKING_WEIGHT_RECENCY, RANKING_WEIGHT_AFFINITY)
+
+_numpy = None
+
+def numpy():
+    """Return the numpy module, or None if it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            _numpy = importlib.import_module('numpy')
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+def release_year(release_date):
+    """Year of a TMDB 'YYYY-MM-DD' release date, or None if it is missing or malformed."""
+    try:
+        return int(release_date[:4])
+    except (TypeError, ValueError):
+        return None
+
+def genre_affinity(genres):
+    """Turn the genre ids of a user's history into {genre_id: share of their history}."""
+    total = sum(genres.values())
+    return {genre_id: count / total for genre_id, count in genres.items()} if total else {}
+
+def rank(popularity, years, genre_ids, affinity, limit, weights=WEIGHTS, current_year=None):
+    """Return the indexes of the `limit` best candidates, best first.
+
+    Each score is a weighted sum of popularity (log-scaled, relative to the most
+    popular candidate), recency (1 for this year, falling to 0 over
+    RANKING_RECENCY_YEARS; 0 when the year is unknown) and affinity (the user's
+    history share of the candidate's genres). Ties keep the input order.
+    """
+    current_year = current_year or datetime.date.today().year
+    if not popularity:
+        return []
+    np = numpy()
+    if np is None:
+        return _rank_python(popularity, years, genre_ids, affinity, limit, weights, current_year)
+
+    log_popularity = np.log1p(np.maximum(np.asarray(popularity, dtype=float), 0))
+    top = log_popularity.max()
+    popularity_score = log_popularity / top if top > 0 else np.zeros_like(log_popularity)
+
+    years = np.array([np.nan if year is None else year for year in years], dtype=float)
+    recency = np.nan_to_num(np.clip(1 - (current_year - years) / RANKING_RECENCY_YEARS, 0, 1), nan=0.0)
+
+    # Candidates x genres membership matrix, multiplied by the user's affinity per genre
+    genres = sorted(affinity)
+    columns = {genre_id: column for column, genre_id in enumerate(genres)}
+    membership = np.zeros((len(popularity), len(genres)))
+    for row, ids in enumerate(genre_ids):
+        for genre_id in ids:
+            if genre_id in columns:
+                membership[row, columns[genre_id]] = 1
+    affinity_score = membership @ np.array([affinity[genre_id] for genre_id in genres]) if genres else 0
+
+    scores = weights[0] * popularity_score + weights[1] * recency + weights[2] * affinity_score
+    return np.argsort(-scores, kind='stable')[:limit].tolist()
+
+def _rank_python(popularity, years, genre_ids, affinity, limit, weights, current_year):
+    log_popularity = [math.log1p(max(value, 0)) for value in popularity]
+    top = max(log_popularity)
+    scores = []
+    for log_value, year, ids in zip(log_popularity, years, genre_ids):
+        popularity_score = log_value / top if top > 0 else 0.0
+        recency = 0.0 if year is None else min(1.0, max(0.0, 1 - (current_year - year) / RANKING_RECENCY_YEARS))
+        affinity_score = sum(affinity.get(genre_id, 0.0) for genre_id in set(ids))
+        scores.append(weights[0] * popularity_score + weights[1] * recency + weights[2] * affinity_score)
+    return sorted(range(len(scores)), key=lambda index: -scores[index])[:limit]
+
+def choose(candidates, seen, affinity, limit):
+    """Pick up to `limit` candidates the user has not seen, best first.
+
+    candidates are (movie_id, popularity, release_date, genre_ids, item) tuples
+    in upstream order; the chosen items are returned. If fewer than `limit`
+    unseen candidates exist, seen ones fill the remaining places, most popular first.
+    """
+    # A movie can show up on two discover pages when popularity shifts between fetches
+    unique = list({candidate[0]: candidate for candidate in candidates}.values())
+    unseen = [candidate for candidate in unique if candidate[0] not in seen]
+    order = rank(
+        [candidate[1] or 0 for candidate in unseen],
+        [release_year(candidate[2]) for candidate in unseen],
+        [candidate[3] for candidate in unseen],
+        affinity, limit
+    )
+    chosen = [unseen[index][4] for index in order]
+    if len(chosen) < limit:
+        repeats = sorted((candidate for candidate in unique if candidate[0] in seen), key=lambda c: -(c[1] or 0))
+        chosen.extend(candidate[4] for candidate in repeats[:limit - len(chosen)])
+    return chosen
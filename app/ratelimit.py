@@ -0,0 +1,156 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import requests
+
+# Lower-priority work may only spend tokens above a reserved share of the bucket,
+# so user-facing discover calls keep headroom when the budget runs low.
+PRIORITIES = ('discover', 'enrichment', 'background')
+
+class RateLimited(requests.RequestException):
+    """Raised when a TMDB call is shed because the request budget is exhausted."""
+
+class MemoryBucket:
+    """Token bucket for a single process."""
+
+    blocking = False
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, floor):
+        """Take one token if at least `floor` tokens stay behind; else return seconds until that is possible."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens - 1 >= floor:
+                self._tokens -= 1
+                return 0.0
+            return (floor + 1 - self._tokens) / self.rate
+
+class SQLiteBucket:
+    """Token bucket stored in a SQLite file so every worker process on the host shares one budget."""
+
+    # take() waits on the database file (up to its 5 s busy timeout), so async callers run it on a worker thread
+    blocking = True
+
+    def __init__(self, path, rate, burst, name='tmdb'):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, floor):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limit WHERE name = ?", (self.name,)).fetchone()
+            tokens = float(self.burst) if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            wait = 0.0
+            if tokens - 1 >= floor:
+                tokens -= 1
+            else:
+                wait = (floor + 1 - tokens) / self.rate
+            conn.execute("INSERT OR REPLACE INTO rate_limit (name, tokens, updated_at) VALUES (?, ?, ?)", (self.name, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+class RateLimiter:
+    """Paces TMDB calls through a token bucket with priority classes.
+
+    Each priority may only draw the bucket down to its reserve (a fraction of the
+    burst) and waits at most max_waits[priority] seconds (None waits indefinitely)
+    for a token before the call is shed with RateLimited.
+    """
+
+    def __init__(self, bucket, reserves, max_waits):
+        self.bucket = bucket
+        self.floors = {priority: reserves.get(priority, 0.0) * bucket.burst for priority in PRIORITIES}
+        self.max_waits = max_waits
+        self._lock = threading.Lock()
+        self._counters = {priority: {'granted': 0, 'delayed': 0, 'shed': 0} for priority in PRIORITIES}
+
+    def _count(self, priority, name):
+        with self._lock:
+            self._counters[priority][name] += 1
+
+    def _deadline(self, priority):
+        max_wait = self.max_waits.get(priority, 0.0)
+        return None if max_wait is None else time.monotonic() + max_wait
+
+    def _try_acquire(self, priority, deadline, delayed):
+        """Return 0 once a token is granted, else the seconds to wait before trying again."""
+        wait = self.bucket.take(self.floors[priority])
+        if wait == 0:
+            self._count(priority, 'granted')
+            if delayed:
+                self._count(priority, 'delayed')
+            return 0
+        if deadline is not None and time.monotonic() + wait > deadline:
+            self._count(priority, 'shed')
+            raise RateLimited(f"TMDB request budget exhausted for {priority} calls")
+        return wait
+
+    def acquire(self, priority='discover'):
+        deadline = self._deadline(priority)
+        delayed = False
+        while True:
+            wait = self._try_acquire(priority, deadline, delayed)
+            if not wait:
+                return
+            delayed = True
+            time.sleep(wait)
+
+    async def acquire_async(self, priority='discover'):
+        """Like acquire, but waits without blocking the event loop."""
+        deadline = self._deadline(priority)
+        delayed = False
+        while True:
+            if self.bucket.blocking:
+                wait = await asyncio.to_thread(self._try_acquire, priority, deadline, delayed)
+            else:
+                wait = self._try_acquire(priority, deadline, delayed)
+            if not wait:
+                return
+            delayed = True
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            return {priority: dict(counters) for priority, counters in self._counters.items()}
+
+def create_rate_limiter(rate, burst, backend, path, reserves, max_waits):
+    """Build the limiter for the configured backend, or None when rate is 0 (unlimited)."""
+    if rate <= 0:
+        return None
+    if backend == 'sqlite':
+        bucket = SQLiteBucket(path, rate, burst)
+    elif backend == 'memory':
+        bucket = MemoryBucket(rate, burst)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return RateLimiter(bucket, reserves, max_waits)
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    __slots__ = ('value', 'fetched_at')
+
+    def __init__(self, value, fetched_at):
+        self.value = value
+        self.fetched_at = fetched_at
+
+class StaleWhileRevalidate:
+    """Caches loader results per key and refreshes the hottest keys before they expire.
+
+    Fresh entries are served directly. Entries past their TTL but inside the stale
+    window are still served while a background refresh runs. A scheduler thread
+    refreshes the most requested keys shortly before they expire, within a budget of
+    upstream requests per second (each refresh is assumed to cost refresh_cost
+    requests) and at most `concurrency` refreshes at a time.
+    """
+
+    def __init__(self, loader, ttl, stale_ttl, refresh_ahead, hot_keys, max_keys,
+                 concurrency, upstream_rate, refresh_cost, interval=1.0, autostart=False, clock=time.monotonic):
+        self.loader = loader
+        self.autostart = autostart
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.hot_keys = hot_keys
+        self.max_keys = max_keys
+        self.upstream_rate = upstream_rate
+        self.refresh_cost = refresh_cost
+        self.interval = interval
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._scores = {}
+        self._refreshing = set()
+        self._concurrency = concurrency
+        self._executor = None
+        self._scheduler = None
+        self._budget = float(refresh_cost)
+        self._budget_at = clock()
+        self._counters = {
+            'fresh_hits': 0, 'stale_hits': 0, 'misses': 0,
+            'refreshes': 0, 'refresh_failures': 0, 'refreshes_skipped': 0
+        }
+        self._lag_total = 0.0
+        self._lag_max = None
+
+    def get(self, key):
+        """Return (value, status_code) for key, loading it on a miss."""
+        entry, fresh = self._lookup(key)
+        if entry is not None:
+            if not fresh:
+                self._schedule_refresh(key)
+            return entry.value, 200
+
+        value, status_code = self.loader(key, refresh=False)
+        if status_code == 200:
+            self._store(key, value)
+        return value, status_code
+
+    async def get_async(self, key, loader):
+        """get() for coroutines: a miss awaits loader(key) instead; refreshes still run on the refresh threads."""
+        entry, fresh = self._lookup(key)
+        if entry is not None:
+            if not fresh:
+                self._schedule_refresh(key)
+            return entry.value, 200
+
+        value, status_code = await loader(key)
+        if status_code == 200:
+            self._store(key, value)
+        return value, status_code
+
+    def _lookup(self, key):
+        """Count a request for key and return (entry, fresh); entry is None on a miss or once too stale."""
+        if self.autostart and self._scheduler is None:
+            self.start()
+        now = self.clock()
+        with self._lock:
+            self._scores[key] = self._scores.get(key, 0.0) + 1.0
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.fetched_at < self.ttl:
+                self._counters['fresh_hits'] += 1
+                return entry, True
+            if entry is not None and now - entry.fetched_at < self.ttl + self.stale_ttl:
+                self._counters['stale_hits'] += 1
+                return entry, False
+            self._counters['misses'] += 1
+            return None, False
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = _Entry(value, self.clock())
+            if len(self._entries) > self.max_keys:
+                coldest = min(self._entries, key=lambda k: self._scores.get(k, 0.0))
+                del self._entries[coldest]
+                self._scores.pop(coldest, None)
+
+    def _take_budget(self, now):
+        self._budget = min(self.refresh_cost + self.upstream_rate, self._budget + (now - self._budget_at) * self.upstream_rate)
+        self._budget_at = now
+        if self._budget < self.refresh_cost:
+            return False
+        self._budget -= self.refresh_cost
+        return True
+
+    def _schedule_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing or len(self._refreshing) >= self._concurrency:
+                return False
+            if not self._take_budget(self.clock()):
+                self._counters['refreshes_skipped'] += 1
+                return False
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix='swr-refresh')
+        self._executor.submit(self._refresh, key)
+        return True
+
+    def _refresh(self, key):
+        try:
+            value, status_code = self.loader(key, refresh=True)
+            if status_code != 200:
+                raise RuntimeError(f"refresh returned {status_code}")
+        except Exception:
+            logger.warning("Background refresh failed for %s", key, exc_info=True)
+            with self._lock:
+                self._counters['refresh_failures'] += 1
+        else:
+            with self._lock:
+                previous = self._entries.get(key)
+                if previous is not None:
+                    # Positive lag means the entry was already stale when the new value landed
+                    lag = self.clock() - (previous.fetched_at + self.ttl)
+                    self._lag_total += lag
+                    self._lag_max = lag if self._lag_max is None else max(self._lag_max, lag)
+                self._counters['refreshes'] += 1
+            self._store(key, value)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def tick(self):
+        """Refresh hot keys that will expire within refresh_ahead seconds, then decay popularity."""
+        now = self.clock()
+        with self._lock:
+            hot = sorted(self._scores, key=self._scores.get, reverse=True)[:self.hot_keys]
+            due = [
+                key for key in hot
+                if key in self._entries and now - self._entries[key].fetched_at >= self.ttl - self.refresh_ahead
+            ]
+            # Halve scores each tick so popularity reflects recent traffic; forget keys that went cold
+            self._scores = {key: score / 2 for key, score in self._scores.items() if score >= 0.1 or key in self._entries}
+        for key in due:
+            self._schedule_refresh(key)
+
+    def start(self):
+        with self._lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._run, name='swr-scheduler', daemon=True)
+            self._scheduler.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Refresh scheduler tick failed")
+
+    def peek(self, key):
+        """Return the last value loaded for key however old it is, or None; does not count as a request."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scores.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            lookups = counters['fresh_hits'] + counters['stale_hits'] + counters['misses']
+            counters['hit_ratio'] = (counters['fresh_hits'] + counters['stale_hits']) / lookups if lookups else 0.0
+            counters['refresh_lag_avg'] = self._lag_total / counters['refreshes'] if counters['refreshes'] else 0.0
+            counters['refresh_lag_max'] = self._lag_max
+            counters['entries'] = len(self._entries)
+            counters['refreshing'] = len(self._refreshing)
+            return counters
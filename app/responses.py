@@ -0,0 +1,170 @@
+"""Fast JSON encoding, response compression and cached response bodies.
+
+orjson and brotli are used when installed and imported on first use; without
+them responses are encoded with the json module and compressed with gzip only.
+"""
+import gzip
+import hashlib
+import importlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import parse_accept_header
+from app.config import COMPRESS_MIN_BYTES
+
+GZIP_LEVEL = 6
+# Brotli's default quality (11) is meant for static assets; 5 compresses better than gzip at a similar cost
+BROTLI_QUALITY = 5
+
+_modules = {}
+
+def optional_module(name):
+    """Return an installed module by name, or None; the import is attempted once."""
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except ImportError:
+            _modules[name] = None
+    return _modules[name]
+
+def dumps(obj):
+    """Serialize obj to compact JSON bytes."""
+    orjson = optional_module('orjson')
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def json_object(**encoded):
+    """Join already serialized JSON values into the bytes of one object, in argument order."""
+    return b'{' + b','.join(dumps(key) + b':' + value for key, value in encoded.items()) + b'}'
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding with orjson when it is installed.
+
+    Output matches the default provider: keys are sorted and values orjson
+    does not handle natively (dates, decimals, ...) go through the default hook.
+    """
+
+    def dumps(self, obj, **kwargs):
+        orjson = optional_module('orjson')
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(orjson, obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        orjson = optional_module('orjson')
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(orjson, obj) + b'\n', mimetype=self.mimetype)
+
+    def _orjson_dumps(self, orjson, obj):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=options)
+
+def choose_encoding(accept_encoding, size, min_bytes=COMPRESS_MIN_BYTES):
+    """Content coding ('br', 'gzip' or None) to send a body of `size` bytes in."""
+    if not min_bytes or size < min_bytes:
+        return None
+    available = ['br', 'gzip'] if optional_module('brotli') is not None else ['gzip']
+    return parse_accept_header(accept_encoding).best_match(available)
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return optional_module('brotli').compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+class Body:
+    """A serialized response body with a strong ETag; compressed variants are made once and kept."""
+
+    def __init__(self, data):
+        self.data = data
+        self.etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        self._encoded = {None: data}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = compress(self.data, encoding)
+            return self._encoded[encoding]
+
+    def matches(self, if_none_match):
+        """True if a parsed If-None-Match header names this body in any of its encodings."""
+        return if_none_match.star_tag or any(tag == self.etag or tag.startswith(self.etag + '-') for tag in if_none_match)
+
+def cached_response(body, status=200):
+    """Respond with a Body: 304 when the client already has it, otherwise the encoding it accepts best."""
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), len(body.data))
+    if body.matches(request.if_none_match):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body.encoded(encoding), status=status, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    # The variants differ in bytes, so each carries its own strong tag; a 304 names the variant a 200 would send,
+    # so caches holding the compressed response can freshen it
+    response.set_etag(f"{body.etag}-{encoding}" if encoding else body.etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def compress_response(response):
+    """after_request hook compressing large JSON responses for clients that accept gzip or brotli."""
+    if (response.direct_passthrough or response.is_streamed or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers or response.status_code < 200 or response.status_code == 204):
+        return response
+    data = response.get_data()
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), len(data))
+    if encoding:
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+class BodyCache:
+    """LRU of serialized bodies with a TTL, for responses rebuilt from the database otherwise."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+def init_app(app):
+    """Encode JSON with orjson when installed and compress large JSON responses."""
+    app.json = JSONProvider(app)
+    app.after_request(compress_response)
@@ -1,12 +1,28 @@
 import uuid
-import json
-from flask import Blueprint, request, jsonify
-from app.models import User, UserRecommendation
+from flask import Blueprint, Response, request, jsonify
+from app.config import HISTORY_LOGIN_PAGE_SIZE, SESSION_TOKEN_TTL, PASSWORD_HASH_ITERATIONS
+from app.models import User
 from app.database import session
-from app.utils import hash_password
+from app.history import get_first_history_page
+from app.responses import dumps, json_object
+from app.tokens import issue_token, token_cache
+from app.utils import kdf_pool, KDFBusy, LEGACY_HASH_ITERATIONS
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(KDFBusy)
+def kdf_busy(error):
+    return jsonify({"error": "Server is busy, please retry shortly."}), 503, {"Retry-After": "1"}
+
+def _verify_password(user, password):
+    iterations = user.password_iterations or LEGACY_HASH_ITERATIONS
+    return kdf_pool.hash(password, user.salt, iterations) == user.password_hash
+
+def _set_password(user, password):
+    user.salt = uuid.uuid4().hex
+    user.password_hash = kdf_pool.hash(password, user.salt, PASSWORD_HASH_ITERATIONS)
+    user.password_iterations = PASSWORD_HASH_ITERATIONS
+
 @auth_bp.route('/create_account', methods=['POST'])
 def create_account():
     data = request.get_json(force=True)
@@ -20,10 +36,8 @@ def create_account():
     if session.query(User).filter_by(username=username).first():
         return jsonify({"error": "Username already exists."}), 409
 
-    salt = uuid.uuid4().hex
-    password_hash = hash_password(password, salt)
-
-    new_user = User(username=username, salt=salt, password_hash=password_hash)
+    new_user = User(username=username)
+    _set_password(new_user, password)
     session.add(new_user)
     session.commit()
 
@@ -42,30 +56,29 @@ def login():
     if not user:
         return jsonify({"error": "Invalid username or password."}), 401
 
-    password_hash = hash_password(password, user.salt)
-    if password_hash != user.password_hash:
+    if not _verify_password(user, password):
         return jsonify({"error": "Invalid username or password."}), 401
 
-    # Fetch previously recommended movies for this user
-    user_recs = session.query(UserRecommendation).filter_by(user_id=user.id).order_by(UserRecommendation.recommended_at.desc()).all()
-    previous_recommendations = []
-    for rec in user_recs:
-        watch_providers = json.loads(rec.watch_providers) if rec.watch_providers else []
-        previous_recommendations.append({
-            'movie_id': rec.movie_id,
-            'title': rec.title,
-            'overview': rec.overview,
-            'release_date': rec.release_date,
-            'poster_path': rec.poster_path,
-            'watch_providers': watch_providers,
-            'trailer_url': rec.trailer_url,
-            'recommended_at': rec.recommended_at.isoformat()
-        })
-
-    return jsonify({
-        "message": "Login successful.",
-        "previous_recommendations": previous_recommendations
-    }), 200
+    # Transparently upgrade hashes made with an outdated iteration count
+    if (user.password_iterations or LEGACY_HASH_ITERATIONS) != PASSWORD_HASH_ITERATIONS:
+        _set_password(user, password)
+        session.commit()
+
+    # Only the most recent page of history is returned; older pages come from /history.
+    # It is spliced in already serialized, and only read from the database when the user's history changed.
+    previous_recommendations, next_cursor = b'[]', b'null'
+    if HISTORY_LOGIN_PAGE_SIZE > 0:
+        page = get_first_history_page(user.id, user.history_version, HISTORY_LOGIN_PAGE_SIZE)
+        previous_recommendations, next_cursor = page.recommendations, page.next_cursor
+
+    body = json_object(
+        message=dumps("Login successful."),
+        token=dumps(issue_token(user.id, user.token_version)),
+        expires_in=dumps(SESSION_TOKEN_TTL),
+        previous_recommendations=previous_recommendations,
+        next_cursor=next_cursor
+    )
+    return Response(body, mimetype='application/json'), 200
 
 @auth_bp.route('/update_password', methods=['POST'])
 def update_password():
@@ -81,15 +94,13 @@ def update_password():
     if not user:
         return jsonify({"error": "Invalid username."}), 404
 
-    old_password_hash = hash_password(old_password, user.salt)
-    if old_password_hash != user.password_hash:
+    if not _verify_password(user, old_password):
         return jsonify({"error": "Invalid current password."}), 401
 
-    new_salt = uuid.uuid4().hex
-    new_password_hash = hash_password(new_password, new_salt)
-
-    user.salt = new_salt
-    user.password_hash = new_password_hash
+    _set_password(user, new_password)
+    # Sessions opened with the old password end here
+    user.token_version += 1
     session.commit()
+    token_cache.discard_user(user.id)
 
     return jsonify({"message": "Password updated successfully."}), 200
@@ -1,7 +1,27 @@
-from flask import Blueprint
+from flask import Blueprint, jsonify
+from app.persistence import write_behind
+from app.tmdb import response_cache, query_flights, fetch_flights, recommendation_refresher, tmdb_breakers, tmdb_degraded
+from app.tmdb_client import tmdb_client
 
 health_bp = Blueprint('health', __name__)
 
 @health_bp.route("/health", methods=["GET"])
 def health_check():
-    return "OK", 200
+    # Still 200 while degraded: stored results are served, so the instance should stay in rotation
+    return jsonify({
+        "status": "degraded" if tmdb_degraded() else "ok",
+        "tmdb_breakers": {endpoint: breaker.stats() for endpoint, breaker in tmdb_breakers.items()}
+    }), 200
+
+@health_bp.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "tmdb_client": tmdb_client.stats(),
+        "tmdb_cache": response_cache.stats(),
+        "coalescing": {
+            "queries": query_flights.stats(),
+            "fetches": fetch_flights.stats()
+        },
+        "write_behind": write_behind.stats(),
+        "refresher": recommendation_refresher.stats()
+    }), 200
@@ -0,0 +1,48 @@
+import datetime
+from flask import Blueprint, request, jsonify
+from app.config import HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+from app.history import get_first_history_page, get_history_page, get_history_version, InvalidCursor
+from app.responses import cached_response
+from app.tokens import current_user_id
+
+history_bp = Blueprint('history', __name__)
+
+def _parse_date(value):
+    return datetime.datetime.fromisoformat(value) if value else None
+
+@history_bp.route('/history', methods=['GET'])
+def history():
+    user_id, error = current_user_id(request.args.get('username'))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
+    # The unfiltered first page is what returning clients poll: serve it cached, with an ETag
+    if not any(request.args.get(name) for name in ('cursor', 'genre', 'since', 'until')):
+        version = get_history_version(user_id)
+        if version is not None:
+            return cached_response(get_first_history_page(user_id, version, limit).body)
+
+    try:
+        since = _parse_date(request.args.get('since'))
+        until = _parse_date(request.args.get('until'))
+    except ValueError:
+        return jsonify({"error": "since and until must be ISO 8601 dates."}), 400
+
+    try:
+        recommendations, next_cursor = get_history_page(
+            user_id, limit,
+            cursor=request.args.get('cursor'),
+            genre=request.args.get('genre'),
+            since=since,
+            until=until
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor."}), 400
+
+    return jsonify({"recommendations": recommendations, "next_cursor": next_cursor}), 200
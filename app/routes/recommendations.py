@@ -1,11 +1,36 @@
 import json
-from flask import Blueprint, request, jsonify
-from app.models import User, UserRecommendation
-from app.database import session
-from app.tmdb import get_movie_recommendations_from_tmdb
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.config import BATCH_MAX_SPECS, TMDB_WATCH_REGION
+from app.metrics import timed
+from app.persistence import save_recommendations, save_recommendation_batch
+from app.tmdb import (
+    get_personalized_recommendations, get_batch_recommendations, get_degraded_recommendations,
+    stream_movie_recommendations, localize_providers, spec_error, tmdb_degraded
+)
+from app.tokens import current_user_id
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
+NDJSON = 'application/x-ndjson'
+
+def wants_stream(accept_header):
+    """True when the client asked for NDJSON with 'Accept: application/x-ndjson'."""
+    return NDJSON in [value.split(';')[0].strip() for value in accept_header.split(',')]
+
+def watch_region(value):
+    """Upper-cased country code of the optional 'region' field (default TMDB_WATCH_REGION), or None if malformed."""
+    if value is None:
+        return TMDB_WATCH_REGION
+    if isinstance(value, str) and len(value) == 2 and value.isascii() and value.isalpha():
+        return value.upper()
+    return None
+
+def degraded_fallback(user_id, genre, age_rating, year_range, status_code):
+    """Stored results to serve instead of a TMDB failure, or None to pass the error on."""
+    if status_code < 500:
+        return None
+    return get_degraded_recommendations(user_id, genre, age_rating, year_range)
+
 @recommendations_bp.route('/recommend', methods=['POST'])
 def recommend():
     data = request.get_json(force=True)
@@ -14,31 +39,119 @@ def recommend():
     age_rating = data.get('age_rating')
     year_range = data.get('year_range')
 
-    if not username or not genre or not age_rating or not year_range:
+    if not genre or not age_rating or not year_range or not (username or 'Authorization' in request.headers):
         return jsonify({"error": "username, genre, age_rating, and year_range are required."}), 400
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        return jsonify(error), 400
+    region = watch_region(data.get('region'))
+    if region is None:
+        return jsonify({"error": "region must be a two-letter country code."}), 400
+
+    with timed('user_lookup'):
+        user_id, error = current_user_id(username)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    if wants_stream(request.headers.get('Accept', '')):
+        return stream_recommendations(user_id, genre, age_rating, year_range, region)
+
+    recommendations, status_code = get_personalized_recommendations(user_id, genre, age_rating, year_range)
+    if status_code != 200:
+        # While TMDB is failing, answer from what we already have instead of an error
+        fallback = degraded_fallback(user_id, genre, age_rating, year_range, status_code)
+        if fallback is None:
+            return jsonify(recommendations), status_code
+        with timed('serialization'):
+            response = jsonify({"recommendations": fallback, "degraded": True})
+        return response, 200
+
+    with timed('commit'):
+        save_recommendations(user_id, genre, recommendations)
 
-    user = session.query(User).filter_by(username=username).first()
-    if not user:
-        return jsonify({"error": "Invalid username."}), 404
+    # History keeps TMDB_WATCH_REGION providers; other regions come from the cached movie details
+    payload = {"recommendations": localize_providers(recommendations, region)}
+    if tmdb_degraded('details'):
+        # Watch providers or trailers may be missing
+        payload["degraded"] = True
+    with timed('serialization'):
+        response = jsonify(payload)
+    return response, 200
 
-    recommendations, status_code = get_movie_recommendations_from_tmdb(genre, age_rating, year_range)
+@recommendations_bp.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    data = request.get_json(force=True)
+    specs = data.get('specs')
+
+    if not isinstance(specs, list) or not specs or not (data.get('username') or 'Authorization' in request.headers):
+        return jsonify({"error": "username and a non-empty list of specs are required."}), 400
+    if len(specs) > BATCH_MAX_SPECS:
+        return jsonify({"error": f"At most {BATCH_MAX_SPECS} specs are allowed per batch."}), 400
+    if not all(isinstance(spec, dict) and spec.get('genre') and spec.get('age_rating') and spec.get('year_range')
+               for spec in specs):
+        return jsonify({"error": "Each spec needs genre, age_rating, and year_range."}), 400
+    region = watch_region(data.get('region'))
+    if region is None:
+        return jsonify({"error": "region must be a two-letter country code."}), 400
+
+    with timed('user_lookup'):
+        user_id, error = current_user_id(data.get('username'))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    specs = [(spec['genre'], spec['age_rating'], spec['year_range']) for spec in specs]
+    results = get_batch_recommendations(specs)
+
+    with timed('commit'):
+        save_recommendation_batch(user_id, [
+            (genre, recommendations)
+            for (genre, _, _), (recommendations, status_code) in zip(specs, results) if status_code == 200
+        ])
+
+    response = []
+    enrichment_degraded = tmdb_degraded('details')
+    for (genre, age_rating, year_range), (recommendations, status_code) in zip(specs, results):
+        result = {"genre": genre, "age_rating": age_rating, "year_range": year_range, "status": status_code}
+        fallback = degraded_fallback(user_id, genre, age_rating, year_range, status_code)
+        if status_code == 200:
+            result["recommendations"] = localize_providers(recommendations, region)
+            if enrichment_degraded:
+                result["degraded"] = True
+        elif fallback is not None:
+            result.update(status=200, recommendations=fallback, degraded=True)
+        else:
+            result.update(recommendations)
+        response.append(result)
+    with timed('serialization'):
+        response = jsonify({"results": response})
+    return response, 200
+
+def _event(payload):
+    return json.dumps(payload) + '\n'
+
+def stream_recommendations(user_id, genre, age_rating, year_range, region=TMDB_WATCH_REGION):
+    """Send the discover results as soon as they arrive, then each movie once its providers and trailer resolve."""
+    recommendations, updates, status_code = stream_movie_recommendations(genre, age_rating, year_range, region)
     if status_code != 200:
-        return jsonify(recommendations), status_code
-
-    # Store recommendations in the database
-    for rec in recommendations:
-        watch_providers_json = json.dumps(rec['watch_providers']) if rec['watch_providers'] else None
-        new_rec = UserRecommendation(
-            user_id=user.id,
-            movie_id=rec['movie_id'],
-            title=rec['title'],
-            overview=rec['overview'],
-            release_date=rec['release_date'],
-            poster_path=rec['poster_path'],
-            watch_providers=watch_providers_json,
-            trailer_url=rec['trailer_url']
+        fallback = degraded_fallback(user_id, genre, age_rating, year_range, status_code)
+        if fallback is None:
+            return jsonify(recommendations), status_code
+        return Response(
+            _event({"event": "recommendations", "recommendations": fallback, "degraded": True}) + _event({"event": "done"}),
+            mimetype=NDJSON
         )
-        session.add(new_rec)
-    session.commit()
 
-    return jsonify({"recommendations": recommendations}), 200
+    def events():
+        # Providers of another region than the stored one only arrive with the movie events
+        first = recommendations if region == TMDB_WATCH_REGION else [
+            dict(rec, watch_providers=[]) for rec in recommendations
+        ]
+        yield _event({"event": "recommendations", "recommendations": first})
+        for index, recommendation in updates:
+            yield _event({"event": "movie", "index": index, "recommendation": recommendation})
+        with timed('commit'):
+            save_recommendations(user_id, genre, recommendations)
+        yield _event({"event": "done"})
+
+    # Proxies must pass each line through instead of buffering the whole response
+    return Response(stream_with_context(events()), mimetype=NDJSON, headers={'X-Accel-Buffering': 'no'})
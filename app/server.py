@@ -0,0 +1,35 @@
+"""Lifecycle hooks for serving the app from a preforking server (see gunicorn.conf.py).
+
+The master loads the app once, migrates the schema and imports the lazily
+loaded modules before forking, so every worker shares those pages
+copy-on-write instead of building its own copy.
+"""
+import gc
+from app import ranking, responses
+from app.database import dispose_engine
+from app.migrations import ensure_schema
+from app.persistence import write_behind
+from app.tmdb import enrichment_engine
+from app.utils import kdf_pool
+
+def warm_up():
+    """Run once in the master, after the app is loaded and before the first worker is forked."""
+    # Workers inherit the checked schema and skip the check on their first request
+    ensure_schema()
+    ranking.numpy()
+    for name in ('orjson', 'brotli'):
+        responses.optional_module(name)
+    # Connections must not be shared between processes
+    dispose_engine()
+    # Freezing keeps the garbage collector from writing to (and so copying) the shared objects in each worker
+    gc.freeze()
+
+def after_fork():
+    """Run in each worker right after it is forked."""
+    dispose_engine(close=False)
+
+def before_exit():
+    """Run in each worker as it stops, on shutdown, graceful reload or max_requests recycling."""
+    write_behind.flush()
+    enrichment_engine.shutdown()
+    kdf_pool.shutdown()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it is
+    still in flight wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+class _LeaderCancelled(Exception):
+    """Handed to followers when the caller running the shared call was cancelled, so they run it again."""
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                # Shield so a cancelled follower does not cancel the shared result
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # One client's disconnect must not fail the others; the first to get here leads a new call
+                continue
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.executed += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; followers (if any) re-raise it themselves
+            raise
+        finally:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
@@ -1,91 +1,580 @@
+import datetime
+import logging
+import time
+from collections import Counter
 import requests
-import json
-from app.config import TMDB_API_KEY
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.cache import ResponseCache, create_cache_backend
+from app.config import (
+    TMDB_ENRICH_WORKERS, TMDB_CATALOG_ENABLED, TMDB_CATALOG_MAX_AGE, TMDB_CACHE_BACKEND, TMDB_CACHE_PATH, TMDB_CACHE_MAX_ENTRIES, TMDB_CACHE_MAX_BYTES,
+    TMDB_CACHE_TTL_DISCOVER, TMDB_CACHE_TTL_DETAILS, TMDB_WATCH_REGION,
+    REFRESH_ENABLED, REFRESH_STALE_TTL, REFRESH_AHEAD, REFRESH_INTERVAL, REFRESH_HOT_KEYS, REFRESH_MAX_KEYS,
+    REFRESH_CONCURRENCY, REFRESH_TMDB_RATE,
+    BREAKER_ENABLED, BREAKER_FAILURE_RATE, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_SLOW_CALL_SECONDS,
+    BREAKER_OPEN_SECONDS, BREAKER_MAX_OPEN_SECONDS, BREAKER_HALF_OPEN_CALLS, RANKING_ENABLED, RANKING_MAX_PAGES
+)
+from app.breaker import CircuitBreaker, CircuitOpen, CLOSED
+from app.database import release_connection, session
+from app.history import get_history_page, get_viewing_profile
+from app.metrics import timed, tmdb_request_seconds, tmdb_responses_total
+from app.models import Movie, CatalogEntry, CatalogSync
+from app.movies import load_providers
+from app.ranking import choose, genre_affinity
+from app.ratelimit import RateLimited
+from app.refresher import StaleWhileRevalidate
+from app.singleflight import SingleFlight
+from app.tmdb_client import RETRY_STATUSES, tmdb_client
 
-def get_watch_providers(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/watch/providers"
-    params = {'api_key': TMDB_API_KEY}
-    response = requests.get(url, params=params)
-    data = response.json()
+logger = logging.getLogger(__name__)
+
+response_cache = ResponseCache(
+    create_cache_backend(TMDB_CACHE_BACKEND, TMDB_CACHE_PATH, TMDB_CACHE_MAX_ENTRIES, TMDB_CACHE_MAX_BYTES),
+    ttls={
+        'discover': TMDB_CACHE_TTL_DISCOVER,
+        'details': TMDB_CACHE_TTL_DETAILS
+    }
+)
+
+# One breaker per TMDB endpoint, shared by the sync and async paths
+tmdb_breakers = {
+    endpoint: CircuitBreaker(
+        endpoint, failure_rate=BREAKER_FAILURE_RATE, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+        slow_call_seconds=BREAKER_SLOW_CALL_SECONDS, open_seconds=BREAKER_OPEN_SECONDS,
+        max_open_seconds=BREAKER_MAX_OPEN_SECONDS, half_open_calls=BREAKER_HALF_OPEN_CALLS
+    )
+    for endpoint in ('discover', 'details')
+} if BREAKER_ENABLED else {}
+
+def tmdb_degraded(*endpoints):
+    """True if the breaker of any of the given endpoints (default: all) is not closed."""
+    return any(
+        breaker.state != CLOSED for endpoint, breaker in tmdb_breakers.items() if not endpoints or endpoint in endpoints
+    )
+
+def before_tmdb_call(endpoint):
+    """Return the endpoint's breaker (or None), raising CircuitOpen if it refuses the call."""
+    breaker = tmdb_breakers.get(endpoint)
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpen(f"TMDB {endpoint} circuit breaker is open")
+    return breaker
+
+def after_tmdb_call(endpoint, breaker, status_code, elapsed):
+    """Record an uncached TMDB call's outcome ('error', 'rate_limited' or an HTTP status) in metrics and the breaker."""
+    tmdb_request_seconds.observe(elapsed, endpoint=endpoint)
+    tmdb_responses_total.inc(endpoint=endpoint, status=status_code)
+    if breaker is None:
+        return
+    if status_code == 'rate_limited':
+        breaker.release()
+    else:
+        breaker.record(status_code != 'error' and status_code not in RETRY_STATUSES, elapsed)
+
+# Identical in-flight work is shared: whole recommendation queries, and individual TMDB fetches
+query_flights = SingleFlight()
+fetch_flights = SingleFlight()
+
+def fetch_json(endpoint, path, params=None, refresh=False, priority='discover'):
+    """Return (data, status_code) for a TMDB path, serving successful responses from the cache.
+
+    With refresh=True the cached copy is ignored and replaced by a fresh response.
+    Uncached calls are paced by the rate limiter at the given priority.
+    """
+    key = ResponseCache.make_key(endpoint, path, params)
+    if not refresh:
+        data = response_cache.get(endpoint, key)
+        if data is not None:
+            return data, 200
+    return fetch_flights.do(key, _fetch_and_cache, endpoint, key, path, params, refresh, priority)
 
-    if 'results' in data and 'US' in data['results']:
-        providers = data['results']['US']
-        streaming_providers = providers.get('flatrate', [])
-        streaming_names = [provider['provider_name'] for provider in streaming_providers]
-        return streaming_names
-    return []
+def _fetch_and_cache(endpoint, key, path, params, refresh, priority):
+    # Another flight may have filled the cache between our miss and becoming leader
+    data = None if refresh else response_cache.backend.get(key)
+    if data is not None:
+        return data, 200
 
-def get_movie_trailer(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/videos?api_key={TMDB_API_KEY}"
-    response = requests.get(url)
+    breaker = before_tmdb_call(endpoint)
+    status_code = 'error'
+    started = time.perf_counter()
+    try:
+        response = tmdb_client.get(path, params=params, priority=priority)
+        status_code = response.status_code
+    except RateLimited:
+        status_code = 'rate_limited'
+        raise
+    finally:
+        after_tmdb_call(endpoint, breaker, status_code, time.perf_counter() - started)
+    if status_code != 200:
+        return None, status_code
     data = response.json()
+    response_cache.set(endpoint, key, data)
+    return data, 200
 
-    if 'results' in data:
-        for video in data['results']:
-            if video['site'] == 'YouTube' and video['type'] == 'Trailer':
-                return f"https://www.youtube.com/embed/{video['key']}"
-    return None
+# Appended to /movie/{id} so one call also returns the trailers and every region's watch providers
+DETAILS_PARAMS = {'append_to_response': 'videos,watch/providers'}
 
-def get_movie_recommendations_from_tmdb(genre, age_rating, year_range):
-    genre_map = {
-        "Action": 28,
-        "Adventure": 12,
-        "Comedy": 35,
-        "Drama": 18,
-        "Fantasy": 14,
-        "Horror": 27,
-        "Mystery": 9648,
-        "Romance": 10749,
-        "Sci-Fi": 878,
-        "Thriller": 53
-    }
+def get_movie_details(movie_id, priority='enrichment'):
+    """Return parse_movie_details() of one /movie/{id} call, or None if TMDB had no details."""
+    data, _ = fetch_json('details', f"/movie/{movie_id}", params=DETAILS_PARAMS, priority=priority)
+    return parse_movie_details(data) if data else None
 
-    year_map = {
-        "2000-2010": (2000, 2010),
-        "2011-2015": (2011, 2015),
-        "2016-2020": (2016, 2020),
-        "2021-present": (2021, 2024)
-    }
+def parse_movie_details(data):
+    """Turn a /movie/{id}?append_to_response=videos,watch/providers response into a details dict.
+
+    'watch_providers' maps each region to its streaming provider names and
+    'trailer_url' is the first YouTube trailer (or None); the other detail
+    fields (runtime, genres, ...) are kept as TMDB sent them.
+    """
+    details = {'watch_providers': {}, 'trailer_url': None}
+    for key, value in data.items():
+        if key == 'watch/providers':
+            details['watch_providers'] = {
+                region: [provider['provider_name'] for provider in providers.get('flatrate', [])]
+                for region, providers in (value or {}).get('results', {}).items()
+            }
+        elif key == 'videos':
+            for video in (value or {}).get('results', []):
+                if video['site'] == 'YouTube' and video['type'] == 'Trailer':
+                    details['trailer_url'] = f"https://www.youtube.com/embed/{video['key']}"
+                    break
+        else:
+            details[key] = value
+    return details
+
+def enrichment(details, region=TMDB_WATCH_REGION):
+    """(watch_providers, trailer_url) of a movie for one region; ([], None) when its details are missing."""
+    if details is None:
+        return [], None
+    return details['watch_providers'].get(region, []), details['trailer_url']
+
+class EnrichmentEngine:
+    """Runs the per-movie detail lookups (watch providers and trailer in one call) on a bounded thread pool.
+
+    A failed lookup only leaves that movie without providers and trailer instead
+    of failing the whole recommendation request.
+    """
+
+    def __init__(self, max_workers=TMDB_ENRICH_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        if max_workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tmdb-enrich')
+
+    @staticmethod
+    def _lookup(movie_id, priority):
+        try:
+            with timed('enrichment'):
+                return get_movie_details(movie_id, priority)
+        except CircuitOpen:
+            return None
+        except Exception:
+            logger.warning("TMDB details lookup failed for movie %s", movie_id, exc_info=True)
+            return None
 
-    if genre not in genre_map:
-        return {"error": "Invalid genre."}, 400
-    if year_range not in year_map:
-        return {"error": "Invalid year range."}, 400
+    def map(self, fn, items):
+        """Return [fn(item) for item in items], run on the pool when there is one."""
+        if self._executor is None:
+            return [fn(item) for item in items]
+        return list(self._executor.map(fn, items))
 
-    start_year, end_year = year_map[year_range]
+    def details(self, movie_ids, priority='enrichment'):
+        """Return get_movie_details() for each movie (None where it failed), in the same order as movie_ids."""
+        if self._executor is None:
+            return [self._lookup(movie_id, priority) for movie_id in movie_ids]
+        futures = [self._executor.submit(self._lookup, movie_id, priority) for movie_id in movie_ids]
+        return [future.result() for future in futures]
 
-    url = "https://api.themoviedb.org/3/discover/movie"
+    def enrich(self, movie_ids, priority='enrichment', region=TMDB_WATCH_REGION):
+        """Return a list of (watch_providers, trailer_url) tuples in the same order as movie_ids."""
+        return [enrichment(details, region) for details in self.details(movie_ids, priority)]
+
+    def iter_details(self, movie_ids, priority='enrichment'):
+        """Yield (index, details) for each movie as soon as its lookup finishes; details is None where it failed."""
+        if self._executor is None:
+            for index, movie_id in enumerate(movie_ids):
+                yield index, self._lookup(movie_id, priority)
+            return
+
+        futures = {self._executor.submit(self._lookup, movie_id, priority): index for index, movie_id in enumerate(movie_ids)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+enrichment_engine = EnrichmentEngine()
+
+def localize_providers(recommendations, region):
+    """Copies of recommendations with another region's watch providers, read from the (usually cached) movie details.
+
+    Results are stored with TMDB_WATCH_REGION providers; for that region they are returned as they are.
+    """
+    if region == TMDB_WATCH_REGION:
+        return recommendations
+    details = enrichment_engine.details([rec['movie_id'] for rec in recommendations])
+    return [dict(rec, watch_providers=enrichment(movie, region)[0]) for rec, movie in zip(recommendations, details)]
+
+GENRE_MAP = {
+    "Action": 28,
+    "Adventure": 12,
+    "Comedy": 35,
+    "Drama": 18,
+    "Fantasy": 14,
+    "Horror": 27,
+    "Mystery": 9648,
+    "Romance": 10749,
+    "Sci-Fi": 878,
+    "Thriller": 53
+}
+
+YEAR_MAP = {
+    "2000-2010": (2000, 2010),
+    "2011-2015": (2011, 2015),
+    "2016-2020": (2016, 2020),
+    "2021-present": (2021, 2024)
+}
+
+# US certifications mirrored by the local catalog
+CERTIFICATIONS = ["G", "PG", "PG-13", "R", "NC-17"]
+
+def spec_error(genre, age_rating, year_range):
+    """The error dict for a request TMDB cannot be asked about, or None if the spec is valid."""
+    # Values come straight from request JSON and are used as dict keys, so anything but a string is rejected
+    if not isinstance(genre, str) or genre not in GENRE_MAP:
+        return {"error": "Invalid genre."}
+    if not isinstance(age_rating, str) or age_rating not in CERTIFICATIONS:
+        return {"error": "Invalid age rating."}
+    if not isinstance(year_range, str) or year_range not in YEAR_MAP:
+        return {"error": "Invalid year range."}
+    return None
+
+def discover_params(genre_id, age_rating, years, page=1):
+    start_year, end_year = years
     params = {
-        'api_key': TMDB_API_KEY,
-        'with_genres': genre_map[genre],
+        'with_genres': genre_id,
         'certification_country': 'US',
         'certification': age_rating,
         'primary_release_date.gte': f'{start_year}-01-01',
         'primary_release_date.lte': f'{end_year}-12-31',
         'sort_by': 'popularity.desc'
     }
+    if page > 1:
+        params['page'] = page
+    return params
 
-    response = requests.get(url, params=params)
-    data = response.json()
+def format_recommendation(movie, watch_providers, trailer_url):
+    """Build the recommendation dict returned by /recommend from a TMDB discover result."""
+    return {
+        'movie_id': movie['id'],
+        'title': movie['title'],
+        'overview': movie.get('overview', 'No overview available'),
+        'release_date': movie.get('release_date', 'Unknown release date'),
+        'poster_path': f"https://image.tmdb.org/t/p/w500{movie['poster_path']}" if movie.get('poster_path') else None,
+        'watch_providers': watch_providers,
+        'trailer_url': trailer_url
+    }
+
+def get_movie_recommendations_from_tmdb(genre, age_rating, year_range):
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        return error, 400
+
+    if TMDB_CATALOG_ENABLED:
+        mirrored = get_catalog_recommendations(GENRE_MAP[genre], age_rating, year_range)
+        if mirrored is not None:
+            return mirrored, 200
+
+    key = (genre, age_rating, year_range)
+    release_connection()
+    if REFRESH_ENABLED:
+        recommendations, status_code = recommendation_refresher.get(key)
+    else:
+        recommendations, status_code = _load_recommendations(key)
+    if status_code != 200:
+        return recommendations, status_code
+    # Coalesced callers share one result, so hand each of them their own dicts
+    return [dict(rec) for rec in recommendations], status_code
+
+def get_batch_recommendations(specs):
+    """Return one (recommendations, status_code) per (genre, age_rating, year_range) spec.
+
+    Discover calls for all specs run in parallel, and a movie that appears in
+    several specs has its providers and trailer looked up only once.
+    """
+    results = [None] * len(specs)
+    live = {}  # spec -> indexes that still need TMDB
+    for index, (genre, age_rating, year_range) in enumerate(specs):
+        error = spec_error(genre, age_rating, year_range)
+        if error is not None:
+            results[index] = (error, 400)
+        else:
+            mirrored = None
+            if TMDB_CATALOG_ENABLED:
+                mirrored = get_catalog_recommendations(GENRE_MAP[genre], age_rating, year_range)
+            if mirrored is not None:
+                results[index] = (mirrored, 200)
+            else:
+                live.setdefault((genre, age_rating, year_range), []).append(index)
+
+    if live:
+        release_connection()
+        # Discover calls only wait on TMDB, never on the pool, so they can share it with enrichment
+        discovered = dict(zip(live, enrichment_engine.map(
+            lambda spec: _discover_movies(GENRE_MAP[spec[0]], spec[1], YEAR_MAP[spec[2]]), live
+        )))
+
+        movie_ids = list(dict.fromkeys(
+            movie['id'] for movies, status_code in discovered.values() if status_code == 200 for movie in movies
+        ))
+        enrichments = dict(zip(movie_ids, enrichment_engine.enrich(movie_ids)))
+
+        for spec, indexes in live.items():
+            movies, status_code = discovered[spec]
+            for index in indexes:
+                if status_code != 200:
+                    results[index] = (movies, status_code)
+                else:
+                    results[index] = ([format_recommendation(movie, *enrichments[movie['id']]) for movie in movies], 200)
+
+    return results
+
+def get_catalog_recommendations(genre_id, certification, year_range, limit=10, max_age=TMDB_CATALOG_MAX_AGE):
+    """Serve recommendations from the local catalog mirror, or None if it is missing or older than max_age seconds.
+
+    With max_age=None a mirror of any age is used.
+    """
+    if not _catalog_is_fresh(genre_id, certification, year_range, max_age):
+        return None
+    rows = _catalog_query(genre_id, certification, year_range).limit(limit).all()
+    return _catalog_recommendations(rows)
+
+def _catalog_is_fresh(genre_id, certification, year_range, max_age):
+    sync = session.get(CatalogSync, (genre_id, certification, year_range))
+    if sync is None:
+        return False
+    return max_age is None or sync.synced_at >= datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age)
+
+def _catalog_query(genre_id, certification, year_range):
+    start_year, end_year = YEAR_MAP[year_range]
+    return (
+        session.query(
+            Movie.id, Movie.title, Movie.overview, Movie.release_date, Movie.poster_path, Movie.trailer_url,
+            CatalogEntry.popularity
+        )
+        .join(CatalogEntry, CatalogEntry.movie_id == Movie.id)
+        .filter(
+            CatalogEntry.genre_id == genre_id,
+            CatalogEntry.certification == certification,
+            CatalogEntry.release_year.between(start_year, end_year)
+        )
+        .order_by(CatalogEntry.popularity.desc())
+    )
+
+def _catalog_recommendations(rows):
+    providers = load_providers(session, [row.id for row in rows])
+    return [
+        {
+            'movie_id': row.id,
+            'title': row.title,
+            'overview': row.overview,
+            'release_date': row.release_date,
+            'poster_path': row.poster_path,
+            'watch_providers': providers.get(row.id, []),
+            'trailer_url': row.trailer_url
+        }
+        for row in rows
+    ]
+
+def get_personalized_recommendations(user_id, genre, age_rating, year_range, limit=10):
+    """Like get_movie_recommendations_from_tmdb, but skipping movies the user was already shown.
+
+    Users without history (or with RANKING_ENABLED off) get the shared results.
+    Otherwise discover pages, or the catalog mirror, are read until `limit`
+    unseen movies are found; those are ranked for the user by app.ranking and
+    only the chosen ones are enriched.
+    """
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        return error, 400
+
+    seen, genres = get_viewing_profile(user_id) if RANKING_ENABLED else (set(), Counter())
+    if not seen:
+        return get_movie_recommendations_from_tmdb(genre, age_rating, year_range)
+    affinity = user_affinity(genres)
+
+    genre_id = GENRE_MAP[genre]
+    if TMDB_CATALOG_ENABLED:
+        mirrored = get_personalized_catalog_recommendations(genre_id, age_rating, year_range, seen, affinity, limit)
+        if mirrored is not None:
+            return mirrored, 200
+
+    release_connection()
+    movies, status_code = discover_unseen(genre_id, age_rating, YEAR_MAP[year_range], seen, limit)
+    if status_code != 200:
+        return movies, status_code
+    chosen = choose(discover_candidates(movies), seen, affinity, limit)
+    enrichments = enrichment_engine.enrich([movie['id'] for movie in chosen])
+    return [
+        format_recommendation(movie, watch_providers, trailer_url)
+        for movie, (watch_providers, trailer_url) in zip(chosen, enrichments)
+    ], 200
+
+def get_personalized_catalog_recommendations(genre_id, certification, year_range, seen, affinity, limit=10):
+    """Ranked unseen movies from a fresh catalog mirror, or None when it is stale or missing."""
+    if not _catalog_is_fresh(genre_id, certification, year_range, TMDB_CATALOG_MAX_AGE):
+        return None
+    # Mirrored movies are already enriched; only the chosen rows need their providers loaded
+    rows = _catalog_query(genre_id, certification, year_range).all()
+    candidates = [(row.id, row.popularity, row.release_date, [genre_id], row) for row in rows]
+    return _catalog_recommendations(choose(candidates, seen, affinity, limit))
+
+def user_affinity(genres):
+    """Genre affinity by TMDB genre id from the Counter of genre names in a user's history."""
+    return genre_affinity(Counter({GENRE_MAP[name]: count for name, count in genres.items() if name in GENRE_MAP}))
+
+def discover_candidates(movies):
+    """Candidate tuples for ranking.choose() from discover results."""
+    return [
+        (movie['id'], movie.get('popularity'), movie.get('release_date'), movie.get('genre_ids', []), movie)
+        for movie in movies
+    ]
+
+def discover_unseen(genre_id, age_rating, years, seen, limit):
+    """Return (discover results, 200), fetching further pages only until `limit` unseen movies are found.
+
+    Errors on the first page are returned like _discover_page's; a failed later page
+    just ends the search with what was found so far.
+    """
+    movies = []
+    unseen = 0
+    for page in range(1, RANKING_MAX_PAGES + 1):
+        data, status_code = _discover_page(genre_id, age_rating, years, page)
+        if status_code != 200:
+            if page == 1:
+                return data, status_code
+            break
+        results = data.get('results', [])
+        movies.extend(results)
+        unseen += sum(1 for movie in results if movie['id'] not in seen)
+        if unseen >= limit or page >= data.get('total_pages', 1):
+            break
+    return movies, 200
+
+def get_degraded_recommendations(user_id, genre, age_rating, year_range, limit=10):
+    """Best-effort results for when TMDB is failing, without calling it.
+
+    Tries the last result loaded for this query, then the catalog mirror however
+    stale, then the movies most recently recommended to the user for the genre.
+    Returns None if none of them has anything.
+    """
+    cached = recommendation_refresher.peek((genre, age_rating, year_range))
+    if cached is not None:
+        return [dict(rec) for rec in cached]
+
+    mirrored = get_catalog_recommendations(GENRE_MAP[genre], age_rating, year_range, limit, max_age=None)
+    if mirrored:
+        return mirrored
+
+    history, _ = get_history_page(user_id, limit, genre=genre)
+    return [{key: value for key, value in rec.items() if key not in ('genre', 'recommended_at')} for rec in history] or None
+
+def stream_movie_recommendations(genre, age_rating, year_range, region=TMDB_WATCH_REGION):
+    """Streaming form of get_movie_recommendations_from_tmdb.
+
+    Returns (recommendations, updates, status_code). The recommendations are
+    available after the discover call, in the usual shape but possibly without
+    watch_providers/trailer_url yet; updates yields (index, recommendation) as
+    each movie's lookups finish, with the watch providers of `region`. The
+    recommendations themselves keep TMDB_WATCH_REGION providers, as stored in
+    history. On errors recommendations is the error dict.
+    """
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        return error, None, 400
+
+    if TMDB_CATALOG_ENABLED:
+        mirrored = get_catalog_recommendations(GENRE_MAP[genre], age_rating, year_range)
+        if mirrored is not None:
+            if region == TMDB_WATCH_REGION:
+                return mirrored, iter(()), 200
+
+            def localized():
+                # Looked up only once the stored results have been sent
+                yield from enumerate(localize_providers(mirrored, region))
+            return mirrored, localized(), 200
+
+    release_connection()
+    movies, status_code = _discover_movies(GENRE_MAP[genre], age_rating, YEAR_MAP[year_range])
+    if status_code != 200:
+        return movies, None, status_code
+
+    recommendations = [format_recommendation(movie, [], None) for movie in movies]
+
+    def updates():
+        for index, details in enrichment_engine.iter_details([movie['id'] for movie in movies]):
+            watch_providers, trailer_url = enrichment(details)
+            recommendations[index].update(watch_providers=watch_providers, trailer_url=trailer_url)
+            if region == TMDB_WATCH_REGION:
+                yield index, recommendations[index]
+            else:
+                yield index, dict(recommendations[index], watch_providers=enrichment(details, region)[0])
+
+    return recommendations, updates(), 200
+
+def _load_recommendations(key, refresh=False):
+    genre, age_rating, year_range = key
+    return query_flights.do(key, _fetch_recommendations, GENRE_MAP[genre], age_rating, YEAR_MAP[year_range], refresh)
+
+# Finished results for hot (genre, age_rating, year_range) keys, refreshed in the background before they expire
+recommendation_refresher = StaleWhileRevalidate(
+    _load_recommendations,
+    ttl=TMDB_CACHE_TTL_DISCOVER,
+    stale_ttl=REFRESH_STALE_TTL,
+    refresh_ahead=REFRESH_AHEAD,
+    hot_keys=REFRESH_HOT_KEYS,
+    max_keys=REFRESH_MAX_KEYS,
+    concurrency=REFRESH_CONCURRENCY,
+    upstream_rate=REFRESH_TMDB_RATE,
+    refresh_cost=1 + 10,  # one discover call plus the details of 10 movies
+    interval=REFRESH_INTERVAL,
+    autostart=REFRESH_ENABLED
+)
+
+def _discover_movies(genre_id, age_rating, years, refresh=False):
+    """Return (top 10 discover results, 200) or (error dict, 500, or 503 while the breaker is open)."""
+    data, status_code = _discover_page(genre_id, age_rating, years, refresh=refresh)
+    if status_code != 200:
+        return data, status_code
+    return data.get('results', [])[:10], 200
+
+def _discover_page(genre_id, age_rating, years, page=1, refresh=False):
+    """Return (one discover response, 200) or (error dict, 500, or 503 while the breaker is open)."""
+    params = discover_params(genre_id, age_rating, years, page)
+    # Background refreshes are the first TMDB work to be shed when the request budget runs low
+    priority = 'background' if refresh else 'discover'
+
+    try:
+        with timed('discover'):
+            data, status_code = fetch_json('discover', "/discover/movie", params=params, refresh=refresh, priority=priority)
+    except CircuitOpen:
+        return {"error": "TMDB is temporarily unavailable."}, 503
+    except requests.RequestException:
+        logger.warning("TMDB discover request failed", exc_info=True)
+        return {"error": "Failed to fetch recommendations from TMDB."}, 500
 
     # Handle potential API errors
-    if response.status_code != 200:
+    if status_code != 200:
         return {"error": "Failed to fetch recommendations from TMDB."}, 500
 
-    recommendations = []
-    if 'results' in data:
-        for movie in data['results'][:10]:
-            movie_id = movie['id']
-            watch_providers = get_watch_providers(movie_id)
-            trailer_url = get_movie_trailer(movie_id)
-            recommendations.append({
-                'movie_id': movie_id,
-                'title': movie['title'],
-                'overview': movie.get('overview', 'No overview available'),
-                'release_date': movie.get('release_date', 'Unknown release date'),
-                'poster_path': f"https://image.tmdb.org/t/p/w500{movie['poster_path']}" if movie.get('poster_path') else None,
-                'watch_providers': watch_providers,
-                'trailer_url': trailer_url
-            })
-
-    return recommendations, 200
+    return data, 200
+
+def _fetch_recommendations(genre_id, age_rating, years, refresh=False):
+    movies, status_code = _discover_movies(genre_id, age_rating, years, refresh)
+    if status_code != 200:
+        return movies, status_code
+
+    enrichments = enrichment_engine.enrich([movie['id'] for movie in movies], 'background' if refresh else 'enrichment')
+    return [
+        format_recommendation(movie, watch_providers, trailer_url)
+        for movie, (watch_providers, trailer_url) in zip(movies, enrichments)
+    ], 200
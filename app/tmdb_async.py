@@ -0,0 +1,285 @@
+"""Async variant of app/tmdb.py for the ASGI entry point.
+
+Uses the same response cache, catalog mirror, rate limiter and recommendation
+format as the sync path, but waits on TMDB without holding a thread, so one
+process can keep hundreds of upstream requests in flight.
+"""
+import asyncio
+import logging
+import random
+import time
+import aiohttp
+from app.cache import ResponseCache
+from app.config import (
+    TMDB_API_KEY, TMDB_BASE_URL, TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT, TMDB_MAX_RETRIES,
+    TMDB_BACKOFF_BASE, TMDB_BACKOFF_MAX, TMDB_ASYNC_MAX_CONNECTIONS, TMDB_CATALOG_ENABLED,
+    RANKING_ENABLED, RANKING_MAX_PAGES, TMDB_WATCH_REGION, REFRESH_ENABLED
+)
+from app.database import session
+from app.history import get_viewing_profile
+from app.ranking import choose
+from app.breaker import CircuitOpen
+from app.metrics import timed
+from app.ratelimit import RateLimited
+from app.singleflight import AsyncSingleFlight
+from app.tmdb import (
+    GENRE_MAP, YEAR_MAP, DETAILS_PARAMS, response_cache, spec_error, discover_params, format_recommendation,
+    get_catalog_recommendations, get_personalized_catalog_recommendations, user_affinity, discover_candidates,
+    parse_movie_details, enrichment, before_tmdb_call, after_tmdb_call, recommendation_refresher
+)
+from app.tmdb_client import RETRY_STATUSES, parse_retry_after, tmdb_client
+
+logger = logging.getLogger(__name__)
+
+class AsyncTMDBClient:
+    """aiohttp-based counterpart of TMDBClient with the same timeouts, retries and rate limiting."""
+
+    def __init__(self, base_url=TMDB_BASE_URL, api_key=TMDB_API_KEY, max_connections=TMDB_ASYNC_MAX_CONNECTIONS,
+                 connect_timeout=TMDB_CONNECT_TIMEOUT, read_timeout=TMDB_READ_TIMEOUT,
+                 max_retries=TMDB_MAX_RETRIES, backoff_base=TMDB_BACKOFF_BASE, backoff_max=TMDB_BACKOFF_MAX,
+                 limiter=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self._sessions = {}  # event loop -> ClientSession
+        self._counters = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    def _http(self):
+        # Pooled connections belong to the event loop that opened them, so each loop gets its own session
+        loop = asyncio.get_running_loop()
+        http = self._sessions.get(loop)
+        if http is None:
+            for closed in [other for other in list(self._sessions) if other.is_closed()]:
+                # Its sockets can no longer be closed through the loop; they are released with the session
+                logger.warning("Event loop closed without closing its TMDB session; call close() before it ends")
+                del self._sessions[closed]
+            http = self._sessions[loop] = aiohttp.ClientSession(
+                timeout=self.timeout, connector=aiohttp.TCPConnector(limit=self.max_connections)
+            )
+        return http
+
+    def _backoff(self, attempt, retry_after):
+        retry_after = parse_retry_after(retry_after)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def get(self, path, params=None, priority='discover'):
+        """GET a TMDB path and return (status_code, data); data is the decoded JSON of a 200 response, else None."""
+        url = f"{self.base_url}{path}"
+        params = dict(params or {}, api_key=self.api_key)
+
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire_async(priority)
+            self._counters['requests'] += 1
+            try:
+                async with self._http().get(url, params=params) as response:
+                    status_code = response.status
+                    retry_after = response.headers.get('Retry-After')
+                    data = await response.json() if status_code == 200 else None
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._counters['errors'] += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, None)
+            else:
+                if status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return status_code, data
+                delay = self._backoff(attempt, retry_after)
+                if delay > self.backoff_max:
+                    return status_code, data
+
+            attempt += 1
+            self._counters['retries'] += 1
+            logger.info("Retrying TMDB %s in %.2fs (attempt %d)", path, delay, attempt)
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        """Close the running event loop's session; call it before the loop ends."""
+        http = self._sessions.pop(asyncio.get_running_loop(), None)
+        if http is not None:
+            await http.close()
+
+    def stats(self):
+        return dict(self._counters)
+
+# Shares the sync client's rate limiter so both paths spend one budget
+async_tmdb_client = AsyncTMDBClient(limiter=tmdb_client.limiter)
+
+query_flights = AsyncSingleFlight()
+fetch_flights = AsyncSingleFlight()
+
+async def _cache_call(fn, *args):
+    # The in-memory cache answers directly; a disk-backed one must not block the event loop
+    if response_cache.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+async def fetch_json(endpoint, path, params=None, priority='discover'):
+    """Return (data, status_code) for a TMDB path, serving successful responses from the cache."""
+    key = ResponseCache.make_key(endpoint, path, params)
+    data = await _cache_call(response_cache.get, endpoint, key)
+    if data is not None:
+        return data, 200
+    return await fetch_flights.do(key, _fetch_and_cache, endpoint, key, path, params, priority)
+
+async def _fetch_and_cache(endpoint, key, path, params, priority):
+    breaker = before_tmdb_call(endpoint)
+    status_code = 'error'
+    started = time.perf_counter()
+    try:
+        status_code, data = await async_tmdb_client.get(path, params=params, priority=priority)
+    except RateLimited:
+        status_code = 'rate_limited'
+        raise
+    finally:
+        after_tmdb_call(endpoint, breaker, status_code, time.perf_counter() - started)
+    if status_code != 200:
+        return None, status_code
+    await _cache_call(response_cache.set, endpoint, key, data)
+    return data, 200
+
+async def get_movie_details(movie_id, priority='enrichment'):
+    data, _ = await fetch_json('details', f"/movie/{movie_id}", params=DETAILS_PARAMS, priority=priority)
+    return parse_movie_details(data) if data else None
+
+async def _lookup(movie_id, priority):
+    try:
+        with timed('enrichment'):
+            return await get_movie_details(movie_id, priority)
+    except CircuitOpen:
+        return None
+    except Exception:
+        logger.warning("TMDB details lookup failed for movie %s", movie_id, exc_info=True)
+        return None
+
+async def details(movie_ids, priority='enrichment'):
+    """Return get_movie_details() for each movie (None where it failed), in the same order as movie_ids."""
+    return await asyncio.gather(*(_lookup(movie_id, priority) for movie_id in movie_ids))
+
+async def enrich(movie_ids, priority='enrichment', region=TMDB_WATCH_REGION):
+    """Return a list of (watch_providers, trailer_url) tuples in the same order as movie_ids."""
+    return [enrichment(movie, region) for movie in await details(movie_ids, priority)]
+
+async def localize_providers(recommendations, region):
+    """Async counterpart of app.tmdb.localize_providers."""
+    if region == TMDB_WATCH_REGION:
+        return recommendations
+    movies = await details([rec['movie_id'] for rec in recommendations])
+    return [dict(rec, watch_providers=enrichment(movie, region)[0]) for rec, movie in zip(recommendations, movies)]
+
+def _in_session(fn, *args):
+    # Runs on a worker thread; release that thread's scoped session when done
+    try:
+        return fn(*args)
+    finally:
+        session.remove()
+
+async def run_in_session(fn, *args):
+    """Run a blocking database call on a worker thread with its own session."""
+    return await asyncio.to_thread(_in_session, fn, *args)
+
+async def get_movie_recommendations_from_tmdb(genre, age_rating, year_range):
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        return error, 400
+
+    if TMDB_CATALOG_ENABLED:
+        mirrored = await run_in_session(get_catalog_recommendations, GENRE_MAP[genre], age_rating, year_range)
+        if mirrored is not None:
+            return mirrored, 200
+
+    key = (genre, age_rating, year_range)
+    # Shares the sync path's refresher, so its background refreshes and degraded fallback cover ASGI traffic too
+    if REFRESH_ENABLED:
+        recommendations, status_code = await recommendation_refresher.get_async(key, _load_recommendations)
+    else:
+        recommendations, status_code = await _load_recommendations(key)
+    if status_code != 200:
+        return recommendations, status_code
+    return [dict(rec) for rec in recommendations], status_code
+
+async def _load_recommendations(key):
+    genre, age_rating, year_range = key
+    return await query_flights.do(key, _fetch_recommendations, GENRE_MAP[genre], age_rating, YEAR_MAP[year_range])
+
+async def get_personalized_recommendations(user_id, genre, age_rating, year_range, limit=10):
+    """Async counterpart of app.tmdb.get_personalized_recommendations."""
+    error = spec_error(genre, age_rating, year_range)
+    if error is not None:
+        return error, 400
+
+    seen, genres = await run_in_session(get_viewing_profile, user_id) if RANKING_ENABLED else (set(), None)
+    if not seen:
+        return await get_movie_recommendations_from_tmdb(genre, age_rating, year_range)
+    affinity = user_affinity(genres)
+
+    genre_id = GENRE_MAP[genre]
+    if TMDB_CATALOG_ENABLED:
+        mirrored = await run_in_session(
+            get_personalized_catalog_recommendations, genre_id, age_rating, year_range, seen, affinity, limit
+        )
+        if mirrored is not None:
+            return mirrored, 200
+
+    movies, status_code = await discover_unseen(genre_id, age_rating, YEAR_MAP[year_range], seen, limit)
+    if status_code != 200:
+        return movies, status_code
+    chosen = choose(discover_candidates(movies), seen, affinity, limit)
+    enrichments = await enrich([movie['id'] for movie in chosen])
+    return [
+        format_recommendation(movie, watch_providers, trailer_url)
+        for movie, (watch_providers, trailer_url) in zip(chosen, enrichments)
+    ], 200
+
+async def discover_unseen(genre_id, age_rating, years, seen, limit):
+    """Async counterpart of app.tmdb.discover_unseen."""
+    movies = []
+    unseen = 0
+    for page in range(1, RANKING_MAX_PAGES + 1):
+        data, status_code = await _discover_page(genre_id, age_rating, years, page)
+        if status_code != 200:
+            if page == 1:
+                return data, status_code
+            break
+        results = data.get('results', [])
+        movies.extend(results)
+        unseen += sum(1 for movie in results if movie['id'] not in seen)
+        if unseen >= limit or page >= data.get('total_pages', 1):
+            break
+    return movies, 200
+
+async def _discover_page(genre_id, age_rating, years, page=1):
+    try:
+        with timed('discover'):
+            data, status_code = await fetch_json(
+                'discover', "/discover/movie", params=discover_params(genre_id, age_rating, years, page)
+            )
+    except CircuitOpen:
+        return {"error": "TMDB is temporarily unavailable."}, 503
+    except (aiohttp.ClientError, asyncio.TimeoutError, RateLimited):
+        logger.warning("TMDB discover request failed", exc_info=True)
+        return {"error": "Failed to fetch recommendations from TMDB."}, 500
+
+    if status_code != 200:
+        return {"error": "Failed to fetch recommendations from TMDB."}, 500
+    return data, 200
+
+async def _fetch_recommendations(genre_id, age_rating, years):
+    data, status_code = await _discover_page(genre_id, age_rating, years)
+    if status_code != 200:
+        return data, status_code
+
+    movies = data.get('results', [])[:10]
+    enrichments = await enrich([movie['id'] for movie in movies])
+    return [
+        format_recommendation(movie, watch_providers, trailer_url)
+        for movie, (watch_providers, trailer_url) in zip(movies, enrichments)
+    ], 200
@@ -0,0 +1,142 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from app.config import (
+    TMDB_API_KEY, TMDB_BASE_URL, TMDB_POOL_SIZE, TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT,
+    TMDB_MAX_RETRIES, TMDB_BACKOFF_BASE, TMDB_BACKOFF_MAX,
+    TMDB_RATE_LIMIT, TMDB_RATE_BURST, TMDB_RATE_BACKEND, TMDB_RATE_PATH, TMDB_RATE_MAX_WAIT,
+    TMDB_RATE_RESERVE_ENRICHMENT, TMDB_RATE_RESERVE_BACKGROUND
+)
+from app.ratelimit import create_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class TMDBClient:
+    """Shared HTTP client for every TMDB call.
+
+    Keeps a pool of keep-alive connections, applies connect/read timeouts to every
+    request and retries 429/5xx responses with jittered exponential backoff,
+    honoring Retry-After when TMDB sends it. Every attempt takes a token from the
+    rate limiter, if one is configured, at the caller's priority.
+    """
+
+    def __init__(self, base_url=TMDB_BASE_URL, api_key=TMDB_API_KEY, pool_size=TMDB_POOL_SIZE,
+                 connect_timeout=TMDB_CONNECT_TIMEOUT, read_timeout=TMDB_READ_TIMEOUT,
+                 max_retries=TMDB_MAX_RETRIES, backoff_base=TMDB_BACKOFF_BASE, backoff_max=TMDB_BACKOFF_MAX,
+                 limiter=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self.pool_size = pool_size
+
+        # The HTTP session is built on first use so importing the app opens nothing
+        self._adapter = None
+        self._session = None
+
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                    session = requests.Session()
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._adapter = adapter
+                    self._session = session
+        return self._session
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _backoff(self, attempt, response):
+        retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, path, params=None, priority='discover'):
+        """GET a TMDB path (e.g. '/discover/movie') and return the final requests.Response.
+
+        Raises RateLimited if the request budget for `priority` is exhausted.
+        """
+        url = f"{self.base_url}{path}"
+        params = dict(params or {}, api_key=self.api_key)
+
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire(priority)
+            self._count('requests')
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count('errors')
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, None)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                if delay > self.backoff_max:
+                    # Waiting that long would pin the worker; let the caller degrade instead.
+                    return response
+
+            attempt += 1
+            self._count('retries')
+            logger.info("Retrying TMDB %s in %.2fs (attempt %d)", path, delay, attempt)
+            time.sleep(delay)
+
+    def stats(self):
+        """Request counters plus connection pool hits (reused connections) and misses (new connections)."""
+        pool_requests = 0
+        pool_connections = 0
+        pools = self._adapter.poolmanager.pools if self._adapter is not None else {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            pool_requests += pool.num_requests
+            pool_connections += pool.num_connections
+
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pool_hits'] = max(0, pool_requests - pool_connections)
+        stats['pool_misses'] = pool_connections
+        if self.limiter is not None:
+            stats['rate_limit'] = self.limiter.stats()
+        return stats
+
+tmdb_client = TMDBClient(limiter=create_rate_limiter(
+    TMDB_RATE_LIMIT, TMDB_RATE_BURST, TMDB_RATE_BACKEND, TMDB_RATE_PATH,
+    reserves={'enrichment': TMDB_RATE_RESERVE_ENRICHMENT, 'background': TMDB_RATE_RESERVE_BACKGROUND},
+    max_waits={'discover': TMDB_RATE_MAX_WAIT, 'enrichment': TMDB_RATE_MAX_WAIT, 'background': 0}
+))
@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from flask import request
+from app.config import SECRET_KEY, SESSION_TOKEN_TTL, SESSION_TOKEN_CACHE_SIZE
+from app.database import session
+from app.models import User
+
+_secret = SECRET_KEY.encode('utf-8')
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def _sign(payload):
+    return _b64encode(hmac.new(_secret, payload.encode('utf-8'), hashlib.sha256).digest())
+
+def issue_token(user_id, token_version=0, ttl=SESSION_TOKEN_TTL):
+    """Return a signed token of the form '<user_id>.<token_version>.<expires_at>.<signature>'.
+
+    token_version is the user's User.token_version; bumping it revokes every token issued before.
+    """
+    payload = f"{user_id}.{token_version}.{int(time.time()) + ttl}"
+    return f"{payload}.{_sign(payload)}"
+
+class TokenCache:
+    """LRU map of recently verified tokens to (user_id, expires_at), so repeat requests skip the HMAC."""
+
+    def __init__(self, max_size=SESSION_TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+            return entry
+
+    def set(self, token, user_id, expires_at):
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, user_id):
+        """Forget every cached token of one user, so the next use is checked against the database again."""
+        with self._lock:
+            for token in [token for token, entry in self._entries.items() if entry[0] == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache()
+
+def verify_token(token):
+    """Return the user id a valid, unexpired token was issued for, or None.
+
+    A token not in token_cache costs one query, to check it was issued for the
+    user's current credentials.
+    """
+    entry = token_cache.get(token)
+    if entry is None:
+        payload, _, signature = token.rpartition('.')
+        if not payload or not hmac.compare_digest(signature.encode('utf-8'), _sign(payload).encode('ascii')):
+            return None
+        fields = payload.split('.')
+        if len(fields) != 3:
+            return None
+        user_id, token_version, expires_at = (int(field) for field in fields)
+        if expires_at <= time.time():
+            return None
+        if session.query(User.token_version).filter_by(id=user_id).scalar() != token_version:
+            return None
+        entry = (user_id, expires_at)
+        token_cache.set(token, *entry)
+
+    user_id, expires_at = entry
+    if expires_at <= time.time():
+        return None
+    return user_id
+
+def current_user_id(username=None):
+    """Resolve the caller from an 'Authorization: Bearer <token>' header, falling back to username.
+
+    Returns (user_id, None) on success or (None, (error, status_code)).
+    """
+    return resolve_user_id(request.headers.get('Authorization', ''), username)
+
+def resolve_cached_user_id(authorization):
+    """resolve_user_id answered from one token_cache lookup, or None when the database is needed."""
+    if not authorization.startswith('Bearer '):
+        return None
+    entry = token_cache.get(authorization[len('Bearer '):].strip())
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at <= time.time():
+        return None, ({"error": "Invalid or expired token."}, 401)
+    return user_id, None
+
+def resolve_user_id(authorization, username=None):
+    """current_user_id for callers outside a Flask request, given the raw Authorization header."""
+    if authorization.startswith('Bearer '):
+        user_id = verify_token(authorization[len('Bearer '):].strip())
+        if user_id is None:
+            return None, ({"error": "Invalid or expired token."}, 401)
+        return user_id, None
+
+    if not username:
+        return None, ({"error": "username or a bearer token is required."}, 400)
+    user_id = session.query(User.id).filter_by(username=username).scalar()
+    if user_id is None:
+        return None, ({"error": "Invalid username."}, 404)
+    return user_id, None
@@ -1,8 +1,63 @@
 import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.config import PASSWORD_HASH_ITERATIONS, KDF_POOL_WORKERS, KDF_QUEUE_DEPTH
+from app.metrics import password_hash_seconds
 
-def hash_password(password, salt):
+# Iteration count of hashes stored before it became a per-user setting
+LEGACY_HASH_ITERATIONS = 100000
+
+def hash_password(password, salt, iterations=LEGACY_HASH_ITERATIONS):
     """Hash a password with the given salt."""
     pwdhash = hashlib.pbkdf2_hmac(
-        'sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000
+        'sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations
     )
     return pwdhash.hex()
+
+class KDFBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+class KDFPool:
+    """Runs password hashing in a bounded process pool so it cannot starve request threads.
+
+    At most queue_depth hashes may be running or waiting; further calls fail fast
+    with KDFBusy. With workers=0 hashing runs inline on the calling thread.
+    """
+
+    def __init__(self, workers=KDF_POOL_WORKERS, queue_depth=KDF_QUEUE_DEPTH):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def hash(self, password, salt, iterations=PASSWORD_HASH_ITERATIONS):
+        if not self._slots.acquire(blocking=False):
+            raise KDFBusy()
+        # Timed here rather than in hash_password, which runs in the worker processes
+        try:
+            with password_hash_seconds.time():
+                if self.workers == 0:
+                    return hash_password(password, salt, iterations)
+                return self._get_executor().submit(hash_password, password, salt, iterations).result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next caller
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+kdf_pool = KDFPool()
@@ -0,0 +1,103 @@
+"""Load-test /recommend on the sync (threaded WSGI) and async (ASGI) entry points.
+
+Each server runs in its own process against a local fake TMDB with caching
+disabled, so every request performs the full discover + enrichment fan-out.
+Reports requests/sec, latency and the server's peak memory growth per
+concurrent request.
+
+Usage: python -m benchmarks.bench_asgi [--latency 0.1] [--concurrency 200] [--duration 10]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.fake_tmdb import start_fake_tmdb
+from benchmarks.servers import NO_CACHE, memory_kb, start_server, stop_server
+
+SPECS = list(itertools.product(
+    ['Action', 'Adventure', 'Comedy', 'Drama', 'Fantasy', 'Horror', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller'],
+    ['G', 'PG', 'PG-13', 'R', 'NC-17'],
+    ['2000-2010', '2011-2015', '2016-2020', '2021-present']
+))
+
+async def load(base_url, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as client:
+        async with client.post('/create_account', json={'username': 'loadtest', 'password': 'loadtest'}):
+            pass
+
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                genre, age_rating, year_range = random.choice(SPECS)
+                start = time.perf_counter()
+                try:
+                    async with client.post('/recommend', json={
+                        'username': 'loadtest', 'genre': genre, 'age_rating': age_rating, 'year_range': year_range
+                    }) as response:
+                        await response.read()
+                        ok = response.status == 200
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+def run(mode, tmdb_url, workdir, concurrency, duration):
+    process, base_url = start_server(mode, tmdb_url, workdir, KDF_POOL_WORKERS='0', **NO_CACHE)
+    try:
+        idle_kb = memory_kb(process.pid, 'VmRSS')
+        latencies, errors, elapsed = asyncio.run(load(base_url, concurrency, duration))
+        peak_kb = memory_kb(process.pid, 'VmHWM')
+    finally:
+        stop_server(process)
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) if latencies else float('nan'),
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else float('nan'),
+        'errors': errors,
+        'kb_per_request': (peak_kb - idle_kb) / concurrency
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.1, help='Fake TMDB latency per request in seconds')
+    parser.add_argument('--concurrency', type=int, default=200, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per server')
+    args = parser.parse_args()
+
+    server, tmdb_url = start_fake_tmdb(latency=args.latency)
+    workdir = tempfile.mkdtemp()
+    try:
+        results = {mode: run(mode, tmdb_url, workdir, args.concurrency, args.duration) for mode in ('sync', 'async')}
+    finally:
+        server.shutdown()
+
+    print(f'TMDB latency {args.latency * 1000:.0f} ms, {args.concurrency} concurrent clients, {args.duration:.0f} s each')
+    for mode, result in results.items():
+        print(
+            f"{mode:>5}: {result['rps']:7.1f} req/s  p50 {result['p50'] * 1000:7.1f} ms  "
+            f"p95 {result['p95'] * 1000:7.1f} ms  errors {result['errors']:4d}  "
+            f"{result['kb_per_request']:6.1f} KiB/concurrent request"
+        )
+
+if __name__ == '__main__':
+    main()
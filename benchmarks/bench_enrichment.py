@@ -0,0 +1,50 @@
+"""Compare serial and concurrent enrichment latency against a local fake TMDB.
+
+Usage: python -m benchmarks.bench_enrichment [--latency 0.05] [--runs 10] [--workers 10]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.fake_tmdb import start_fake_tmdb
+from app import tmdb
+
+def measure(engine, runs):
+    timings = []
+    for _ in range(runs):
+        tmdb.enrichment_engine = engine
+        tmdb.response_cache.clear()
+        tmdb.recommendation_refresher.clear()
+        start = time.perf_counter()
+        recommendations, status_code = tmdb.get_movie_recommendations_from_tmdb('Action', 'PG-13', '2016-2020')
+        timings.append(time.perf_counter() - start)
+        assert status_code == 200 and len(recommendations) == 10
+    engine.shutdown()
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake TMDB latency per request in seconds')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=10)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_tmdb(latency=args.latency)
+    tmdb.tmdb_client.base_url = base_url
+    # Measure the live TMDB path only, not the catalog mirror
+    tmdb.TMDB_CATALOG_ENABLED = False
+    # The rate limiter would pace both runs to TMDB_RATE_LIMIT and hide the concurrency gain
+    tmdb.tmdb_client.limiter = None
+    try:
+        serial = measure(tmdb.EnrichmentEngine(max_workers=1), args.runs)
+        concurrent = measure(tmdb.EnrichmentEngine(max_workers=args.workers), args.runs)
+    finally:
+        server.shutdown()
+
+    print(f'TMDB latency:        {args.latency * 1000:.0f} ms')
+    print(f'serial p50:          {serial * 1000:.1f} ms')
+    print(f'concurrent p50:      {concurrent * 1000:.1f} ms ({args.workers} workers)')
+    print(f'speedup:             {serial / concurrent:.1f}x')
+
+if __name__ == '__main__':
+    main()
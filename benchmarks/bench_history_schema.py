@@ -0,0 +1,113 @@
+"""Compare database size and history read time before and after normalizing movie details.
+
+Builds a legacy (denormalized) database with many users who were recommended
+the same popular movies, copies it, migrates the copy, and reports file sizes
+and the time to read one history page per user.
+
+Usage: python -m benchmarks.bench_history_schema [--users 2000] [--per-user 50] [--movies 500]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+def build_legacy_database(path, users, per_user, movies):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users_cli (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, "
+                 "salt VARCHAR(64) NOT NULL, password_hash VARCHAR(128) NOT NULL)")
+    conn.execute("CREATE TABLE user_recommendations (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                 "movie_id INTEGER NOT NULL, title VARCHAR(255) NOT NULL, overview TEXT, release_date VARCHAR(20), "
+                 "poster_path VARCHAR(255), watch_providers TEXT, trailer_url VARCHAR(500), recommended_at DATETIME)")
+    conn.executemany("INSERT INTO users_cli VALUES (?, ?, 'salt', 'hash')",
+                     [(user_id, f'user{user_id}') for user_id in range(1, users + 1)])
+
+    providers = ['Netflix', 'Hulu', 'Disney Plus', 'Amazon Prime Video', 'Max', 'Peacock']
+    catalog = [
+        (movie_id, f'Movie {movie_id}', 'An overview long enough to look like a real TMDB synopsis. ' * 4,
+         '2019-05-01', f'https://image.tmdb.org/t/p/w500/poster{movie_id}.jpg',
+         json.dumps(random.sample(providers, 3)), f'https://www.youtube.com/embed/trailer{movie_id}')
+        for movie_id in range(1, movies + 1)
+    ]
+    rows = []
+    for user_id in range(1, users + 1):
+        for index, movie in enumerate(random.sample(catalog, per_user)):
+            rows.append((user_id, *movie, f'2024-01-01 00:{index // 60:02d}:{index % 60:02d}'))
+    conn.executemany("INSERT INTO user_recommendations (user_id, movie_id, title, overview, release_date, poster_path, "
+                     "watch_providers, trailer_url, recommended_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def vacuumed_size(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+def read_legacy_pages(path, users, limit):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_legacy ON user_recommendations (user_id, recommended_at, id)")
+    start = time.perf_counter()
+    for user_id in range(1, users + 1):
+        rows = conn.execute("SELECT movie_id, title, overview, release_date, poster_path, watch_providers, trailer_url, "
+                            "recommended_at FROM user_recommendations WHERE user_id = ? "
+                            "ORDER BY recommended_at DESC, id DESC LIMIT ?", (user_id, limit)).fetchall()
+        [json.loads(row[5]) for row in rows]
+    conn.close()
+    return time.perf_counter() - start
+
+def read_normalized_pages(path, users, limit):
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    for user_id in range(1, users + 1):
+        rows = conn.execute("SELECT ur.movie_id, m.title, m.overview, m.release_date, m.poster_path, m.trailer_url, "
+                            "ur.recommended_at FROM user_recommendations ur JOIN movies m ON m.id = ur.movie_id "
+                            "WHERE ur.user_id = ? ORDER BY ur.recommended_at DESC, ur.id DESC LIMIT ?",
+                            (user_id, limit)).fetchall()
+        movie_ids = [row[0] for row in rows]
+        conn.execute(f"SELECT mp.movie_id, p.name FROM movie_providers mp JOIN providers p ON p.id = mp.provider_id "
+                     f"WHERE mp.movie_id IN ({','.join('?' * len(movie_ids))}) ORDER BY mp.movie_id, mp.position",
+                     movie_ids).fetchall()
+    conn.close()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--per-user', type=int, default=50)
+    parser.add_argument('--movies', type=int, default=500)
+    parser.add_argument('--page', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    legacy_path = os.path.join(workdir, 'legacy.db')
+    normalized_path = os.path.join(workdir, 'normalized.db')
+    build_legacy_database(legacy_path, args.users, args.per_user, args.movies)
+    shutil.copy(legacy_path, normalized_path)
+
+    # The app reads DATABASE_URL at import time, so point it at the copy first
+    os.environ['DATABASE_URL'] = f'sqlite:///{normalized_path}'
+    from app.database import get_engine
+    from app.migrations import migrate
+    migrate(get_engine())
+    get_engine().dispose()
+
+    # Both layouts are read with the same raw queries the app issues, so only the schema differs
+    legacy_read = read_legacy_pages(legacy_path, args.users, args.page)
+    normalized_read = read_normalized_pages(normalized_path, args.users, args.page)
+    legacy_size = vacuumed_size(legacy_path)
+    normalized_size = vacuumed_size(normalized_path)
+    shutil.rmtree(workdir)
+
+    print(f'rows:                {args.users * args.per_user} ({args.movies} distinct movies)')
+    print(f'legacy size:         {legacy_size / 1024 / 1024:.1f} MiB')
+    print(f'normalized size:     {normalized_size / 1024 / 1024:.1f} MiB ({normalized_size / legacy_size:.0%})')
+    print(f'legacy reads:        {legacy_read / args.users * 1000:.2f} ms/page')
+    print(f'normalized reads:    {normalized_read / args.users * 1000:.2f} ms/page')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Report PBKDF2 password hashes/sec per core and through the KDF process pool.
+
+Usage: python -m benchmarks.bench_kdf [--iterations 100000] [--hashes 50]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import PASSWORD_HASH_ITERATIONS
+from app.utils import KDFPool, hash_password
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=PASSWORD_HASH_ITERATIONS)
+    parser.add_argument('--hashes', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for index in range(args.hashes):
+        hash_password('benchmark-password', f'salt{index}', args.iterations)
+    single = args.hashes / (time.perf_counter() - start)
+
+    pool = KDFPool(workers=args.workers, queue_depth=args.hashes)
+    pool.hash('warmup', 'salt', args.iterations)
+    with ThreadPoolExecutor(max_workers=args.hashes) as callers:
+        start = time.perf_counter()
+        list(callers.map(lambda index: pool.hash('benchmark-password', f'salt{index}', args.iterations), range(args.hashes)))
+        pooled = args.hashes / (time.perf_counter() - start)
+    pool.shutdown()
+
+    print(f'iterations:          {args.iterations}')
+    print(f'single core:         {single:.1f} hashes/sec ({1000 / single:.1f} ms/hash)')
+    print(f'process pool:        {pooled:.1f} hashes/sec with {args.workers} workers '
+          f'({pooled / args.workers:.1f} hashes/sec per core)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Compare the development server (`python run.py`) with the gunicorn production config.
+
+Both run the full create_account / login / recommend mix of load_test against
+the local fake TMDB, one after the other, and throughput and latency are
+printed side by side per endpoint.
+
+Usage: python -m benchmarks.bench_serving [--concurrency 50] [--duration 15] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import tempfile
+
+from benchmarks.fake_tmdb import start_fake_tmdb
+from benchmarks.load_test import ENDPOINTS, run_load
+from benchmarks.servers import start_server, stop_server
+
+MODES = ('dev', 'gunicorn')
+
+def run(mode, tmdb_url, workdir, args):
+    process, base_url = start_server(mode, tmdb_url, workdir, TMDB_RATE_LIMIT='0')
+    try:
+        return asyncio.run(run_load(base_url, args.concurrency, args.duration, args.recommends_per_login))
+    finally:
+        stop_server(process)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds of load per server')
+    parser.add_argument('--recommends-per-login', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake TMDB base latency in seconds')
+    args = parser.parse_args()
+
+    server, tmdb_url = start_fake_tmdb(latency=args.latency)
+    workdir = tempfile.mkdtemp()
+    try:
+        results = {mode: run(mode, tmdb_url, workdir, args) for mode in MODES}
+    finally:
+        server.shutdown()
+
+    print(f'{args.concurrency} virtual users, {args.duration:.0f} s per server, TMDB latency {args.latency * 1000:.0f} ms')
+    print(f"{'':>14}  {'dev req/s':>10} {'p95 ms':>8}  {'gunicorn req/s':>14} {'p95 ms':>8}  {'speedup':>7}")
+    for endpoint in ENDPOINTS + ('total',):
+        dev, prod = results['dev'][endpoint], results['gunicorn'][endpoint]
+        speedup = prod['rps'] / dev['rps'] if dev['rps'] else float('inf')
+        print(
+            f"{endpoint:>14}  {dev['rps']:10.1f} {dev['p95_ms'] or 0:8.1f}  "
+            f"{prod['rps']:14.1f} {prod['p95_ms'] or 0:8.1f}  {speedup:6.2f}x"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""A local stand-in for the TMDB API, used by the tests and benchmarks.
+
+Serves /discover/movie, /movie/<id> (with append_to_response), /movie/<id>/watch/providers
+and /movie/<id>/videos from a generated catalog, with configurable latency, jitter, error rate and
+429 injection, so round-trip costs and failure handling can be measured
+without network access.
+
+Usage: python -m benchmarks.fake_tmdb [--port 8001] [--latency 0.05] [--jitter 0.02]
+                                      [--error-rate 0.01] [--rate-429 0.01] [--movies 5000]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+DETAILS_PATH = re.compile(r'^/movie/(\d+)$')
+PROVIDERS_PATH = re.compile(r'^/movie/(\d+)/watch/providers$')
+VIDEOS_PATH = re.compile(r'^/movie/(\d+)/videos$')
+
+GENRE_IDS = [28, 12, 16, 35, 80, 18, 14, 27, 9648, 10749, 878, 53]
+CERTIFICATIONS = ['G', 'PG', 'PG-13', 'R', 'NC-17']
+PROVIDERS = ['Netflix', 'Hulu', 'Disney Plus', 'Amazon Prime Video', 'Max', 'Apple TV Plus', 'Peacock', 'Paramount Plus']
+PAGE_SIZE = 20
+
+def generate_catalog(size=5000, seed=42):
+    """Return {movie_id: movie} with TMDB-like discover fields plus certification, providers and videos."""
+    rng = random.Random(seed)
+    catalog = {}
+    for movie_id in range(1, size + 1):
+        year = rng.randint(1995, 2024)
+        videos = [{'site': 'YouTube', 'type': 'Teaser', 'key': f'teaser{movie_id}'}]
+        if rng.random() < 0.9:
+            videos.append({'site': 'YouTube', 'type': 'Trailer', 'key': f'trailer{movie_id}'})
+        catalog[movie_id] = {
+            'id': movie_id,
+            'title': f'Movie {movie_id}',
+            'overview': f'Overview for movie {movie_id}',
+            'release_date': f'{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'poster_path': f'/poster{movie_id}.jpg',
+            'genre_ids': rng.sample(GENRE_IDS, rng.randint(1, 3)),
+            'popularity': round(rng.uniform(1, 1000), 3),
+            'certification': rng.choice(CERTIFICATIONS),
+            'providers': rng.sample(PROVIDERS, rng.randint(0, 3)),
+            'videos': videos
+        }
+    return catalog
+
+def _discover_fields(movie):
+    return {key: movie[key] for key in ('id', 'title', 'overview', 'release_date', 'poster_path', 'genre_ids', 'popularity')}
+
+def watch_providers(movie):
+    """Per-region watch providers of a movie; GB streams all but the first of the US providers."""
+    return {'id': movie['id'], 'results': {
+        region: {
+            'link': f"https://www.themoviedb.org/movie/{movie['id']}/watch?locale={region}",
+            'flatrate': [{'provider_name': name} for name in names]
+        }
+        for region, names in (('US', movie['providers']), ('GB', movie['providers'][1:]))
+    }}
+
+def details(movie, query):
+    """A /movie/<id> response, with videos and watch/providers added when append_to_response asks for them."""
+    response = dict(_discover_fields(movie), runtime=90 + movie['id'] % 60)
+    appended = query.get('append_to_response', '').split(',')
+    if 'videos' in appended:
+        response['videos'] = {'results': movie['videos']}
+    if 'watch/providers' in appended:
+        response['watch/providers'] = {'results': watch_providers(movie)['results']}
+    return response
+
+def discover(catalog, query):
+    """Filter and page the catalog like TMDB's /discover/movie for the parameters the app sends."""
+    genres = {int(genre) for genre in query.get('with_genres', '').split(',') if genre.isdigit()}
+    certification = query.get('certification')
+    since = query.get('primary_release_date.gte', '')
+    until = query.get('primary_release_date.lte', '9999')
+    movies = [
+        movie for movie in catalog.values()
+        if genres <= set(movie['genre_ids'])
+        and (not certification or movie['certification'] == certification)
+        and since <= movie['release_date'] <= until
+    ]
+    movies.sort(key=lambda movie: movie['popularity'], reverse=True)
+
+    page = max(1, int(query.get('page', 1)))
+    total_pages = max(1, -(-len(movies) // PAGE_SIZE))
+    return {
+        'page': page,
+        'results': [_discover_fields(movie) for movie in movies[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]],
+        'total_pages': total_pages,
+        'total_results': len(movies)
+    }
+
+def make_handler(catalog, latency, jitter, error_rate, rate_429, retry_after, counters, lock):
+    class FakeTMDBHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=None, headers=()):
+            payload = json.dumps(body).encode('utf-8') if body is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+            with lock:
+                counters[status] += 1
+
+        def do_GET(self):
+            time.sleep(latency + random.uniform(0, jitter))
+
+            roll = random.random()
+            if roll < rate_429:
+                self._send(429, {'status_code': 25, 'status_message': 'Request count over limit.'},
+                           [('Retry-After', str(retry_after))])
+                return
+            if roll < rate_429 + error_rate:
+                self._send(random.choice([500, 502, 503]), {'status_code': 11, 'status_message': 'Internal error.'})
+                return
+
+            url = urlparse(self.path)
+            path = url.path
+            query = dict(parse_qsl(url.query))
+            match = DETAILS_PATH.match(path)
+            providers = PROVIDERS_PATH.match(path)
+            videos = VIDEOS_PATH.match(path)
+            movie = catalog.get(int((match or providers or videos).group(1))) if match or providers or videos else None
+
+            if path == '/discover/movie':
+                self._send(200, discover(catalog, query))
+            elif match and movie:
+                self._send(200, details(movie, query))
+            elif providers and movie:
+                self._send(200, watch_providers(movie))
+            elif videos and movie:
+                self._send(200, {'id': movie['id'], 'results': movie['videos']})
+            else:
+                self._send(404, {'status_code': 34, 'status_message': 'The resource you requested could not be found.'})
+
+    return FakeTMDBHandler
+
+class FakeTMDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open hundreds of connections at once
+
+    def stats(self):
+        """Responses sent so far, by status code."""
+        with self.lock:
+            return dict(self.counters)
+
+def start_fake_tmdb(latency=0.05, host='127.0.0.1', port=0, jitter=0.0, error_rate=0.0, rate_429=0.0,
+                    retry_after=1, catalog_size=5000, seed=42):
+    """Start the fake server on a background thread and return (server, base_url)."""
+    counters = Counter()
+    lock = threading.Lock()
+    handler = make_handler(generate_catalog(catalog_size, seed), latency, jitter, error_rate, rate_429, retry_after,
+                           counters, lock)
+    server = FakeTMDBServer((host, port), handler)
+    server.counters = counters
+    server.lock = lock
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.05, help='Base latency per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 5xx')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--movies', type=int, default=5000, help='Size of the generated catalog')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_tmdb(
+        latency=args.latency, host=args.host, port=args.port, jitter=args.jitter, error_rate=args.error_rate,
+        rate_429=args.rate_429, retry_after=args.retry_after, catalog_size=args.movies, seed=args.seed
+    )
+    print(f'Fake TMDB listening on {base_url} (set TMDB_BASE_URL to use it)')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Drive /create_account, /login and /recommend at a fixed concurrency and report latency percentiles.
+
+By default the app is started in a subprocess (see --server) against
+the local fake TMDB, so no network access is needed. Pass --url to load an
+already running deployment instead. Results are written as JSON. With
+--baseline, the run fails (exit status 1) when throughput or p95 latency of
+any endpoint regresses by more than --max-regression compared to an earlier
+result file.
+
+Usage: python -m benchmarks.load_test [--server sync|async|dev|gunicorn] [--concurrency 50] [--duration 20]
+                                      [--latency 0.05] [--jitter 0.02] [--error-rate 0] [--rate-429 0]
+                                      [--output load_test.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+import aiohttp
+
+from benchmarks.bench_asgi import SPECS
+from benchmarks.fake_tmdb import start_fake_tmdb
+from benchmarks.servers import NO_CACHE, SERVERS, start_server, stop_server
+
+ENDPOINTS = ('create_account', 'login', 'recommend')
+RETRY_DELAY = 0.1
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))]
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99))
+    }
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+async def run_load(base_url, concurrency, duration, recommends_per_login):
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = {endpoint: 0 for endpoint in ENDPOINTS}
+    deadline = time.perf_counter() + duration
+
+    async def call(client, endpoint, path, body, headers=None):
+        start = time.perf_counter()
+        try:
+            async with client.post(path, json=body, headers=headers) as response:
+                data = await response.json(content_type=None)
+                ok = 200 <= response.status < 300
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            data, ok = None, False
+        if ok:
+            latencies[endpoint].append(time.perf_counter() - start)
+        else:
+            errors[endpoint] += 1
+        return data if ok else None
+
+    async def user(client):
+        # Each virtual user signs up once, then alternates logins with a few recommendations
+        # A full password hashing queue answers 503, so back off and retry instead of spinning
+        username, password = f'load-{uuid.uuid4().hex[:12]}', 'load-test-password'
+        while not await call(client, 'create_account', '/create_account', {'username': username, 'password': password}):
+            if time.perf_counter() >= deadline:
+                return
+            await asyncio.sleep(RETRY_DELAY)
+        while time.perf_counter() < deadline:
+            session = await call(client, 'login', '/login', {'username': username, 'password': password})
+            if session is None:
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            headers = {'Authorization': f"Bearer {session['token']}"}
+            for _ in range(recommends_per_login):
+                if time.perf_counter() >= deadline:
+                    break
+                genre, age_rating, year_range = random.choice(SPECS)
+                body = {'username': username, 'genre': genre, 'age_rating': age_rating, 'year_range': year_range}
+                await call(client, 'recommend', '/recommend', body, headers)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {endpoint: summarize(latencies[endpoint], errors[endpoint], elapsed) for endpoint in ENDPOINTS}
+    endpoints['total'] = summarize(
+        [latency for values in latencies.values() for latency in values], sum(errors.values()), elapsed
+    )
+    return endpoints
+
+def regressions(result, baseline, max_regression):
+    """List human-readable regressions of result against baseline."""
+    found = []
+    for endpoint, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous or not previous.get('count'):
+            continue
+        if current['rps'] < previous['rps'] * (1 - max_regression):
+            found.append(f"{endpoint}: throughput {current['rps']:.1f} req/s vs {previous['rps']:.1f} req/s")
+        if current['p95_ms'] is not None and previous['p95_ms'] is not None \
+                and current['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            found.append(f"{endpoint}: p95 {current['p95_ms']:.1f} ms vs {previous['p95_ms']:.1f} ms")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Load an already running app instead of starting one')
+    parser.add_argument('--server', choices=sorted(SERVERS), default='sync')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load')
+    parser.add_argument('--recommends-per-login', type=int, default=5)
+    parser.add_argument('--no-cache', action='store_true', help='Disable caching so every /recommend reaches TMDB')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake TMDB base latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Fake TMDB extra random latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake TMDB responses that are 5xx')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Share of fake TMDB responses that are 429')
+    parser.add_argument('--output', default='load_test.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', help='Earlier result file to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Tolerated relative regression (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    server = process = None
+    base_url = args.url
+    if base_url is None:
+        server, tmdb_url = start_fake_tmdb(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, rate_429=args.rate_429
+        )
+        process, base_url = start_server(args.server, tmdb_url, tempfile.mkdtemp(), **(NO_CACHE if args.no_cache else {}))
+    try:
+        endpoints = asyncio.run(run_load(base_url, args.concurrency, args.duration, args.recommends_per_login))
+    finally:
+        if process is not None:
+            stop_server(process)
+        if server is not None:
+            server.shutdown()
+
+    result = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'fake_tmdb_responses': server.stats() if server is not None else None,
+        'endpoints': endpoints
+    }
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    for endpoint, summary in endpoints.items():
+        print(
+            f"{endpoint:>14}: {summary['count']:6d} ok {summary['errors']:5d} errors {summary['rps']:8.1f} req/s  "
+            f"p50 {summary['p50_ms']} ms  p95 {summary['p95_ms']} ms  p99 {summary['p99_ms']} ms"
+        )
+    print(f'Results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(result, json.load(f), args.max_regression)
+        for regression in found:
+            print(f'REGRESSION {regression}')
+        if found:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
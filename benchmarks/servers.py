@@ -0,0 +1,88 @@
+"""Start the app in a subprocess for load tests.
+
+Modes: sync (threaded WSGI), async (ASGI), dev (what `python run.py` starts,
+minus the reloader) and gunicorn (the production config in gunicorn.conf.py).
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'sync': [sys.executable, '-c', (
+        'import logging, sys; from werkzeug.serving import run_simple; from run import app; '
+        'logging.getLogger("werkzeug").setLevel(logging.ERROR); '
+        'run_simple("127.0.0.1", int(sys.argv[1]), app, threaded=True)'
+    )],
+    'async': [sys.executable, '-c', (
+        'import sys, uvicorn; '
+        'uvicorn.run("asgi:app", host="127.0.0.1", port=int(sys.argv[1]), log_level="warning", backlog=4096)'
+    )],
+    # The reloader re-executes the interpreter in a child process, which the benchmark could not stop cleanly
+    'dev': [sys.executable, '-c', (
+        'import logging, sys; from run import app; '
+        'logging.getLogger("werkzeug").setLevel(logging.ERROR); '
+        'app.run(host="127.0.0.1", port=int(sys.argv[1]), debug=True, use_reloader=False)'
+    )],
+    'gunicorn': [sys.executable, '-c', (
+        'import sys; from gunicorn.app.wsgiapp import run; '
+        'sys.argv = ["gunicorn", "-c", "gunicorn.conf.py", "--bind", "127.0.0.1:" + sys.argv[1], "run:app"]; run()'
+    )],
+}
+
+# Settings that would otherwise hide TMDB round trips or pace the load
+NO_CACHE = {
+    'TMDB_CATALOG_ENABLED': 'false',
+    'REFRESH_ENABLED': 'false',
+    'TMDB_RATE_LIMIT': '0',
+    'TMDB_CACHE_TTL_DISCOVER': '0',
+    'TMDB_CACHE_TTL_DETAILS': '0'
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def memory_kb(pid, field):
+    """Read a memory field such as VmRSS or VmHWM (peak RSS) of a process from /proc."""
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+def start_server(mode, tmdb_url, workdir, **env):
+    """Start the app against tmdb_url with a fresh database in workdir; return (process, base_url)."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        TMDB_BASE_URL=tmdb_url,
+        DATABASE_URL='sqlite:///' + os.path.join(workdir, f'{mode}.db'),
+        **env
+    )
+    # A session of its own lets stop_server() reach any worker processes too
+    process = subprocess.Popen(SERVERS[mode] + [str(port)], cwd=ROOT, env=env, start_new_session=True)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            with urllib.request.urlopen(f'{base_url}/health') as response:
+                if response.status == 200:
+                    return process, base_url
+        except OSError:
+            time.sleep(0.1)
+    stop_server(process, signal.SIGKILL)
+    raise RuntimeError(f'{mode} server did not start')
+
+def stop_server(process, sig=signal.SIGTERM):
+    """Stop a server started by start_server() along with its worker processes."""
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+    process.wait()
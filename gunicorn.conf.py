@@ -0,0 +1,49 @@
+"""Production server settings: gunicorn run:app (from the project root, which loads this file).
+
+Threaded workers are sized from the CPU count and forked from a master that has
+already loaded and warmed the app (see app/server.py). Workers are recycled after
+about SERVER_MAX_REQUESTS requests to bound memory growth. `kill -HUP <master>`
+replaces the workers gracefully; because the app is preloaded, deploying new
+code needs `kill -USR2 <master>` followed by `kill -QUIT <old master>`.
+"""
+import multiprocessing
+import os
+
+# Worker processes already hash passwords in parallel (PBKDF2 releases the GIL),
+# so a KDF process pool per worker would only oversubscribe the CPUs
+os.environ.setdefault('KDF_POOL_WORKERS', '0')
+
+from app.config import (  # noqa: E402
+    SERVER_BIND, SERVER_WORKERS, SERVER_THREADS, SERVER_MAX_REQUESTS, SERVER_TIMEOUT, SERVER_GRACEFUL_TIMEOUT,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
+
+bind = SERVER_BIND
+workers = SERVER_WORKERS or 2 * multiprocessing.cpu_count() + 1
+worker_class = 'gthread'
+# Requests mostly wait on TMDB, so each worker runs several threads per CPU, but never more than its
+# database pool can serve at once: a thread beyond that would wait DB_POOL_TIMEOUT and fail
+threads = min(SERVER_THREADS or 4 * multiprocessing.cpu_count(), DB_POOL_SIZE + DB_MAX_OVERFLOW)
+preload_app = True
+max_requests = SERVER_MAX_REQUESTS
+# Spread recycling out so workers do not all restart at once
+max_requests_jitter = SERVER_MAX_REQUESTS // 10
+timeout = SERVER_TIMEOUT
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+keepalive = 5
+
+def when_ready(server):
+    from app.server import warm_up
+    warm_up()
+    server.log.info("App preloaded; starting %d workers with %d threads each", workers, threads)
+
+def post_fork(server, worker):
+    from app.server import after_fork
+    after_fork()
+
+def worker_exit(server, worker):
+    from app.server import before_exit
+    before_exit()
+
+def on_reload(server):
+    server.log.info("Reloading: workers are replaced once their in-flight requests finish")
@@ -1,17 +1,34 @@
+import os
+import tempfile
 import pytest
+
+# Never run the suite against the real users.db
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test_users.db')
+# Mocked TMDB calls should not be paced; the limiter has its own tests
+os.environ['TMDB_RATE_LIMIT'] = '0'
+
 from app import create_app
-from app.database import Base, engine, session
+from app.database import Base, get_engine, session
+from app.tmdb import response_cache, recommendation_refresher, tmdb_breakers
 
 @pytest.fixture(scope='session', autouse=True)
 def setup_database():
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.drop_all(bind=get_engine())
+    Base.metadata.create_all(bind=get_engine())
     yield
     session.close()
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=get_engine())
 
 @pytest.fixture
 def client():
     app = create_app()
     with app.test_client() as client:
         yield client
+
+@pytest.fixture(autouse=True)
+def clear_tmdb_cache():
+    response_cache.clear()
+    recommendation_refresher.clear()
+    for breaker in tmdb_breakers.values():
+        breaker.reset()
+    yield
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+import pytest
+from app import tmdb_async
+from app.asgi import create_asgi_app
+from app.cache import ResponseCache, SQLiteCache
+from app.database import session
+from app.models import UserRecommendation, User
+from app.tmdb import response_cache, tmdb_breakers
+from benchmarks.fake_tmdb import generate_catalog, start_fake_tmdb
+
+def asgi_request(app, method, path, body=None):
+    """Drive one HTTP request through an ASGI app and return (status, decoded body)."""
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'raw_path': path.encode('ascii'), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode('ascii'))],
+        'client': ('127.0.0.1', 1234), 'server': ('testserver', 80)
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await app(scope, receive, send)
+        await tmdb_async.async_tmdb_client.close()
+
+    asyncio.run(run())
+    status = next(message['status'] for message in messages if message['type'] == 'http.response.start')
+    content = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return status, content
+
+@pytest.fixture
+def fake_tmdb(monkeypatch):
+    server, base_url = start_fake_tmdb(latency=0)
+    monkeypatch.setattr(tmdb_async.async_tmdb_client, 'base_url', base_url)
+    yield
+    server.shutdown()
+
+def test_async_recommend_matches_sync_format(client, fake_tmdb):
+    client.post('/create_account', json={"username": "async_tester", "password": "asyncpass"})
+    app = create_asgi_app(client.application)
+
+    status, content = asgi_request(app, "POST", "/recommend", {
+        "username": "async_tester",
+        "genre": "Comedy",
+        "age_rating": "PG",
+        "year_range": "2011-2015"
+    })
+
+    assert status == 200
+    recommendations = json.loads(content)["recommendations"]
+    assert len(recommendations) == 10
+    first = recommendations[0]
+    assert set(first) == {'movie_id', 'title', 'overview', 'release_date', 'poster_path', 'watch_providers', 'trailer_url'}
+    movie = generate_catalog()[first['movie_id']]
+    assert movie['certification'] == "PG" and 35 in movie['genre_ids']
+    assert first["watch_providers"] == movie['providers']
+
+    user_id = session.query(User.id).filter_by(username="async_tester").scalar()
+    assert session.query(UserRecommendation).filter_by(user_id=user_id).count() == 10
+
+def test_async_recommend_serves_the_last_result_while_tmdb_is_down(client, fake_tmdb):
+    for username in ("async_degraded_first", "async_degraded_second"):
+        client.post('/create_account', json={"username": username, "password": "degradedpass"})
+    app = create_asgi_app(client.application)
+    request = {"genre": "Drama", "age_rating": "R", "year_range": "2000-2010"}
+
+    status, content = asgi_request(app, "POST", "/recommend", dict(request, username="async_degraded_first"))
+    assert status == 200
+    loaded = json.loads(content)["recommendations"]
+
+    for breaker in tmdb_breakers.values():
+        for _ in range(breaker.min_calls):
+            breaker.record(False)
+
+    # With the TMDB responses expired and no history for the second user, only the result loaded over ASGI can answer
+    response_cache.clear()
+    status, content = asgi_request(app, "POST", "/recommend", dict(request, username="async_degraded_second"))
+    assert status == 200
+    data = json.loads(content)
+    assert data["degraded"] is True
+    assert [rec["movie_id"] for rec in data["recommendations"]] == [rec["movie_id"] for rec in loaded]
+
+def test_async_recommend_validates_input(client):
+    app = create_asgi_app(client.application)
+    status, _ = asgi_request(app, "POST", "/recommend", {"genre": "Comedy"})
+    assert status == 400
+
+def test_other_routes_fall_through_to_flask(client):
+    app = create_asgi_app(client.application)
+    status, content = asgi_request(app, "GET", "/health")
+    assert status == 200
+    assert json.loads(content)["status"] == "ok"
+
+def test_disk_cache_is_used_off_the_event_loop(fake_tmdb, tmp_path):
+    cache = ResponseCache(SQLiteCache(str(tmp_path / 'cache.db'), max_entries=100, max_bytes=10 ** 6),
+                          tmdb_async.response_cache.ttls)
+    threads = []
+
+    def record(fn):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return fn(*args)
+        return wrapper
+
+    async def run():
+        try:
+            first = await tmdb_async.get_movie_details(1)
+            assert await tmdb_async.get_movie_details(1) == first
+        finally:
+            await tmdb_async.async_tmdb_client.close()
+
+    with patch.object(tmdb_async, 'response_cache', cache), \
+            patch.object(cache, 'get', record(cache.get)), patch.object(cache, 'set', record(cache.set)):
+        asyncio.run(run())
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+def test_each_event_loop_gets_its_own_http_session():
+    client = tmdb_async.AsyncTMDBClient()
+
+    async def open_session():
+        return client._http()
+
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(open_session())
+        assert loop.run_until_complete(open_session()) is first
+        # Another loop does not replace (and orphan) the first loop's session
+        async def open_and_close():
+            http = client._http()
+            await client.close()
+            return http
+        other = asyncio.run(open_and_close())
+        assert other is not first and other.closed and not first.closed
+        assert loop.run_until_complete(open_session()) is first
+        loop.run_until_complete(client.close())
+        assert first.closed
+    finally:
+        loop.close()
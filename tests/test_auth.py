@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 def test_create_account(client):
     # Create a new account
     response = client.post('/create_account', json={
@@ -55,3 +57,31 @@ def test_update_password_success(client):
         "password": "newtestpass"
     })
     assert response.status_code == 200
+
+def test_login_rehashes_outdated_iteration_count(client):
+    from app.database import session
+    from app.models import User
+    from app.utils import hash_password
+
+    session.add(User(username="legacy_user", salt="legacysalt", password_hash=hash_password("legacypass", "legacysalt")))
+    session.commit()
+
+    with patch('app.routes.auth.PASSWORD_HASH_ITERATIONS', 1000):
+        response = client.post('/login', json={"username": "legacy_user", "password": "legacypass"})
+    assert response.status_code == 200
+
+    user = session.query(User).filter_by(username="legacy_user").one()
+    assert user.password_iterations == 1000
+    assert user.password_hash == hash_password("legacypass", user.salt, 1000)
+
+    with patch('app.routes.auth.PASSWORD_HASH_ITERATIONS', 1000):
+        response = client.post('/login', json={"username": "legacy_user", "password": "legacypass"})
+    assert response.status_code == 200
+
+def test_saturated_kdf_queue_returns_503(client):
+    from app.utils import KDFPool
+
+    with patch('app.routes.auth.kdf_pool', KDFPool(workers=0, queue_depth=0)):
+        response = client.post('/login', json={"username": "testuser", "password": "newtestpass"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
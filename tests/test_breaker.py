@@ -0,0 +1,73 @@
+from unittest.mock import patch
+import requests
+from app.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.tmdb import tmdb_breakers
+from tests.test_recommendations import mocked_tmdb_get
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_breaker_opens_on_failures_and_recovers_after_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker('test', failure_rate=0.5, window=4, min_calls=4, open_seconds=10, half_open_calls=2, clock=clock)
+
+    for success in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(success)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()  # only two probes at a time
+    breaker.record(True)
+    breaker.record(False)
+    # A failed probe reopens the breaker for twice as long
+    assert breaker.state == OPEN
+    clock.now = 29
+    assert breaker.state == OPEN
+    clock.now = 30
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['opened'] == 2
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker('test', window=2, min_calls=2, slow_call_seconds=1, clock=FakeClock())
+    breaker.record(True, elapsed=0.5)
+    breaker.record(True, elapsed=2)
+    assert breaker.state == OPEN
+
+def test_recommend_serves_stored_results_while_tmdb_is_down(client):
+    client.post('/create_account', json={"username": "degraded_tester", "password": "degradedpass"})
+    request = {"username": "degraded_tester", "genre": "Horror", "age_rating": "R", "year_range": "2000-2010"}
+
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        assert client.post('/recommend', json=request).status_code == 200
+
+    for breaker in tmdb_breakers.values():
+        for _ in range(breaker.min_calls):
+            breaker.record(False)
+
+    # Open breakers refuse the calls, so TMDB is never contacted and history is used
+    with patch('requests.Session.get', side_effect=requests.ConnectionError) as tmdb_get:
+        response = client.post('/recommend', json=dict(request, year_range="2011-2015"))
+    assert tmdb_get.call_count == 0
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["degraded"] is True
+    assert data["recommendations"][0]["title"] == "Test Movie"
+
+    health = client.get('/health').get_json()
+    assert health["status"] == "degraded"
+    assert health["tmdb_breakers"]["discover"]["state"] == "open"
+
+    # Without any stored results for the genre the error is passed on
+    response = client.post('/recommend', json=dict(request, genre="Comedy"))
+    assert response.status_code == 503
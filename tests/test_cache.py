@@ -0,0 +1,60 @@
+from unittest.mock import patch
+from app.cache import MemoryCache, SQLiteCache, ResponseCache
+from app.tmdb import get_movie_recommendations_from_tmdb, response_cache, recommendation_refresher
+from tests.test_recommendations import mocked_tmdb_get
+
+def test_memory_cache_lru_eviction():
+    cache = MemoryCache(max_entries=2, max_bytes=1024)
+    cache.set("a", {"v": 1}, ttl=60)
+    cache.set("b", {"v": 2}, ttl=60)
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3}, ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+def test_memory_cache_evicts_by_size():
+    cache = MemoryCache(max_entries=100, max_bytes=100)
+    cache.set("a", {"v": "x" * 60}, ttl=60)
+    cache.set("b", {"v": "y" * 60}, ttl=60)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 100
+
+def test_memory_cache_ttl_expiry():
+    cache = MemoryCache(max_entries=10, max_bytes=1024)
+    with patch('time.time', return_value=1000.0):
+        cache.set("a", {"v": 1}, ttl=10)
+    with patch('time.time', return_value=1011.0):
+        assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_sqlite_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path, max_entries=10, max_bytes=1024).set("a", {"v": 1}, ttl=60)
+
+    cache = SQLiteCache(path, max_entries=1, max_bytes=1024)
+    assert cache.get("a") == {"v": 1}
+    cache.set("b", {"v": 2}, ttl=60)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+def test_repeated_recommendations_are_served_from_cache():
+    before = response_cache.stats()["endpoints"]
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get) as mocked_get:
+        first, _ = get_movie_recommendations_from_tmdb("Action", "PG-13", "2016-2020")
+        recommendation_refresher.clear()
+        second, _ = get_movie_recommendations_from_tmdb("Action", "PG-13", "2016-2020")
+
+    assert first == second
+    assert mocked_get.call_count == 2
+    after = response_cache.stats()["endpoints"]
+    for endpoint in ("discover", "details"):
+        assert after[endpoint]["hits"] - before[endpoint]["hits"] == 1
+        assert after[endpoint]["misses"] - before[endpoint]["misses"] == 1
+
+def test_cache_keys_include_parameters():
+    assert ResponseCache.make_key("discover", "/discover/movie", {"a": 1, "b": 2}) == \
+        ResponseCache.make_key("discover", "/discover/movie", {"b": 2, "a": 1})
+    assert ResponseCache.make_key("discover", "/discover/movie", {"a": 1}) != \
+        ResponseCache.make_key("discover", "/discover/movie", {"a": 2})
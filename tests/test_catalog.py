@@ -0,0 +1,78 @@
+import datetime
+import json
+import os
+import re
+from unittest.mock import patch
+import pytest
+from app.catalog import sync_catalog
+from app.database import session
+from app.models import Movie, CatalogEntry, CatalogSync
+from app.tmdb import get_movie_recommendations_from_tmdb, response_cache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'tmdb')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+class MockResponse:
+    def __init__(self, json_data, status_code=200):
+        self.json_data = json_data
+        self.status_code = status_code
+    def json(self):
+        return self.json_data
+
+def recorded_tmdb_get(url, *args, **kwargs):
+    if "discover/movie" in url:
+        return MockResponse(load_fixture('discover_comedy_pg_2011_2015.json'))
+    if re.search(r"/movie/\d+$", url):
+        return MockResponse({"videos": load_fixture('videos.json'), "watch/providers": load_fixture('watch_providers.json')})
+    return MockResponse({}, 404)
+
+def offline_tmdb_get(*args, **kwargs):
+    raise AssertionError("TMDB should not be called when the catalog is fresh")
+
+SPEC = dict(genres=["Comedy"], certifications=["PG"], year_ranges=["2011-2015"])
+
+@pytest.fixture(autouse=True)
+def empty_catalog():
+    yield
+    session.query(CatalogEntry).delete()
+    session.query(CatalogSync).delete()
+    session.query(Movie).delete()
+    session.commit()
+
+def test_recommendations_served_from_synced_catalog():
+    with patch('requests.Session.get', side_effect=recorded_tmdb_get):
+        assert sync_catalog(**SPEC) == 1
+
+    with patch('requests.Session.get', side_effect=offline_tmdb_get):
+        recommendations, status_code = get_movie_recommendations_from_tmdb("Comedy", "PG", "2011-2015")
+
+    assert status_code == 200
+    assert [rec["title"] for rec in recommendations] == ["Most Popular", "Second Favourite", "Least Popular"]
+    assert recommendations[0]["watch_providers"] == ["Netflix"]
+    assert recommendations[0]["trailer_url"] == "https://www.youtube.com/embed/trailer1"
+    assert recommendations[2]["poster_path"] is None
+
+def test_sync_is_incremental():
+    with patch('requests.Session.get', side_effect=recorded_tmdb_get):
+        sync_catalog(**SPEC)
+
+    with patch('requests.Session.get', side_effect=offline_tmdb_get):
+        assert sync_catalog(**SPEC) == 0
+
+def test_stale_catalog_falls_back_to_live_api():
+    with patch('requests.Session.get', side_effect=recorded_tmdb_get):
+        sync_catalog(**SPEC)
+    sync = session.query(CatalogSync).one()
+    sync.synced_at = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    session.commit()
+    response_cache.clear()
+
+    with patch('requests.Session.get', side_effect=recorded_tmdb_get) as mocked_get:
+        recommendations, status_code = get_movie_recommendations_from_tmdb("Comedy", "PG", "2011-2015")
+
+    assert status_code == 200
+    assert mocked_get.called
+    assert recommendations[0]["title"] == "Second Favourite"
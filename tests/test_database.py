@@ -0,0 +1,27 @@
+import threading
+from sqlalchemy import text
+from app.database import get_engine, session
+
+def test_sqlite_connect_pragmas():
+    with get_engine().connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+def test_each_thread_gets_its_own_session():
+    sessions = []
+    def worker():
+        sessions.append(session())
+        session.remove()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert sessions[0] is not session()
+
+def test_session_removed_on_teardown(client):
+    client.get('/health')
+    session()
+    assert session.registry.has()
+    with client.application.app_context():
+        pass
+    assert not session.registry.has()
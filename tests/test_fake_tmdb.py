@@ -0,0 +1,51 @@
+from unittest.mock import patch
+from app.tmdb_client import TMDBClient
+from app.tmdb import parse_movie_details
+from benchmarks.fake_tmdb import details, discover, generate_catalog, start_fake_tmdb
+
+def test_discover_filters_and_pages_the_catalog():
+    catalog = generate_catalog(size=500)
+    query = {
+        'with_genres': '35', 'certification': 'PG',
+        'primary_release_date.gte': '2000-01-01', 'primary_release_date.lte': '2010-12-31'
+    }
+    first = discover(catalog, query)
+    results = first['results']
+
+    assert results
+    assert all(35 in movie['genre_ids'] and catalog[movie['id']]['certification'] == 'PG' for movie in results)
+    assert all('2000-01-01' <= movie['release_date'] <= '2010-12-31' for movie in results)
+    assert [movie['popularity'] for movie in results] == sorted((movie['popularity'] for movie in results), reverse=True)
+    assert first['total_pages'] == -(-first['total_results'] // 20)
+
+def test_details_append_videos_and_every_region_of_providers():
+    movie = generate_catalog(size=10)[3]
+    parsed = parse_movie_details(details(movie, {'append_to_response': 'videos,watch/providers'}))
+
+    assert parsed['watch_providers'] == {'US': movie['providers'], 'GB': movie['providers'][1:]}
+    trailers = [video['key'] for video in movie['videos'] if video['type'] == 'Trailer']
+    assert parsed['trailer_url'] == (f"https://www.youtube.com/embed/{trailers[0]}" if trailers else None)
+    assert parsed['runtime'] and parsed['title'] == movie['title']
+    assert 'videos' not in details(movie, {})
+
+def test_injected_429s_carry_retry_after():
+    server, base_url = start_fake_tmdb(latency=0, rate_429=1.0, retry_after=2)
+    try:
+        client = TMDBClient(base_url=base_url, max_retries=1, backoff_max=8)
+        with patch('time.sleep') as mocked_sleep:
+            response = client.get("/movie/1/videos")
+    finally:
+        server.shutdown()
+
+    assert response.status_code == 429
+    # The fake server's own latency sleeps go through the same patched time.sleep
+    assert 2.0 in [call.args[0] for call in mocked_sleep.call_args_list]
+    assert server.stats() == {429: 2}
+
+def test_unknown_movies_are_not_found():
+    server, base_url = start_fake_tmdb(latency=0, catalog_size=10)
+    try:
+        response = TMDBClient(base_url=base_url).get("/movie/11/watch/providers")
+    finally:
+        server.shutdown()
+    assert response.status_code == 404
@@ -1,4 +1,6 @@
 def test_health_check(client):
     response = client.get('/health')
     assert response.status_code == 200
-    assert response.data == b"OK"
+    data = response.get_json()
+    assert data["status"] == "ok"
+    assert data["tmdb_breakers"]["discover"]["state"] == "closed"
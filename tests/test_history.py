@@ -0,0 +1,61 @@
+import datetime
+import pytest
+from app.database import session
+from app.models import User, UserRecommendation
+from app.movies import upsert_movies
+
+@pytest.fixture(scope='module')
+def history_user():
+    user = User(username="history_tester", salt="salt", password_hash="hash")
+    session.add(user)
+    session.flush()
+    upsert_movies(session, [
+        {
+            'movie_id': index,
+            'title': f"Movie {index}",
+            'overview': None,
+            'release_date': None,
+            'poster_path': None,
+            'trailer_url': None,
+            'watch_providers': ["Netflix"]
+        }
+        for index in range(25)
+    ])
+    start = datetime.datetime(2024, 1, 1)
+    for index in range(25):
+        session.add(UserRecommendation(
+            user_id=user.id,
+            movie_id=index,
+            genre="Action" if index % 2 else "Drama",
+            recommended_at=start + datetime.timedelta(days=index)
+        ))
+    session.commit()
+    return user.username
+
+def test_history_pages_newest_first(client, history_user):
+    response = client.get('/history', query_string={"username": history_user, "limit": 10})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [rec["movie_id"] for rec in data["recommendations"]] == list(range(24, 14, -1))
+    assert data["recommendations"][0]["watch_providers"] == ["Netflix"]
+
+    seen = [rec["movie_id"] for rec in data["recommendations"]]
+    while data["next_cursor"]:
+        data = client.get('/history', query_string={
+            "username": history_user, "limit": 10, "cursor": data["next_cursor"]
+        }).get_json()
+        seen.extend(rec["movie_id"] for rec in data["recommendations"])
+    assert seen == list(range(24, -1, -1))
+
+def test_history_filters(client, history_user):
+    data = client.get('/history', query_string={
+        "username": history_user, "genre": "Action", "since": "2024-01-10", "until": "2024-01-20"
+    }).get_json()
+    assert [rec["movie_id"] for rec in data["recommendations"]] == [17, 15, 13, 11, 9]
+    assert data["next_cursor"] is None
+
+def test_history_invalid_requests(client, history_user):
+    assert client.get('/history').status_code == 400
+    assert client.get('/history', query_string={"username": "nobody"}).status_code == 404
+    assert client.get('/history', query_string={"username": history_user, "cursor": "garbage"}).status_code == 400
+    assert client.get('/history', query_string={"username": history_user, "since": "yesterday"}).status_code == 400
@@ -0,0 +1,90 @@
+import cProfile
+import os
+import tempfile
+from unittest.mock import patch
+import pytest
+from app import create_app
+from app.metrics import (
+    Histogram, SlowRequestProfiler, phase_seconds, request_seconds, requests_total, slow_request_profiler,
+    tmdb_responses_total
+)
+from tests.test_recommendations import mocked_tmdb_get
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    histogram = Histogram('test_seconds', 'Test histogram.', ['phase'], buckets=(0.1, 1))
+    histogram.observe(0.05, phase='a')
+    histogram.observe(0.5, phase='a')
+    histogram.observe(5, phase='a')
+
+    lines = histogram.render()
+    assert '# TYPE test_seconds histogram' in lines
+    assert 'test_seconds_bucket{phase="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{phase="a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{phase="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{phase="a"} 5.55' in lines
+    assert 'test_seconds_count{phase="a"} 3' in lines
+
+def test_recommend_records_phases_and_upstream_statuses(client):
+    client.post('/create_account', json={"username": "metrics_tester", "password": "metricspass"})
+    phases = {phase: phase_seconds.count(phase=phase) for phase in
+              ('user_lookup', 'discover', 'enrichment', 'serialization', 'commit')}
+    discover_ok = tmdb_responses_total.value(endpoint='discover', status=200)
+
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        response = client.post('/recommend', json={
+            "username": "metrics_tester", "genre": "Mystery", "age_rating": "G", "year_range": "2011-2015"
+        })
+    assert response.status_code == 200
+
+    # One movie: one details lookup
+    for phase in ('user_lookup', 'discover', 'enrichment', 'serialization', 'commit'):
+        assert phase_seconds.count(phase=phase) - phases[phase] == 1
+    assert tmdb_responses_total.value(endpoint='discover', status=200) == discover_ok + 1
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'request_phase_duration_seconds_count{phase="discover"}' in body
+    assert 'tmdb_responses_total{endpoint="details",status="200"}' in body
+    assert 'http_request_duration_seconds_count{method="POST",endpoint="recommendations.recommend"}' in body
+    assert 'password_hash_duration_seconds_count' in body
+
+def test_slow_request_profiler_keeps_only_slow_sampled_requests():
+    directory = tempfile.mkdtemp()
+    profiler = SlowRequestProfiler(threshold_ms=50, sample_rate=1, directory=directory)
+
+    assert profiler.finish(profiler.start(), 'fast', 0.01) is None
+    path = profiler.finish(profiler.start(), 'slow', 0.2)
+    assert os.listdir(directory) == [os.path.basename(path)]
+
+    assert SlowRequestProfiler(threshold_ms=0, sample_rate=1, directory=directory).start() is None
+
+def test_profiler_is_disabled_when_a_view_raises():
+    app = create_app()
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    failures = requests_total.value(method='GET', endpoint='boom', status=500)
+    with patch.object(slow_request_profiler, 'sample_rate', 1), \
+            patch.object(slow_request_profiler, 'threshold_ms', 10 ** 6):
+        with app.test_client() as client, pytest.raises(RuntimeError):
+            client.get('/boom')
+
+    # A profiler left enabled on this thread would make this raise ValueError
+    profiler = cProfile.Profile()
+    profiler.enable()
+    profiler.disable()
+    assert requests_total.value(method='GET', endpoint='boom', status=500) == failures + 1
+
+def test_streamed_responses_are_timed_until_the_body_is_sent(client):
+    client.post('/create_account', json={"username": "stream_metrics_tester", "password": "streampass"})
+    timed_streams = request_seconds.count(method='POST', endpoint='recommendations.recommend')
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        response = client.post('/recommend', headers={"Accept": "application/x-ndjson"}, json={
+            "username": "stream_metrics_tester", "genre": "Sci-Fi", "age_rating": "PG", "year_range": "2011-2015"
+        }, buffered=False)
+        assert request_seconds.count(method='POST', endpoint='recommendations.recommend') == timed_streams
+        response.get_data()
+        response.close()
+    assert request_seconds.count(method='POST', endpoint='recommendations.recommend') == timed_streams + 1
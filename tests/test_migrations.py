@@ -0,0 +1,65 @@
+from sqlalchemy import create_engine, inspect, text
+from app.database import Base
+from app.migrations import SCHEMA_VERSION, current_version, migrate, upgrade
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE users_cli (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, "
+    "salt VARCHAR(64) NOT NULL, password_hash VARCHAR(128) NOT NULL)",
+    "CREATE TABLE user_recommendations (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL, "
+    "title VARCHAR(255) NOT NULL, overview TEXT, release_date VARCHAR(20), poster_path VARCHAR(255), "
+    "watch_providers TEXT, trailer_url VARCHAR(500), recommended_at DATETIME)",
+    "INSERT INTO users_cli VALUES (1, 'alice', 'salt', 'hash'), (2, 'bob', 'salt', 'hash')",
+    "INSERT INTO user_recommendations VALUES "
+    "(1, 1, 10, 'Old Title', NULL, '2020-01-01', NULL, '[\"Netflix\"]', NULL, '2024-01-01 00:00:00'), "
+    "(2, 1, 10, 'New Title', NULL, '2020-01-01', NULL, '[\"Netflix\", \"Hulu\"]', NULL, '2024-02-01 00:00:00'), "
+    "(3, 2, 10, 'New Title', NULL, '2020-01-01', NULL, '[\"Netflix\", \"Hulu\"]', NULL, '2024-03-01 00:00:00'), "
+    "(4, 2, 11, 'Other', NULL, NULL, NULL, NULL, NULL, '2024-03-01 00:00:00')",
+]
+
+def test_upgrade_normalizes_legacy_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    Base.metadata.create_all(engine)
+    upgrade(engine)
+    upgrade(engine)  # a second run is a no-op
+
+    columns = {column['name'] for column in inspect(engine).get_columns('user_recommendations')}
+    assert columns == {'id', 'user_id', 'movie_id', 'genre', 'recommended_at'}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, user_id, movie_id FROM user_recommendations ORDER BY id")).all() == [
+            (2, 1, 10), (3, 2, 10), (4, 2, 11)
+        ]
+        assert conn.execute(text("SELECT id, title FROM movies ORDER BY id")).all() == [(10, 'New Title'), (11, 'Other')]
+        assert conn.execute(text(
+            "SELECT p.name FROM movie_providers mp JOIN providers p ON p.id = mp.provider_id "
+            "WHERE mp.movie_id = 10 ORDER BY mp.position"
+        )).scalars().all() == ['Netflix', 'Hulu']
+
+def test_migrate_records_schema_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert current_version(engine) == 0
+
+    assert migrate(engine) == SCHEMA_VERSION
+    assert current_version(engine) == SCHEMA_VERSION
+    assert {'users_cli', 'movies', 'user_recommendations'} <= set(inspect(engine).get_table_names())
+    # Once at the current version nothing runs again
+    assert migrate(engine) == 0
+
+def test_migrate_upgrades_unversioned_legacy_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    migrate(engine)
+
+    assert current_version(engine) == SCHEMA_VERSION
+    columns = {column['name'] for column in inspect(engine).get_columns('user_recommendations')}
+    assert columns == {'id', 'user_id', 'movie_id', 'genre', 'recommended_at'}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT history_version, token_version FROM users_cli ORDER BY id")).all() == [
+            (0, 0), (0, 0)
+        ]
@@ -0,0 +1,51 @@
+import datetime
+from app.database import session
+from app.models import User, UserRecommendation
+from app.persistence import recommendation_rows, upsert_recommendations, WriteBehindQueue
+
+RECOMMENDATIONS = [
+    {
+        'movie_id': movie_id,
+        'title': f'Movie {movie_id}',
+        'overview': None,
+        'release_date': '2020-01-01',
+        'poster_path': None,
+        'watch_providers': ['Netflix'],
+        'trailer_url': None
+    }
+    for movie_id in (901, 902, 903)
+]
+
+def make_user(username):
+    user = User(username=username, salt='salt', password_hash='hash')
+    session.add(user)
+    session.commit()
+    return user.id
+
+def test_upsert_refreshes_instead_of_duplicating():
+    user_id = make_user('upsert_tester')
+    first_seen = datetime.datetime(2024, 1, 1)
+    upsert_recommendations(session, recommendation_rows(user_id, 'Action', RECOMMENDATIONS, first_seen))
+    session.commit()
+
+    seen_again = datetime.datetime(2024, 2, 1)
+    upsert_recommendations(session, recommendation_rows(user_id, 'Drama', RECOMMENDATIONS[:2], seen_again))
+    session.commit()
+
+    rows = session.query(UserRecommendation.movie_id, UserRecommendation.genre, UserRecommendation.recommended_at) \
+        .filter_by(user_id=user_id).order_by(UserRecommendation.movie_id).all()
+    assert [(row.movie_id, row.genre, row.recommended_at) for row in rows] == [
+        (901, 'Drama', seen_again),
+        (902, 'Drama', seen_again),
+        (903, 'Action', first_seen)
+    ]
+
+def test_write_behind_flushes_batches():
+    user_id = make_user('write_behind_tester')
+    writer = WriteBehindQueue(batch_size=2, flush_interval=0.05)
+    writer.submit(recommendation_rows(user_id, 'Action', RECOMMENDATIONS))
+    writer.flush()
+
+    assert writer.stats() == {'pending': 0, 'flushes': 2, 'flushed_rows': 3}
+    session.expire_all()
+    assert session.query(UserRecommendation).filter_by(user_id=user_id).count() == 3
@@ -0,0 +1,61 @@
+import csv
+import json
+import os
+from unittest.mock import patch
+from app.database import session
+from app.models import User
+from app.provisioning import provision_users, read_users
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['username', 'password'])
+        writer.writerows(rows)
+
+def test_provision_users_skips_existing_duplicate_and_invalid_records(client, tmp_path):
+    client.post('/create_account', json={"username": "bulk_existing", "password": "original"})
+    path = str(tmp_path / 'users.ndjson')
+    with open(path, 'w') as f:
+        for record in [
+            {"username": "bulk_a", "password": "a-pass"},
+            {"username": "bulk_existing", "password": "changed"},
+            {"username": "bulk_a", "password": "second"},
+            {"username": "bulk_b"},
+            {"username": "x" * 81, "password": "too-long"}
+        ]:
+            f.write(json.dumps(record) + '\n')
+        f.write('not json\n')
+
+    batches = []
+    stats = provision_users(read_users(path), batch_size=4, workers=0, on_batch=batches.append)
+    assert stats == {'records': 6, 'created': 1, 'existing': 2, 'invalid': 3}
+    assert [batch['records'] for batch in batches] == [4, 6]
+
+    # The first record of a username wins and existing accounts keep their password
+    assert client.post('/login', json={"username": "bulk_a", "password": "a-pass"}).status_code == 200
+    assert client.post('/login', json={"username": "bulk_existing", "password": "original"}).status_code == 200
+
+def test_usernames_taken_after_the_lookup_are_counted_as_existing(client):
+    client.post('/create_account', json={"username": "bulk_raced", "password": "original"})
+    # As if the account had been created between the lookup and the insert
+    with patch('app.provisioning.existing_usernames', return_value=set()):
+        stats = provision_users([("bulk_raced", "other"), ("bulk_c", "c-pass")], workers=0)
+    assert stats == {'records': 2, 'created': 1, 'existing': 1, 'invalid': 0}
+    assert client.post('/login', json={"username": "bulk_raced", "password": "original"}).status_code == 200
+
+def test_provision_users_command_resumes_from_checkpoint(client, tmp_path):
+    path = str(tmp_path / 'users.csv')
+    write_csv(path, [(f"resume_{index}", f"pass-{index}") for index in range(5)])
+    # A previous run stopped after committing the first three records
+    with open(path + '.progress', 'w') as f:
+        f.write('3')
+
+    result = client.application.test_cli_runner().invoke(args=['provision-users', path, '--workers', '2', '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'Resuming after 3 records' in result.output
+    assert 'Created 2 users' in result.output and 'users/sec' in result.output
+    assert not os.path.exists(path + '.progress')
+
+    created = {username for (username,) in session.query(User.username).filter(User.username.like('resume_%'))}
+    assert created == {"resume_3", "resume_4"}
+    assert client.post('/login', json={"username": "resume_4", "password": "pass-4"}).status_code == 200
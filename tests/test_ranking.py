@@ -0,0 +1,74 @@
+import random
+from unittest.mock import patch
+from app import ranking
+from app.ranking import choose, rank
+from app.tmdb import enrichment_engine
+
+def paged_tmdb_get(pages=3, per_page=20):
+    """Mock TMDB with `pages` discover pages of `per_page` movies each, ids numbered by popularity."""
+    class MockResponse:
+        def __init__(self, json_data, status_code):
+            self.json_data = json_data
+            self.status_code = status_code
+        def json(self):
+            return self.json_data
+
+    def get(*args, **kwargs):
+        if "discover/movie" in args[0]:
+            page = kwargs.get('params', {}).get('page', 1)
+            first = (page - 1) * per_page + 1
+            return MockResponse({
+                "page": page,
+                "total_pages": pages,
+                "results": [
+                    {"id": movie_id, "title": f"Movie {movie_id}", "release_date": "2015-06-01",
+                     "popularity": 1000 - movie_id, "genre_ids": [28], "poster_path": None}
+                    for movie_id in range(first, first + per_page)
+                ]
+            }, 200)
+        return MockResponse({"results": {}}, 200)
+    return get
+
+def discover_pages(mock_get):
+    return [call.kwargs.get('params', {}).get('page', 1) for call in mock_get.call_args_list
+            if "discover/movie" in call.args[0]]
+
+def test_numpy_and_python_ranking_agree():
+    rng = random.Random(7)
+    popularity = [rng.uniform(0, 500) for _ in range(200)]
+    years = [rng.choice([None] + list(range(1970, 2025))) for _ in range(200)]
+    genre_ids = [rng.sample([12, 18, 28, 35, 53], rng.randint(0, 3)) for _ in range(200)]
+    affinity = {28: 0.5, 35: 0.3, 53: 0.2}
+
+    assert ranking.numpy() is not None
+    vectorized = rank(popularity, years, genre_ids, affinity, 50, current_year=2024)
+    with patch.object(ranking, '_numpy', False):
+        fallback = rank(popularity, years, genre_ids, affinity, 50, current_year=2024)
+    assert vectorized == fallback
+
+def test_choose_prefers_unseen_then_backfills():
+    candidates = [(movie_id, 100 - movie_id, '2020-01-01', [28], movie_id) for movie_id in range(1, 6)]
+    assert choose(candidates, {1, 2}, {}, 3) == [3, 4, 5]
+    assert choose(candidates, {1, 2, 3, 4}, {}, 3) == [5, 1, 2]
+
+def test_repeat_user_gets_unseen_movies_and_only_chosen_are_enriched(client):
+    client.post('/create_account', json={"username": "ranking_tester", "password": "rankingpass"})
+    request = {"username": "ranking_tester", "genre": "Action", "age_rating": "PG-13", "year_range": "2011-2015"}
+
+    with patch('requests.Session.get', side_effect=paged_tmdb_get()) as mock_get:
+        first = client.post('/recommend', json=request).get_json()["recommendations"]
+        assert [movie["movie_id"] for movie in first] == list(range(1, 11))
+        assert discover_pages(mock_get) == [1]
+
+        mock_get.reset_mock()
+        with patch.object(enrichment_engine, 'enrich', wraps=enrichment_engine.enrich) as enrich:
+            second = client.post('/recommend', json=request).get_json()["recommendations"]
+        # Page 1 (now cached) still has ten unseen movies, so page 2 is not needed
+        assert {movie["movie_id"] for movie in second} == set(range(11, 21))
+        assert discover_pages(mock_get) == []
+        assert sorted(enrich.call_args.args[0]) == list(range(11, 21))
+
+        mock_get.reset_mock()
+        third = client.post('/recommend', json=request).get_json()["recommendations"]
+        assert {movie["movie_id"] for movie in third} == set(range(21, 31))
+        assert discover_pages(mock_get) == [2]
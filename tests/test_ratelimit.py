@@ -0,0 +1,78 @@
+import asyncio
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+import pytest
+from app.ratelimit import MemoryBucket, SQLiteBucket, RateLimiter, RateLimited
+from app.tmdb_client import TMDBClient
+
+def make_limiter(bucket, max_waits=None):
+    return RateLimiter(
+        bucket,
+        reserves={'enrichment': 0.2, 'background': 0.5},
+        max_waits=max_waits or {'discover': 0, 'enrichment': 0, 'background': 0}
+    )
+
+def test_low_priority_work_is_shed_before_discover():
+    limiter = make_limiter(MemoryBucket(rate=0.001, burst=10))
+
+    for _ in range(5):
+        limiter.acquire('background')
+    with pytest.raises(RateLimited):
+        limiter.acquire('background')
+
+    for _ in range(3):
+        limiter.acquire('enrichment')
+    with pytest.raises(RateLimited):
+        limiter.acquire('enrichment')
+
+    for _ in range(2):
+        limiter.acquire('discover')
+    with pytest.raises(RateLimited):
+        limiter.acquire('discover')
+
+    stats = limiter.stats()
+    assert stats['background'] == {'granted': 5, 'delayed': 0, 'shed': 1}
+    assert stats['discover']['granted'] == 2
+
+def test_callers_wait_for_tokens_within_their_max_wait():
+    limiter = make_limiter(MemoryBucket(rate=1000, burst=1), max_waits={'discover': 1})
+    limiter.acquire('discover')
+    limiter.acquire('discover')
+    assert limiter.stats()['discover'] == {'granted': 2, 'delayed': 1, 'shed': 0}
+
+def test_sqlite_bucket_is_shared_between_instances():
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.db')
+    first = make_limiter(SQLiteBucket(path, rate=0.001, burst=3))
+    second = make_limiter(SQLiteBucket(path, rate=0.001, burst=3))
+
+    first.acquire('discover')
+    second.acquire('discover')
+    first.acquire('discover')
+    with pytest.raises(RateLimited):
+        second.acquire('discover')
+
+def test_async_acquire_takes_sqlite_tokens_off_the_event_loop():
+    bucket = SQLiteBucket(os.path.join(tempfile.mkdtemp(), 'ratelimit.db'), rate=0.001, burst=1)
+    threads = []
+    take = bucket.take
+
+    def recording_take(floor):
+        threads.append(threading.current_thread())
+        return take(floor)
+
+    limiter = make_limiter(bucket)
+    with patch.object(bucket, 'take', recording_take):
+        asyncio.run(limiter.acquire_async('discover'))
+        with pytest.raises(RateLimited):
+            asyncio.run(limiter.acquire_async('discover'))
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+def test_client_sheds_without_calling_tmdb():
+    client = TMDBClient(base_url="http://tmdb.test", limiter=make_limiter(MemoryBucket(rate=0.001, burst=1)))
+    with patch('requests.Session.get') as mocked_get:
+        with pytest.raises(RateLimited):
+            client.get("/movie/1/videos", priority='background')
+    mocked_get.assert_not_called()
+    assert client.stats()['rate_limit']['background']['shed'] == 1
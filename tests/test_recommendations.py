@@ -1,5 +1,6 @@
 from unittest.mock import patch
 import json
+import re
 
 def mocked_tmdb_get(*args, **kwargs):
     class MockResponse:
@@ -10,20 +11,22 @@ def mocked_tmdb_get(*args, **kwargs):
             return self.json_data
 
     # Mock responses based on URL patterns
-    if "watch/providers" in args[0]:
+    if re.search(r"/movie/\d+$", args[0]):
         return MockResponse({
-            "results": {
-                "US": {
-                    "flatrate": [{"provider_name": "Netflix"}]
+            "id": 123,
+            "runtime": 101,
+            "videos": {
+                "results": [
+                    {"site": "YouTube", "type": "Trailer", "key": "abcd1234"}
+                ]
+            },
+            "watch/providers": {
+                "results": {
+                    "US": {"flatrate": [{"provider_name": "Netflix"}]},
+                    "GB": {"flatrate": [{"provider_name": "BBC iPlayer"}]}
                 }
             }
         }, 200)
-    elif "/videos" in args[0]:
-        return MockResponse({
-            "results": [
-                {"site": "YouTube", "type": "Trailer", "key": "abcd1234"}
-            ]
-        }, 200)
     elif "discover/movie" in args[0]:
         return MockResponse({
             "results": [
@@ -46,7 +49,7 @@ def test_recommendations_with_mocked_tmdb(client):
         "password": "recommendpass"
     })
 
-    with patch('requests.get', side_effect=mocked_tmdb_get):
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
         response = client.post('/recommend', json={
             "username": "recommend_tester",
             "genre": "Action",
@@ -58,3 +61,205 @@ def test_recommendations_with_mocked_tmdb(client):
         assert "recommendations" in data
         assert len(data["recommendations"]) == 1
         assert data["recommendations"][0]["title"] == "Test Movie"
+
+def test_enrichment_preserves_order_and_degrades_failed_lookups():
+    from app.tmdb import get_movie_recommendations_from_tmdb
+
+    class MockResponse:
+        def __init__(self, json_data, status_code=200):
+            self.json_data = json_data
+            self.status_code = status_code
+        def json(self):
+            return self.json_data
+
+    def mocked_get(url, *args, **kwargs):
+        if "discover/movie" in url:
+            return MockResponse({"results": [
+                {"id": movie_id, "title": f"Movie {movie_id}"} for movie_id in range(1, 6)
+            ]})
+        if url.endswith("/movie/3"):
+            raise ValueError("malformed response")
+        if url.endswith("/movie/4"):
+            return MockResponse({}, 404)
+        return MockResponse({
+            "videos": {"results": [{"site": "YouTube", "type": "Trailer", "key": url.split("/")[-1]}]},
+            "watch/providers": {"results": {"US": {"flatrate": [{"provider_name": "Netflix"}]}}}
+        })
+
+    with patch('requests.Session.get', side_effect=mocked_get):
+        recommendations, status_code = get_movie_recommendations_from_tmdb("Action", "PG-13", "2016-2020")
+
+    assert status_code == 200
+    assert [rec["movie_id"] for rec in recommendations] == [1, 2, 3, 4, 5]
+    assert recommendations[0]["watch_providers"] == ["Netflix"]
+    assert recommendations[0]["trailer_url"] == "https://www.youtube.com/embed/1"
+    for failed in recommendations[2:4]:
+        assert failed["watch_providers"] == [] and failed["trailer_url"] is None
+    assert recommendations[4]["trailer_url"] == "https://www.youtube.com/embed/5"
+
+def test_recommendations_stream_as_ndjson(client):
+    client.post('/create_account', json={"username": "stream_tester", "password": "streampass"})
+
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        response = client.post('/recommend', headers={"Accept": "application/x-ndjson"}, json={
+            "username": "stream_tester",
+            "genre": "Horror",
+            "age_rating": "R",
+            "year_range": "2000-2010"
+        })
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert [event["event"] for event in events] == ["recommendations", "movie", "done"]
+    assert events[0]["recommendations"][0]["title"] == "Test Movie"
+    assert events[0]["recommendations"][0]["watch_providers"] == []
+    assert events[1]["index"] == 0
+    assert events[1]["recommendation"]["watch_providers"] == ["Netflix"]
+    assert events[1]["recommendation"]["trailer_url"] == "https://www.youtube.com/embed/abcd1234"
+
+    history = client.post('/login', json={"username": "stream_tester", "password": "streampass"}).get_json()
+    assert [rec["movie_id"] for rec in history["previous_recommendations"]] == [123]
+
+def test_stream_errors_are_plain_json(client):
+    client.post('/create_account', json={"username": "stream_error_tester", "password": "streampass"})
+    response = client.post('/recommend', headers={"Accept": "application/x-ndjson"}, json={
+        "username": "stream_error_tester",
+        "genre": "Western",
+        "age_rating": "R",
+        "year_range": "2000-2010"
+    })
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid genre."}
+
+def test_batch_recommendations_enrich_shared_movies_once(client):
+    client.post('/create_account', json={"username": "batch_tester", "password": "batchpass"})
+
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get) as mocked_get:
+        response = client.post('/recommend/batch', json={
+            "username": "batch_tester",
+            "specs": [
+                {"genre": "Mystery", "age_rating": "PG", "year_range": "2000-2010"},
+                {"genre": "Romance", "age_rating": "PG", "year_range": "2000-2010"},
+                {"genre": "Western", "age_rating": "PG", "year_range": "2000-2010"}
+            ]
+        })
+        urls = [call.args[0] for call in mocked_get.call_args_list]
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [200, 200, 400]
+    assert results[0]["recommendations"] == results[1]["recommendations"]
+    assert results[0]["recommendations"][0]["watch_providers"] == ["Netflix"]
+    assert results[2]["error"] == "Invalid genre."
+
+    # Both specs discover movie 123, whose details are fetched only once
+    assert sum("discover/movie" in url for url in urls) == 2
+    assert sum(url.endswith("/movie/123") for url in urls) == 1
+
+def test_batch_requires_specs(client):
+    response = client.post('/recommend/batch', json={"username": "batch_tester", "specs": []})
+    assert response.status_code == 400
+
+def test_other_regions_are_served_from_the_cached_details(client):
+    client.post('/create_account', json={"username": "region_tester", "password": "regionpass"})
+    request = {"username": "region_tester", "genre": "Comedy", "age_rating": "PG", "year_range": "2016-2020"}
+
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get) as mocked_get:
+        response = client.post('/recommend', json=dict(request, region="gb"))
+        urls = [call.args[0] for call in mocked_get.call_args_list]
+
+    assert response.status_code == 200
+    recommendation = response.get_json()["recommendations"][0]
+    assert recommendation["watch_providers"] == ["BBC iPlayer"]
+    assert recommendation["trailer_url"] == "https://www.youtube.com/embed/abcd1234"
+    # One details call served both regions: US for history, GB for the response
+    assert sum(url.endswith("/movie/123") for url in urls) == 1
+    history = client.post('/login', json={"username": "region_tester", "password": "regionpass"}).get_json()
+    assert history["previous_recommendations"][0]["watch_providers"] == ["Netflix"]
+
+    response = client.post('/recommend', json=dict(request, region="Great Britain"))
+    assert response.status_code == 400
+
+def test_non_string_age_ratings_are_rejected(client):
+    client.post('/create_account', json={"username": "rating_tester", "password": "ratingpass"})
+    for catalog_enabled in (True, False):
+        with patch('app.tmdb.TMDB_CATALOG_ENABLED', catalog_enabled), \
+                patch('requests.Session.get', side_effect=mocked_tmdb_get):
+            for age_rating in (["PG"], {"rating": "PG"}, "TV-MA"):
+                response = client.post('/recommend', json={
+                    "username": "rating_tester", "genre": "Comedy", "age_rating": age_rating, "year_range": "2016-2020"
+                })
+                assert response.status_code == 400
+                assert response.get_json() == {"error": "Invalid age rating."}
+
+            response = client.post('/recommend/batch', json={
+                "username": "rating_tester",
+                "specs": [
+                    {"genre": "Comedy", "age_rating": ["PG"], "year_range": "2016-2020"},
+                    {"genre": "Comedy", "age_rating": "PG", "year_range": "2016-2020"}
+                ]
+            })
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert [result["status"] for result in results] == [400, 200]
+        assert results[0]["error"] == "Invalid age rating."
+
+def test_batch_runs_serially_without_an_enrichment_pool(client):
+    from app.tmdb import EnrichmentEngine
+    client.post('/create_account', json={"username": "serial_batch_tester", "password": "batchpass"})
+    with patch('app.tmdb.TMDB_ENRICH_WORKERS', 0), patch('app.tmdb.enrichment_engine', EnrichmentEngine(max_workers=0)), \
+            patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        response = client.post('/recommend/batch', json={
+            "username": "serial_batch_tester",
+            "specs": [
+                {"genre": "Mystery", "age_rating": "R", "year_range": "2011-2015"},
+                {"genre": "Romance", "age_rating": "R", "year_range": "2011-2015"}
+            ]
+        })
+    assert response.status_code == 200
+    assert [result["status"] for result in response.get_json()["results"]] == [200, 200]
+
+def test_streamed_and_batch_results_use_the_requested_region(client):
+    client.post('/create_account', json={"username": "stream_region_tester", "password": "regionpass"})
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        response = client.post('/recommend', headers={"Accept": "application/x-ndjson"}, json={
+            "username": "stream_region_tester", "genre": "Thriller", "age_rating": "R", "year_range": "2000-2010",
+            "region": "GB"
+        })
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        batch = client.post('/recommend/batch', json={
+            "username": "stream_region_tester", "region": "gb",
+            "specs": [{"genre": "Thriller", "age_rating": "R", "year_range": "2000-2010"}]
+        })
+
+    assert [event["event"] for event in events] == ["recommendations", "movie", "done"]
+    assert events[1]["recommendation"]["watch_providers"] == ["BBC iPlayer"]
+    assert batch.get_json()["results"][0]["recommendations"][0]["watch_providers"] == ["BBC iPlayer"]
+    # History keeps the default region's providers
+    history = client.post('/login', json={"username": "stream_region_tester", "password": "regionpass"}).get_json()
+    assert {rec["watch_providers"][0] for rec in history["previous_recommendations"]} == {"Netflix"}
+
+    response = client.post('/recommend/batch', json={
+        "username": "stream_region_tester", "region": "Great Britain",
+        "specs": [{"genre": "Thriller", "age_rating": "R", "year_range": "2000-2010"}]
+    })
+    assert response.status_code == 400
+
+def test_database_connection_is_released_during_tmdb_calls(client):
+    from app.database import session
+    client.post('/create_account', json={"username": "pool_tester", "password": "poolpass"})
+    transactions = []
+
+    def tmdb_get(*args, **kwargs):
+        transactions.append(session().in_transaction())
+        return mocked_tmdb_get(*args, **kwargs)
+
+    for _ in range(2):  # without and then with history
+        with patch('requests.Session.get', side_effect=tmdb_get):
+            response = client.post('/recommend', json={
+                "username": "pool_tester", "genre": "Fantasy", "age_rating": "G", "year_range": "2021-present"
+            })
+        assert response.status_code == 200
+    assert transactions and not any(transactions)
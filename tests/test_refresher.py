@@ -0,0 +1,112 @@
+import threading
+from app.refresher import StaleWhileRevalidate
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_refresher(loader, clock, **overrides):
+    options = dict(
+        ttl=100, stale_ttl=50, refresh_ahead=10, hot_keys=10, max_keys=100,
+        concurrency=2, upstream_rate=100, refresh_cost=1, clock=clock
+    )
+    options.update(overrides)
+    return StaleWhileRevalidate(loader, **options)
+
+def wait_for_refreshes(refresher, count):
+    for _ in range(200):
+        if refresher.stats()['refreshes'] + refresher.stats()['refresh_failures'] >= count and not refresher.stats()['refreshing']:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("refresh did not finish")
+
+def test_stale_value_is_served_while_refreshing():
+    clock = FakeClock()
+    calls = []
+    release = threading.Event()
+
+    def loader(key, refresh=False):
+        calls.append(refresh)
+        if refresh:
+            release.wait(5)
+        return f"v{len(calls)}", 200
+
+    refresher = make_refresher(loader, clock)
+    assert refresher.get('k') == ("v1", 200)
+
+    clock.now = 120  # past the TTL, inside the stale window
+    assert refresher.get('k') == ("v1", 200)
+    assert refresher.get('k') == ("v1", 200)
+    release.set()
+    wait_for_refreshes(refresher, 1)
+
+    assert calls == [False, True]
+    assert refresher.get('k') == ("v2", 200)
+    stats = refresher.stats()
+    assert stats['stale_hits'] == 2
+    assert stats['refresh_lag_max'] == 20
+
+def test_expired_past_stale_window_loads_inline():
+    clock = FakeClock()
+    calls = []
+
+    def loader(key, refresh=False):
+        calls.append(refresh)
+        return len(calls), 200
+
+    refresher = make_refresher(loader, clock)
+    refresher.get('k')
+    clock.now = 200
+    assert refresher.get('k') == (2, 200)
+    assert calls == [False, False]
+    assert refresher.stats()['misses'] == 2
+
+def test_hot_keys_are_refreshed_before_expiry():
+    clock = FakeClock()
+    calls = []
+
+    def loader(key, refresh=False):
+        calls.append((key, refresh))
+        return key, 200
+
+    refresher = make_refresher(loader, clock, hot_keys=1)
+    for _ in range(3):
+        refresher.get('hot')
+    refresher.get('cold')
+
+    clock.now = 95  # within refresh_ahead of the TTL
+    refresher.tick()
+    wait_for_refreshes(refresher, 1)
+
+    assert ('hot', True) in calls
+    assert ('cold', True) not in calls
+    assert refresher.stats()['refresh_lag_max'] == -5
+
+def test_refreshes_beyond_the_budget_are_skipped():
+    clock = FakeClock()
+
+    def loader(key, refresh=False):
+        return key, 200
+
+    refresher = make_refresher(loader, clock, upstream_rate=1, refresh_cost=21)
+    refresher.get('a')
+    refresher.get('b')
+
+    clock.now = 95
+    refresher.tick()
+    wait_for_refreshes(refresher, 1)
+
+    stats = refresher.stats()
+    assert stats['refreshes'] == 1
+    assert stats['refreshes_skipped'] == 1
+
+def test_failed_loads_are_not_cached():
+    clock = FakeClock()
+    results = iter([({"error": "boom"}, 500), ("ok", 200)])
+
+    refresher = make_refresher(lambda key, refresh=False: next(results), clock)
+    assert refresher.get('k') == ({"error": "boom"}, 500)
+    assert refresher.get('k') == ("ok", 200)
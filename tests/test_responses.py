@@ -0,0 +1,74 @@
+import datetime
+import gzip
+import json
+from unittest.mock import patch
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.responses import JSONProvider
+from tests.test_ranking import paged_tmdb_get
+
+def login(client, username, password):
+    return client.post('/login', json={"username": username, "password": password})
+
+def test_history_is_revalidated_with_etag_without_reading_rows(client):
+    client.post('/create_account', json={"username": "etag_tester", "password": "etagpass"})
+    token = login(client, "etag_tester", "etagpass").get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch('requests.Session.get', side_effect=paged_tmdb_get()):
+        client.post('/recommend', headers=headers, json={"genre": "Action", "age_rating": "PG", "year_range": "2016-2020"})
+
+    first = client.get('/history', headers=headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+    assert len(first.get_json()["recommendations"]) == 10
+
+    with patch('app.history.get_history_page') as get_history_page:
+        cached = client.get('/history', headers=dict(headers, **{"If-None-Match": etag}))
+        assert cached.status_code == 304
+        assert cached.data == b''
+        # Logging in again reuses the same serialized page
+        assert len(login(client, "etag_tester", "etagpass").get_json()["previous_recommendations"]) == 10
+    assert not get_history_page.called
+
+    # New recommendations bump the history version, so the old ETag no longer matches
+    with patch('requests.Session.get', side_effect=paged_tmdb_get()):
+        client.post('/recommend', headers=headers, json={"genre": "Action", "age_rating": "PG", "year_range": "2016-2020"})
+    changed = client.get('/history', headers=dict(headers, **{"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert len(changed.get_json()["recommendations"]) == 20
+
+def test_large_json_responses_are_gzipped(client):
+    client.post('/create_account', json={"username": "gzip_tester", "password": "gzippass"})
+    with patch('requests.Session.get', side_effect=paged_tmdb_get()):
+        plain = client.post('/recommend', json={
+            "username": "gzip_tester", "genre": "Drama", "age_rating": "PG", "year_range": "2016-2020"
+        })
+    assert 'Content-Encoding' not in plain.headers
+
+    response = login(client, "gzip_tester", "gzippass")
+    assert 'Content-Encoding' not in response.headers
+    response = client.post('/login', headers={"Accept-Encoding": "gzip"}, json={
+        "username": "gzip_tester", "password": "gzippass"
+    })
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = json.loads(gzip.decompress(response.data))
+    assert body["message"] == "Login successful."
+    assert len(body["previous_recommendations"]) == 10
+
+    history = client.get('/history?username=gzip_tester', headers={"Accept-Encoding": "gzip"})
+    assert history.headers['Content-Encoding'] == 'gzip'
+    assert history.headers['ETag'].endswith('-gzip"')
+
+    revalidated = client.get('/history?username=gzip_tester', headers={
+        "Accept-Encoding": "gzip", "If-None-Match": history.headers['ETag']
+    })
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == history.headers['ETag']
+    assert 'Content-Encoding' not in revalidated.headers
+
+def test_json_provider_matches_flask_default_output():
+    app = Flask(__name__)
+    payload = {"b": [1, 2.5, None], "a": {"when": datetime.datetime(2024, 5, 1, 12, 30)}, "c": "é"}
+    assert json.loads(JSONProvider(app).dumps(payload)) == json.loads(DefaultJSONProvider(app).dumps(payload))
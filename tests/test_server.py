@@ -0,0 +1,40 @@
+import os
+import runpy
+from unittest.mock import patch
+from app import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_gunicorn_config_sizes_workers_and_preloads():
+    with patch.dict(os.environ), patch('multiprocessing.cpu_count', return_value=4):
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        assert os.environ['KDF_POOL_WORKERS'] == '0'
+    assert config['workers'] == 9
+    assert config['threads'] == min(16, config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW'])
+    assert config['worker_class'] == 'gthread'
+    assert config['preload_app'] is True
+    assert 0 < config['max_requests_jitter'] < config['max_requests']
+
+def test_gunicorn_config_keeps_explicit_sizes():
+    with patch.dict(os.environ), patch('app.config.SERVER_WORKERS', 2), patch('app.config.SERVER_THREADS', 3):
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    assert (config['workers'], config['threads']) == (2, 3)
+
+def test_gunicorn_threads_never_exceed_the_database_pool():
+    with patch.dict(os.environ), patch('multiprocessing.cpu_count', return_value=16), \
+            patch('app.config.DB_POOL_SIZE', 5), patch('app.config.DB_MAX_OVERFLOW', 10):
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    assert config['threads'] == 15
+    assert config['threads'] <= config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW']
+
+def test_worker_hooks_release_connections_and_flush_writes():
+    with patch.object(server, 'dispose_engine') as dispose_engine:
+        server.after_fork()
+    # Inherited connections belong to the master and must not be closed by the worker
+    dispose_engine.assert_called_once_with(close=False)
+
+    with patch.object(server.write_behind, 'flush') as flush, \
+            patch.object(server.enrichment_engine, 'shutdown') as enrichment_shutdown, \
+            patch.object(server.kdf_pool, 'shutdown') as kdf_shutdown:
+        server.before_exit()
+    assert flush.called and enrichment_shutdown.called and kdf_shutdown.called
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+from app.singleflight import AsyncSingleFlight, SingleFlight
+from app.tmdb import get_movie_recommendations_from_tmdb, query_flights
+from tests.test_recommendations import mocked_tmdb_get
+
+def run_concurrently(target, count):
+    results = [None] * count
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    def caller():
+        return flights.do("key", slow_fetch)
+
+    threading.Timer(0.2, release.set).start()
+    results = run_concurrently(caller, 5)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flights.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+def test_errors_are_shared_with_waiters():
+    flights = SingleFlight()
+
+    def failing_fetch():
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    results = run_concurrently(lambda: flights.do("key", failing_fetch), 3)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.stats()["executed"] == 1
+
+def test_async_followers_survive_a_cancelled_leader():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def slow_fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def run():
+        leader = asyncio.create_task(flights.do("key", slow_fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("key", slow_fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+        return result
+
+    assert asyncio.run(run()) == "result"
+    assert len(calls) == 2
+
+def test_identical_recommendation_queries_are_coalesced():
+    def slow_tmdb_get(*args, **kwargs):
+        time.sleep(0.1)
+        return mocked_tmdb_get(*args, **kwargs)
+
+    coalesced_before = query_flights.coalesced
+    with patch('requests.Session.get', side_effect=slow_tmdb_get) as mocked_get:
+        results = run_concurrently(lambda: get_movie_recommendations_from_tmdb("Drama", "R", "2000-2010"), 4)
+
+    assert all(status_code == 200 for _, status_code in results)
+    assert mocked_get.call_count == 2
+    assert query_flights.coalesced - coalesced_before == 3
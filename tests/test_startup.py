@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative `-X importtime` budget for `import run` (which also builds the app); about 0.3 s today
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '1000'))
+
+def test_import_run_is_fast_and_lazy(tmp_path):
+    database = tmp_path / 'startup.db'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import sys, run; from app import database, tmdb_client; '
+         'print(database._engine is None, tmdb_client.tmdb_client._session is None, '
+         '"sqlalchemy.dialects.postgresql" in sys.modules, "aiohttp" in sys.modules)'],
+        cwd=ROOT, env=dict(os.environ, DATABASE_URL=f'sqlite:///{database}'),
+        capture_output=True, text=True, check=True
+    )
+
+    # Neither the database nor the TMDB session is touched until the first request
+    assert result.stdout.split() == ['True', 'True', 'False', 'False']
+    assert not database.exists()
+
+    cumulative_us = next(
+        int(line.split('|')[1]) for line in result.stderr.splitlines() if line.split('|')[-1].strip() == 'run'
+    )
+    assert cumulative_us / 1000 < IMPORT_BUDGET_MS, result.stderr
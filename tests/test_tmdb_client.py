@@ -0,0 +1,48 @@
+from unittest.mock import patch
+from app.tmdb_client import TMDBClient, parse_retry_after
+from benchmarks.fake_tmdb import start_fake_tmdb
+
+class MockResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not a date") is None
+
+def test_retries_429_honoring_retry_after():
+    client = TMDBClient(base_url="http://tmdb.test", max_retries=3)
+    responses = [MockResponse(429, {"Retry-After": "2"}), MockResponse(503), MockResponse(200)]
+
+    with patch('requests.Session.get', side_effect=responses) as mocked_get, patch('time.sleep') as mocked_sleep:
+        response = client.get("/discover/movie", params={"with_genres": 28})
+
+    assert response.status_code == 200
+    assert mocked_get.call_count == 3
+    assert mocked_sleep.call_args_list[0].args[0] == 2.0
+    assert 0 <= mocked_sleep.call_args_list[1].args[0] <= client.backoff_base * 2
+    assert mocked_get.call_args.kwargs["timeout"] == client.timeout
+    assert mocked_get.call_args.kwargs["params"]["api_key"] == client.api_key
+    assert client.stats()["retries"] == 2
+
+def test_gives_up_after_max_retries():
+    client = TMDBClient(base_url="http://tmdb.test", max_retries=1)
+    with patch('requests.Session.get', return_value=MockResponse(500)) as mocked_get, patch('time.sleep'):
+        response = client.get("/movie/1/videos")
+    assert response.status_code == 500
+    assert mocked_get.call_count == 2
+
+def test_connections_are_reused():
+    server, base_url = start_fake_tmdb(latency=0)
+    try:
+        client = TMDBClient(base_url=base_url)
+        for movie_id in range(1, 6):
+            assert client.get(f"/movie/{movie_id}/videos").status_code == 200
+    finally:
+        server.shutdown()
+
+    stats = client.stats()
+    assert stats["pool_misses"] == 1
+    assert stats["pool_hits"] == 4
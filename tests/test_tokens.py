@@ -0,0 +1,93 @@
+from unittest.mock import patch
+import pytest
+from app.database import session
+from app.models import User
+from app.tokens import issue_token, resolve_cached_user_id, verify_token, token_cache, TokenCache
+from tests.test_recommendations import mocked_tmdb_get
+
+@pytest.fixture
+def user_id():
+    user = session.query(User).filter_by(username="token_unit_tester").first()
+    if user is None:
+        user = User(username="token_unit_tester", salt="salt", password_hash="hash")
+        session.add(user)
+        session.commit()
+    return user.id
+
+def test_issue_and_verify_token(user_id):
+    token = issue_token(user_id)
+    assert verify_token(token) == user_id
+
+def test_tampered_token_is_rejected(user_id):
+    token_cache.clear()
+    _, token_version, expires_at, signature = issue_token(user_id).split('.')
+    assert verify_token(f"{user_id + 1}.{token_version}.{expires_at}.{signature}") is None
+    assert verify_token("garbage") is None
+    assert verify_token("1.2.sïgnature") is None
+
+def test_expired_token_is_rejected(user_id):
+    token = issue_token(user_id, ttl=-1)
+    assert verify_token(token) is None
+
+def test_token_for_another_credential_version_is_rejected(user_id):
+    token_cache.clear()
+    assert verify_token(issue_token(user_id, token_version=1)) is None
+    assert verify_token(issue_token(user_id + 1000)) is None
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    cache.set("a", 1, 100)
+    cache.set("b", 2, 100)
+    cache.get("a")
+    cache.set("c", 3, 100)
+    assert cache.get("b") is None
+    assert cache.get("a") == (1, 100)
+
+def test_cached_resolution_needs_a_single_cache_lookup(user_id):
+    token_cache.clear()
+    token = issue_token(user_id)
+    assert resolve_cached_user_id(f"Bearer {token}") is None
+    verify_token(token)
+    entry = token_cache.get(token)
+    # An eviction right after the lookup must not turn a cache hit into a query
+    with patch.object(token_cache, 'get', side_effect=[entry, None]):
+        assert resolve_cached_user_id(f"Bearer {token}") == (user_id, None)
+    assert resolve_cached_user_id("") is None
+
+def test_login_token_authorizes_recommend_and_history(client):
+    client.post('/create_account', json={"username": "token_tester", "password": "tokenpass"})
+    login = client.post('/login', json={"username": "token_tester", "password": "tokenpass"}).get_json()
+    headers = {"Authorization": f"Bearer {login['token']}"}
+
+    with patch('requests.Session.get', side_effect=mocked_tmdb_get):
+        response = client.post('/recommend', headers=headers, json={
+            "genre": "Horror", "age_rating": "R", "year_range": "2011-2015"
+        })
+    assert response.status_code == 200
+
+    history = client.get('/history', headers=headers).get_json()
+    assert [rec["title"] for rec in history["recommendations"]] == ["Test Movie"]
+
+def test_invalid_token_is_rejected(client):
+    headers = {"Authorization": "Bearer 1.9999999999.bad"}
+    assert client.get('/history', headers=headers).status_code == 401
+    response = client.post('/recommend', headers=headers, json={
+        "genre": "Horror", "age_rating": "R", "year_range": "2011-2015"
+    })
+    assert response.status_code == 401
+
+def test_password_change_revokes_issued_tokens(client):
+    client.post('/create_account', json={"username": "revoke_tester", "password": "oldpass"})
+    old_token = client.post('/login', json={"username": "revoke_tester", "password": "oldpass"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {old_token}"}
+    # The token is now in token_cache
+    assert client.get('/history', headers=headers).status_code == 200
+
+    response = client.post('/update_password', json={
+        "username": "revoke_tester", "old_password": "oldpass", "new_password": "newpass"
+    })
+    assert response.status_code == 200
+    assert client.get('/history', headers=headers).status_code == 401
+
+    new_token = client.post('/login', json={"username": "revoke_tester", "password": "newpass"}).get_json()["token"]
+    assert client.get('/history', headers={"Authorization": f"Bearer {new_token}"}).status_code == 200